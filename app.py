@@ -29,6 +29,81 @@ parser.add_argument("--port", type=int, default=7860, help="Port to run the serv
 parser.add_argument(
     "--share", action="store_true", help="Create a public link using ngrok."
 )
+parser.add_argument(
+    "--output-format",
+    type=str,
+    choices=["png", "webp"],
+    default="png",
+    help="Image format for saved outputs (WebP is saved lossless).",
+)
+parser.add_argument(
+    "--png-compress-level",
+    type=int,
+    choices=range(0, 10),
+    metavar="[0-9]",
+    default=4,
+    help="zlib level for PNG outputs. Lower is faster to write, higher is smaller.",
+)
+parser.add_argument(
+    "--max-batch-size",
+    type=int,
+    default=4,
+    help="Most queued compatible requests to run as one batched pipeline call.",
+)
+parser.add_argument(
+    "--model-cache-ram-gb",
+    type=float,
+    default=16,
+    help="Host RAM for keeping recently used models ready to swap back in (0 disables).",
+)
+parser.add_argument(
+    "--embedding-cache-mb",
+    type=float,
+    default=512,
+    help="Host RAM for reusing text-encoder outputs of repeated prompts (0 disables).",
+)
+parser.add_argument(
+    "--lora-cache-mb",
+    type=float,
+    default=1024,
+    help="Host RAM for keeping parsed LoRA files ready to attach (0 disables).",
+)
+parser.add_argument(
+    "--fuse-loras",
+    action="store_true",
+    help="Merge the active LoRAs into the model weights for faster sampling.",
+)
+parser.add_argument(
+    "--pipeline-cache",
+    action="store_true",
+    help="Keep converted copies of single-file checkpoints in ./cache for faster reloads.",
+)
+parser.add_argument(
+    "--memory-calibration",
+    action="store_true",
+    help="Measure memory use on a model's first load (stored profiles always apply).",
+)
+parser.add_argument(
+    "--device",
+    type=str,
+    choices=["auto", "xpu", "cpu"],
+    default="auto",
+    help="Device to run pipelines on. 'auto' uses an Intel GPU when one is present.",
+)
+parser.add_argument(
+    "--threads",
+    type=int,
+    default=None,
+    help="Host threads for PyTorch (defaults to the number of physical cores).",
+)
+parser.add_argument(
+    "--workers",
+    type=str,
+    default=None,
+    help="Serve through one inference process per device: 'auto', a count, or "
+    "a list such as 'xpu:0,xpu:1' (GPUs) or 'cpu:0,cpu:1' (NUMA nodes).",
+)
+parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
 
 args = parser.parse_args()
 
@@ -42,16 +117,62 @@ def signal_handler(sig, frame):
     sys.exit(0)
 
 
+def start_worker_router():
+    import atexit
+    from core.worker_router import WorkerRouter, plan_workers
+    from web import server
+
+    try:
+        devices = plan_workers(args.workers)
+    except ValueError as e:
+        logger.error(str(e))
+        sys.exit(1)
+
+    # Workers share this host's RAM, so they split the model cache budget.
+    worker_args = [
+        "--output-format",
+        args.output_format,
+        "--png-compress-level",
+        str(args.png_compress_level),
+        "--max-batch-size",
+        str(args.max_batch_size),
+        "--model-cache-ram-gb",
+        str(args.model_cache_ram_gb / len(devices)),
+        "--embedding-cache-mb",
+        str(args.embedding_cache_mb),
+        "--lora-cache-mb",
+        str(args.lora_cache_mb),
+    ]
+    if args.fuse_loras:
+        worker_args.append("--fuse-loras")
+    if args.pipeline_cache:
+        worker_args.append("--pipeline-cache")
+    if args.memory_calibration:
+        worker_args.append("--memory-calibration")
+    if args.disable_filters:
+        worker_args.append("--disable-filters")
+
+    router = WorkerRouter(devices, base_port=args.port + 1, worker_args=worker_args)
+    router.start()
+    atexit.register(router.stop)
+    server.use_worker_router(router)
+    logger.info(
+        f"Routing jobs to {len(devices)} workers: "
+        f"{', '.join(device['name'] for device in devices)}."
+    )
+
+
 def launch_web_ui():
     try:
         import uvicorn
+        from core import logic as core_logic
         from web.server import app as fastapi_app
     except ImportError:
         logger.error("Required packages for the custom UI are not installed.")
         logger.error("Please run the installer (install.bat or install.sh) again.")
         sys.exit(1)
 
-    if args.share:
+    if args.share and not args.worker:
         try:
             from pyngrok import ngrok
 
@@ -66,16 +187,32 @@ def launch_web_ui():
                 "Could not create public link. Ensure your ngrok authtoken is configured if required."
             )
 
-    logger.info("Launching custom web UI...")
-
-    if not args.disable_filters:
+    if args.workers:
+        start_worker_router()
+    else:
+        core_logic.configure_device(args.device, args.threads)
+        core_logic.configure_outputs(args.output_format, args.png_compress_level)
+        core_logic.configure_batching(args.max_batch_size)
+        core_logic.configure_model_cache(args.model_cache_ram_gb)
+        core_logic.configure_embedding_cache(args.embedding_cache_mb)
+        core_logic.configure_lora_cache(args.lora_cache_mb, args.fuse_loras)
+        core_logic.configure_artifact_cache(args.pipeline_cache)
+        core_logic.configure_memory_model(args.memory_calibration)
+
+    if args.worker:
+        # Workers are only reached by the front router; keep them quiet.
+        log_level = "warning"
+    elif not args.disable_filters:
+        logger.info("Launching custom web UI...")
         setup_web_logging()
         log_level = "warning"
     else:
+        logger.info("Launching custom web UI...")
         log_level = "info"
 
-    logger.info(f"Access ArtTic-LAB locally at http://{args.host}:{args.port}")
-    logger.info("Press Ctrl+C in this terminal to shutdown.")
+    if not args.worker:
+        logger.info(f"Access ArtTic-LAB locally at http://{args.host}:{args.port}")
+        logger.info("Press Ctrl+C in this terminal to shutdown.")
 
     config = uvicorn.Config(
         fastapi_app, host=args.host, port=args.port, log_level=log_level
@@ -86,9 +223,10 @@ def launch_web_ui():
 
 if __name__ == "__main__":
     signal.signal(signal.SIGINT, signal_handler)
-    if not args.disable_filters:
+    if not args.disable_filters and not args.worker:
         os.system("cls" if os.name == "nt" else "clear")
     os.makedirs("./outputs", exist_ok=True)
 
-    log_system_info()
+    if not args.worker:
+        log_system_info()
     launch_web_ui()
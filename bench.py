@@ -0,0 +1,326 @@
+import argparse
+import asyncio
+import csv
+import itertools
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+import warnings
+import torch
+import diffusers
+from helpers.cli_manager import setup_logging, APP_LOGGER_NAME
+
+warnings.filterwarnings("ignore", category=UserWarning)
+
+logger = logging.getLogger(APP_LOGGER_NAME)
+
+BENCH_PROMPT = "a lighthouse on a cliff at sunset, highly detailed"
+CSV_FIELDS = [
+    "model",
+    "model_type",
+    "width",
+    "height",
+    "steps",
+    "scheduler",
+    "cpu_offload",
+    "vae_tiling",
+    "repeat",
+    "cold_load_s",
+    "warm_load_s",
+    "time_to_first_step_s",
+    "s_per_step",
+    "e2e_s",
+    "peak_memory_mb",
+    "error",
+]
+
+
+def _csv_list(value, cast=str):
+    return [cast(item.strip()) for item in value.split(",") if item.strip()]
+
+
+def _resolution(value):
+    width, _, height = value.lower().partition("x")
+    return int(width), int(height or width)
+
+
+def _flag_list(value):
+    return [item.lower() in ("1", "true", "on", "yes") for item in _csv_list(value)]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description=(
+            "ArtTic-LAB benchmark: load and generation timings across a "
+            "parameter matrix."
+        )
+    )
+    parser.add_argument(
+        "--tiny",
+        action="store_true",
+        help=(
+            "Benchmark tiny random pipelines for every architecture "
+            "(no checkpoints or GPU needed)."
+        ),
+    )
+    parser.add_argument(
+        "--models",
+        type=str,
+        default=None,
+        help=(
+            "Comma-separated model names from ./models (or tiny-* names). "
+            "Defaults to all."
+        ),
+    )
+    parser.add_argument(
+        "--resolutions",
+        type=str,
+        default=None,
+        help=(
+            "Comma-separated WxH list. Defaults to each model's native "
+            "resolution (64x64 with --tiny)."
+        ),
+    )
+    parser.add_argument(
+        "--steps", type=str, default=None, help="Comma-separated step counts."
+    )
+    parser.add_argument(
+        "--schedulers",
+        type=str,
+        default="Euler A",
+        help="Comma-separated scheduler names.",
+    )
+    parser.add_argument(
+        "--cpu-offload", type=str, default="off", help="Comma-separated on/off values."
+    )
+    parser.add_argument(
+        "--vae-tiling", type=str, default="off", help="Comma-separated on/off values."
+    )
+    parser.add_argument(
+        "--repeats", type=int, default=3, help="Generations per combination."
+    )
+    parser.add_argument(
+        "--seed", type=int, default=1234, help="Seed used for every generation."
+    )
+    parser.add_argument(
+        "--device", type=str, choices=["auto", "xpu", "cpu"], default="auto"
+    )
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument(
+        "--output", type=str, default="bench-results.json", help="JSON results file."
+    )
+    parser.add_argument(
+        "--csv", type=str, default=None, help="Optional CSV results file."
+    )
+    parser.add_argument(
+        "--keep-outputs",
+        action="store_true",
+        help="Keep the generated images in ./outputs instead of deleting them.",
+    )
+    parser.add_argument("--disable-filters", action="store_true")
+    return parser.parse_args(argv)
+
+
+def _git_commit():
+    try:
+        return (
+            subprocess.check_output(
+                ["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL, text=True
+            ).strip()
+            or None
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class StepTimer:
+    """progress_callback that timestamps each sampling step as it happens.
+
+    It is a plain function returning a coroutine, so the timestamp is taken
+    on the sampling thread rather than when the event loop gets to it.
+    """
+
+    def __init__(self):
+        self.stamps = []
+
+    def __call__(self, progress, desc):
+        self.stamps.append(time.perf_counter())
+        return asyncio.sleep(0)
+
+
+def _start_loop():
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="bench-loop", daemon=True).start()
+    return loop
+
+
+def _load(core, model, scheduler, vae_tiling, cpu_offload):
+    start = time.perf_counter()
+    result = core.load_model(model, scheduler, vae_tiling, cpu_offload, "None")
+    return time.perf_counter() - start, result
+
+
+def run_benchmark(args):
+    from core import logic as core
+    from pipelines.backends import get_backend
+
+    core.configure_device(args.device, args.threads)
+    core.configure_batching(1)
+    # Calibration would run inside the first load and swamp cold_load_s.
+    core.configure_memory_model(False)
+    core.initialize_outputs()
+    backend = get_backend()
+    loop = _start_loop()
+
+    if args.tiny:
+        from helpers.tiny_pipelines import register_tiny_pipelines
+
+        tiny_models = register_tiny_pipelines()
+        models = _csv_list(args.models) if args.models else tiny_models
+    else:
+        core.initialize_catalog()
+        models = _csv_list(args.models) if args.models else core.get_available_models()
+    if not models:
+        raise SystemExit(
+            "No models to benchmark. Add checkpoints to ./models or use --tiny."
+        )
+
+    resolutions = [_resolution(value) for value in _csv_list(args.resolutions or "")]
+    if not resolutions and args.tiny:
+        resolutions = [(64, 64)]
+    steps_list = _csv_list(args.steps or ("4" if args.tiny else "20"), int)
+    schedulers = _csv_list(args.schedulers)
+    offload_list = _flag_list(args.cpu_offload)
+    tiling_list = _flag_list(args.vae_tiling)
+
+    results = []
+    for model, cpu_offload, vae_tiling in itertools.product(
+        models, offload_list, tiling_list
+    ):
+        logger.info(
+            f"Benchmarking '{model}' (offload={cpu_offload}, tiling={vae_tiling})"
+        )
+        core.unload_model(keep_cached=False)
+        core.model_cache.clear()
+        base = {"model": model, "cpu_offload": cpu_offload, "vae_tiling": vae_tiling}
+        try:
+            cold_load_s, load_result = _load(
+                core, model, schedulers[0], vae_tiling, cpu_offload
+            )
+            # Park and restore to measure a switch back to a recently used model.
+            core.unload_model()
+            warm_load_s, _ = _load(core, model, schedulers[0], vae_tiling, cpu_offload)
+        except Exception as e:
+            logger.error(f"Could not load '{model}': {e}")
+            results.append({**base, "error": str(e)})
+            continue
+
+        model_resolutions = resolutions or [
+            (load_result["width"], load_result["height"])
+        ]
+        for (width, height), steps, scheduler in itertools.product(
+            model_resolutions, steps_list, schedulers
+        ):
+            scheduler_applied = core.supports_schedulers()
+            for repeat in range(args.repeats):
+                row = {
+                    **base,
+                    "model_type": load_result["model_type"],
+                    "width": width,
+                    "height": height,
+                    "steps": steps,
+                    "scheduler": scheduler if scheduler_applied else "native",
+                    "repeat": repeat,
+                    "cold_load_s": cold_load_s,
+                    "warm_load_s": warm_load_s,
+                }
+                timer = StepTimer()
+                backend.reset_peak_memory()
+                start = time.perf_counter()
+                try:
+                    result = core.generate_image(
+                        BENCH_PROMPT,
+                        "",
+                        steps,
+                        5.0,
+                        args.seed,
+                        width,
+                        height,
+                        0,
+                        progress_callback=timer,
+                        loop=loop,
+                        scheduler=scheduler,
+                    )
+                except Exception as e:
+                    logger.error(f"Generation failed for '{model}': {e}")
+                    results.append({**row, "error": str(e)})
+                    break
+                backend.synchronize()
+                row["e2e_s"] = time.perf_counter() - start
+                if timer.stamps:
+                    row["time_to_first_step_s"] = timer.stamps[0] - start
+                if len(timer.stamps) > 1:
+                    row["s_per_step"] = (timer.stamps[-1] - timer.stamps[0]) / (
+                        len(timer.stamps) - 1
+                    )
+                peak = backend.peak_memory()
+                row["peak_memory_mb"] = peak / 1024**2 if peak is not None else None
+                results.append(row)
+                if not args.keep_outputs:
+                    core.delete_image(result["image_filename"])
+                logger.info(
+                    f"  {width}x{height}, {steps} steps, {row['scheduler']}: "
+                    f"{row['e2e_s']:.2f}s"
+                )
+
+    core.unload_model(keep_cached=False)
+    core.model_cache.clear()
+    loop.call_soon_threadsafe(loop.stop)
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "device": backend.describe(),
+            "tiny": args.tiny,
+            "python": platform.python_version(),
+            "torch": torch.__version__,
+            "diffusers": diffusers.__version__,
+            "platform": platform.platform(),
+            "repeats": args.repeats,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+
+def write_results(report, json_path, csv_path=None):
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Wrote {len(report['results'])} results to {json_path}")
+    if csv_path:
+        with open(csv_path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_FIELDS, extrasaction="ignore")
+            writer.writeheader()
+            for row in report["results"]:
+                writer.writerow(row)
+        logger.info(f"Wrote CSV results to {csv_path}")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    setup_logging(disable_filters=args.disable_filters)
+    os.makedirs("./outputs", exist_ok=True)
+    report = run_benchmark(args)
+    write_results(report, args.output, args.csv)
+    failures = sum(1 for row in report["results"] if row.get("error"))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
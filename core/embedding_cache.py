@@ -0,0 +1,104 @@
+import os
+import logging
+import threading
+from collections import OrderedDict
+import torch
+from .lora_manager import lora_signature
+
+logger = logging.getLogger("arttic_lab")
+
+MB = 1024**2
+DEFAULT_BUDGET_MB = 512
+
+
+def embeds_bytes(embeds):
+    return sum(
+        tensor.numel() * tensor.element_size()
+        for tensor in embeds.values()
+        if isinstance(tensor, torch.Tensor)
+    )
+
+
+class PromptEmbeddingCache:
+    """LRU of text-encoder outputs so repeated prompts skip encoding.
+
+    Entries map a (model, LoRA stack, prompt, negative prompt) key to the embedding
+    kwargs the pipeline accepts in place of prompt text. They are kept in
+    host RAM, which is plenty fast for tensors this size and leaves device
+    memory to the denoiser. The least recently used entries are evicted once
+    their combined size exceeds the budget.
+    """
+
+    def __init__(self, budget_mb=DEFAULT_BUDGET_MB):
+        self.budget = int(budget_mb * MB)
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def configure(self, budget_mb):
+        with self._lock:
+            self.budget = max(0, int(float(budget_mb) * MB))
+            self._evict_locked()
+        if self.budget:
+            logger.info(f"Prompt embedding cache budget set to {budget_mb} MB.")
+        else:
+            logger.info("Prompt embedding cache disabled.")
+
+    @staticmethod
+    def make_key(pipe, loras, prompt, negative_prompt, do_cfg):
+        return (
+            pipe.model_path,
+            pipe.model_hash,
+            # A LoRA file replaced under the same name changes the encoders too.
+            tuple((name, weight, lora_signature(name)) for name, weight in loras),
+            prompt,
+            negative_prompt,
+            bool(do_cfg),
+        )
+
+    def get(self, key):
+        with self._lock:
+            embeds = self._entries.get(key)
+            if embeds is not None:
+                self._entries.move_to_end(key)
+            return embeds
+
+    def put(self, key, embeds):
+        """Store host copies of `embeds` and return them"""
+        stored = {
+            name: tensor.detach().to("cpu") if tensor is not None else None
+            for name, tensor in embeds.items()
+        }
+        size = embeds_bytes(stored)
+        if size > self.budget:
+            return stored
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= embeds_bytes(previous)
+            self._entries[key] = stored
+            self._size += size
+            self._evict_locked()
+        return stored
+
+    def discard_model(self, model_path):
+        model_path = os.path.abspath(model_path)
+        with self._lock:
+            keys = [
+                key for key in self._entries if os.path.abspath(key[0]) == model_path
+            ]
+            for key in keys:
+                self._size -= embeds_bytes(self._entries.pop(key))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _evict_locked(self):
+        while self._entries and self._size > self.budget:
+            _, embeds = self._entries.popitem(last=False)
+            self._size -= embeds_bytes(embeds)
+
+
+embedding_cache = PromptEmbeddingCache()
@@ -0,0 +1,396 @@
+import os
+import json
+import base64
+import sqlite3
+import threading
+import logging
+from .metadata_handler import metadata_handler
+
+logger = logging.getLogger("arttic_lab")
+
+OUTPUTS_DIR = "./outputs"
+CACHE_DIR = "./cache"
+INDEX_FILE = os.path.join(CACHE_DIR, "gallery_index.sqlite3")
+IMAGE_EXTENSIONS = (".png", ".webp")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    filename TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    has_metadata INTEGER NOT NULL DEFAULT 0,
+    prompt TEXT NOT NULL DEFAULT '',
+    negative_prompt TEXT NOT NULL DEFAULT '',
+    model_name TEXT NOT NULL DEFAULT '',
+    lora_name TEXT NOT NULL DEFAULT '',
+    seed INTEGER,
+    width INTEGER,
+    height INTEGER,
+    steps INTEGER,
+    cfg_scale REAL,
+    timestamp_generation TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_images_mtime ON images (mtime DESC, filename DESC);
+CREATE INDEX IF NOT EXISTS idx_images_seed ON images (COALESCE(seed, -1), filename);
+CREATE INDEX IF NOT EXISTS idx_images_model ON images (model_name, filename);
+CREATE TABLE IF NOT EXISTS image_loras (
+    filename TEXT NOT NULL,
+    lora_name TEXT NOT NULL,
+    PRIMARY KEY (lora_name, filename)
+);
+CREATE INDEX IF NOT EXISTS idx_image_loras_filename ON image_loras (filename);
+"""
+# Bumped when rows need re-parsing; older indexes are rebuilt on connect.
+SCHEMA_VERSION = 1
+
+SORT_COLUMNS = {
+    "mtime": "mtime",
+    "seed": "COALESCE(seed, -1)",
+    "model_name": "model_name",
+}
+MAX_PAGE_SIZE = 500
+
+COLUMNS = (
+    "filename",
+    "mtime",
+    "size",
+    "has_metadata",
+    "prompt",
+    "negative_prompt",
+    "model_name",
+    "lora_name",
+    "seed",
+    "width",
+    "height",
+    "steps",
+    "cfg_scale",
+    "timestamp_generation",
+)
+
+NUMERIC_COLUMNS = ("seed", "width", "height", "steps", "cfg_scale")
+ROW_DEFAULTS = {col: (None if col in NUMERIC_COLUMNS else "") for col in COLUMNS}
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _lora_names(lora_info):
+    """Every LoRA in `lora_info`, which names a whole stack as 'a + b'"""
+    stack = lora_info.get("loras")
+    if isinstance(stack, list):
+        names = [entry.get("name") for entry in stack if isinstance(entry, dict)]
+    else:
+        names = [lora_info.get("name")]
+    return sorted({name for name in names if name})
+
+
+class GalleryIndex:
+    """SQLite-backed index of the images in ./outputs.
+
+    Rows are keyed by filename and carry the file's mtime/size so that a
+    startup reconcile only has to re-parse files that actually changed.
+    """
+
+    def __init__(self, outputs_dir=OUTPUTS_DIR, index_file=INDEX_FILE):
+        self.outputs_dir = outputs_dir
+        self.index_file = index_file
+        self._lock = threading.Lock()
+        self._conn = None
+        metadata_handler.add_write_listener(self._on_metadata_written)
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.index_file) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.index_file, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+                with conn:
+                    conn.execute("DELETE FROM images")
+                    conn.execute("DELETE FROM image_loras")
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self._conn = conn
+        return self._conn
+
+    def _is_indexable(self, filename):
+        return filename.lower().endswith(IMAGE_EXTENSIONS)
+
+    def _build_row(self, filename, stat, metadata):
+        row = dict(ROW_DEFAULTS)
+        row.update(
+            {
+                "filename": filename,
+                "mtime": stat.st_mtime,
+                "size": stat.st_size,
+                "has_metadata": 1 if metadata else 0,
+                "loras": [],
+            }
+        )
+        if metadata:
+            lora_info = metadata.get("lora_info") or {}
+            row.update(
+                {
+                    "prompt": metadata.get("prompt") or "",
+                    "negative_prompt": metadata.get("negative_prompt") or "",
+                    "model_name": metadata.get("model_name") or "",
+                    "lora_name": lora_info.get("name") or "",
+                    "loras": _lora_names(lora_info),
+                    "seed": _to_int(metadata.get("seed")),
+                    "width": _to_int(metadata.get("width")),
+                    "height": _to_int(metadata.get("height")),
+                    "steps": _to_int(metadata.get("steps")),
+                    "cfg_scale": _to_float(metadata.get("cfg_scale")),
+                    "timestamp_generation": metadata.get("timestamp_generation") or "",
+                }
+            )
+        return row
+
+    def _write_rows(self, rows):
+        if not rows:
+            return
+        conn = self._connect()
+        columns = ", ".join(COLUMNS)
+        placeholders = ", ".join("?" for _ in COLUMNS)
+        conn.executemany(
+            f"INSERT OR REPLACE INTO images ({columns}) VALUES ({placeholders})",
+            [tuple(row[col] for col in COLUMNS) for row in rows],
+        )
+        self._delete_loras([row["filename"] for row in rows])
+        conn.executemany(
+            "INSERT OR IGNORE INTO image_loras (filename, lora_name) VALUES (?, ?)",
+            [(row["filename"], name) for row in rows for name in row["loras"]],
+        )
+
+    def _delete_loras(self, filenames):
+        self._connect().executemany(
+            "DELETE FROM image_loras WHERE filename = ?",
+            [(filename,) for filename in filenames],
+        )
+
+    def reconcile(self):
+        """Bring the index in sync with the outputs directory.
+
+        Only stats the directory listing; PNGs are opened just for new files
+        or files whose mtime/size no longer match their row.
+        """
+        os.makedirs(self.outputs_dir, exist_ok=True)
+        with self._lock:
+            conn = self._connect()
+            known = {
+                row["filename"]: (row["mtime"], row["size"])
+                for row in conn.execute("SELECT filename, mtime, size FROM images")
+            }
+
+            seen = set()
+            changed_rows = []
+            with os.scandir(self.outputs_dir) as entries:
+                for entry in entries:
+                    if not entry.is_file() or not self._is_indexable(entry.name):
+                        continue
+                    stat = entry.stat()
+                    if stat.st_size == 0:
+                        # Reserved by the output allocator but never written.
+                        continue
+                    seen.add(entry.name)
+                    if known.get(entry.name) == (stat.st_mtime, stat.st_size):
+                        continue
+                    metadata = metadata_handler.extract_metadata_from_image(entry.path)
+                    changed_rows.append(self._build_row(entry.name, stat, metadata))
+
+            removed = [name for name in known if name not in seen]
+
+            with conn:
+                self._write_rows(changed_rows)
+                conn.executemany(
+                    "DELETE FROM images WHERE filename = ?",
+                    [(name,) for name in removed],
+                )
+                self._delete_loras(removed)
+
+        logger.info(
+            f"Gallery index reconciled: {len(seen)} images, "
+            f"{len(changed_rows)} updated, {len(removed)} removed."
+        )
+
+    def upsert(self, filepath, metadata=None):
+        filename = os.path.basename(filepath)
+        if not self._is_indexable(filename):
+            return None
+        try:
+            stat = os.stat(filepath)
+        except FileNotFoundError:
+            self.remove(filename)
+            return None
+        if metadata is None:
+            metadata = metadata_handler.extract_metadata_from_image(filepath)
+        row = self._build_row(filename, stat, metadata)
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                self._write_rows([row])
+        return self._to_gallery_entry(row)
+
+    def remove(self, filename):
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("DELETE FROM images WHERE filename = ?", (filename,))
+                self._delete_loras([filename])
+
+    def get(self, filename):
+        with self._lock:
+            row = (
+                self._connect()
+                .execute("SELECT * FROM images WHERE filename = ?", (filename,))
+                .fetchone()
+            )
+        return self._to_gallery_entry(row) if row else None
+
+    def list_images(self):
+        with self._lock:
+            rows = (
+                self._connect()
+                .execute("SELECT * FROM images ORDER BY mtime DESC, filename DESC")
+                .fetchall()
+            )
+        return [self._to_gallery_entry(row) for row in rows]
+
+    def query(
+        self,
+        cursor=None,
+        limit=60,
+        sort="mtime",
+        order="desc",
+        model=None,
+        lora=None,
+        date_from=None,
+        date_to=None,
+        prompt=None,
+    ):
+        """Return one page of the gallery using keyset pagination.
+
+        The cursor is an opaque token holding the sort value and filename of
+        the last row of the previous page, so every page is a single indexed
+        range scan no matter how deep the client has scrolled.
+        """
+        if sort not in SORT_COLUMNS:
+            raise ValueError(
+                f"Unknown sort key '{sort}'. Use one of: {', '.join(SORT_COLUMNS)}."
+            )
+        if order not in ("asc", "desc"):
+            raise ValueError("Order must be 'asc' or 'desc'.")
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+
+        sort_expr = SORT_COLUMNS[sort]
+        direction = order.upper()
+        comparison = "<" if order == "desc" else ">"
+
+        filters, params = [], []
+        if model:
+            filters.append("model_name = ?")
+            params.append(model)
+        if lora:
+            # Matches any image whose LoRA stack includes `lora`.
+            filters.append(
+                "filename IN (SELECT filename FROM image_loras WHERE lora_name = ?)"
+            )
+            params.append(lora)
+        if date_from is not None:
+            filters.append("mtime >= ?")
+            params.append(float(date_from))
+        if date_to is not None:
+            filters.append("mtime <= ?")
+            params.append(float(date_to))
+        if prompt:
+            escaped = (
+                prompt.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            )
+            filters.append("prompt LIKE ? ESCAPE '\\'")
+            params.append(f"%{escaped}%")
+
+        page_filters, page_params = list(filters), list(params)
+        if cursor:
+            last_value, last_filename = self._decode_cursor(cursor)
+            page_filters.append(f"({sort_expr}, filename) {comparison} (?, ?)")
+            page_params.extend([last_value, last_filename])
+
+        where = f"WHERE {' AND '.join(page_filters)}" if page_filters else ""
+        count_where = f"WHERE {' AND '.join(filters)}" if filters else ""
+
+        with self._lock:
+            conn = self._connect()
+            rows = conn.execute(
+                f"SELECT *, {sort_expr} AS sort_value FROM images {where} "
+                f"ORDER BY {sort_expr} {direction}, filename {direction} LIMIT ?",
+                page_params + [limit + 1],
+            ).fetchall()
+            total = conn.execute(
+                f"SELECT COUNT(*) FROM images {count_where}", params
+            ).fetchone()[0]
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = self._encode_cursor(last["sort_value"], last["filename"])
+
+        return {
+            "images": [self._to_gallery_entry(row) for row in rows],
+            "next_cursor": next_cursor,
+            "total": total,
+        }
+
+    @staticmethod
+    def _encode_cursor(sort_value, filename):
+        raw = json.dumps([sort_value, filename]).encode()
+        return base64.urlsafe_b64encode(raw).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor):
+        try:
+            sort_value, filename = json.loads(base64.urlsafe_b64decode(cursor))
+        except Exception:
+            raise ValueError("Invalid gallery cursor.")
+        return sort_value, filename
+
+    def _on_metadata_written(self, image_path, metadata):
+        if os.path.abspath(os.path.dirname(image_path)) == os.path.abspath(
+            self.outputs_dir
+        ):
+            self.upsert(image_path, metadata)
+
+    @staticmethod
+    def _to_gallery_entry(row):
+        row = dict(row)
+        image_info = {
+            "filename": row["filename"],
+            "has_metadata": bool(row["has_metadata"]),
+        }
+        if row["has_metadata"]:
+            prompt = row.get("prompt") or ""
+            image_info.update(
+                {
+                    "prompt_preview": (
+                        prompt[:50] + "..." if len(prompt) > 50 else prompt
+                    ),
+                    "model_name": row.get("model_name") or "",
+                    "timestamp_generation": row.get("timestamp_generation") or "",
+                }
+            )
+        return image_info
+
+
+gallery_index = GalleryIndex()
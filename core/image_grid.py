@@ -0,0 +1,77 @@
+import math
+from PIL import Image, ImageDraw, ImageFont
+
+LABEL_PADDING = 8
+
+
+def _text_size(draw, text, font):
+    left, top, right, bottom = draw.textbbox((0, 0), text, font=font)
+    return right - left, bottom - top
+
+
+def grid_shape(count):
+    """Near-square (rows, columns) layout for `count` images"""
+    columns = max(1, math.ceil(math.sqrt(count)))
+    return math.ceil(count / columns), columns
+
+
+def make_image_grid(rows, column_labels=None, row_labels=None):
+    """Compose rows of PIL images into one contact sheet.
+
+    `rows` is a list of lists; a None cell is left blank. Labels are drawn
+    above the columns and to the left of the rows when given.
+    """
+    images = [image for row in rows for image in row if image is not None]
+    if not images:
+        raise ValueError("Cannot build a grid without images.")
+
+    cell_width = max(image.width for image in images)
+    cell_height = max(image.height for image in images)
+    column_count = max(len(row) for row in rows)
+    font = ImageFont.load_default()
+    measure = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+
+    header_height = 0
+    if column_labels:
+        header_height = (
+            max(_text_size(measure, str(label), font)[1] for label in column_labels)
+            + LABEL_PADDING * 2
+        )
+    gutter_width = 0
+    if row_labels:
+        gutter_width = (
+            max(_text_size(measure, str(label), font)[0] for label in row_labels)
+            + LABEL_PADDING * 2
+        )
+
+    sheet = Image.new(
+        "RGB",
+        (
+            gutter_width + cell_width * column_count,
+            header_height + cell_height * len(rows),
+        ),
+        "white",
+    )
+    draw = ImageDraw.Draw(sheet)
+
+    for column, label in enumerate(column_labels or []):
+        text_width, _ = _text_size(draw, str(label), font)
+        x = gutter_width + column * cell_width + (cell_width - text_width) // 2
+        draw.text((x, LABEL_PADDING), str(label), fill="black", font=font)
+
+    for row_index, row in enumerate(rows):
+        top = header_height + row_index * cell_height
+        if row_labels and row_index < len(row_labels) and row_labels[row_index]:
+            _, text_height = _text_size(draw, str(row_labels[row_index]), font)
+            draw.text(
+                (LABEL_PADDING, top + (cell_height - text_height) // 2),
+                str(row_labels[row_index]),
+                fill="black",
+                font=font,
+            )
+        for column, image in enumerate(row):
+            if image is not None:
+                left = gutter_width + column * cell_width
+                sheet.paste(image.convert("RGB"), (left, top))
+
+    return sheet
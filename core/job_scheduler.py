@@ -0,0 +1,305 @@
+import time
+import uuid
+import heapq
+import logging
+import itertools
+import threading
+from collections import deque
+from concurrent.futures import Future
+from .metrics import metrics
+
+logger = logging.getLogger("arttic_lab")
+
+MAX_FINISHED_JOBS = 256
+MAX_BATCH_SIZE = 4
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    def __init__(
+        self,
+        kind,
+        func,
+        kwargs=None,
+        client_id=None,
+        priority=0,
+        on_update=None,
+        cancellable=False,
+        batch_key=None,
+        batch_func=None,
+    ):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.func = func
+        self.kwargs = kwargs or {}
+        self.client_id = client_id
+        self.priority = priority
+        self.on_update = on_update
+        self.cancellable = cancellable
+        self.batch_key = batch_key
+        self.batch_func = batch_func
+        self.cancel_event = threading.Event()
+        self.future = Future()
+        self.status = QUEUED
+        self.position = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "position": self.position,
+        }
+
+    def _notify(self):
+        if self.on_update:
+            try:
+                self.on_update(self)
+            except Exception as e:
+                logger.warning(f"Job update callback failed for {self.id}: {e}")
+
+
+class JobScheduler:
+    """Serializes every job that touches the loaded pipeline.
+
+    Jobs run one at a time on a single worker thread, ordered by priority
+    (lower runs first) and then by arrival. Running jobs flagged as
+    cancellable receive a `cancel_event` keyword they are expected to poll.
+
+    Jobs submitted with a `batch_key` may be coalesced: when one is picked,
+    queued jobs with an equal key are pulled into the same run (up to
+    `max_batch_size`) and handed to `batch_func` together. The scan stops
+    at the first queued job without a batch key, so nothing is reordered
+    across barriers such as a model load.
+    """
+
+    def __init__(
+        self, max_finished_jobs=MAX_FINISHED_JOBS, max_batch_size=MAX_BATCH_SIZE
+    ):
+        self._heap = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._jobs = {}
+        self._finished = deque()
+        self._max_finished_jobs = max_finished_jobs
+        self.max_batch_size = max_batch_size
+        self._running = None
+        self._thread = None
+
+    def submit(
+        self,
+        kind,
+        func,
+        kwargs=None,
+        client_id=None,
+        priority=0,
+        on_update=None,
+        cancellable=False,
+        batch_key=None,
+        batch_func=None,
+    ):
+        job = Job(
+            kind,
+            func,
+            kwargs,
+            client_id,
+            priority,
+            on_update,
+            cancellable,
+            batch_key,
+            batch_func,
+        )
+        with self._cond:
+            heapq.heappush(self._heap, (priority, next(self._counter), job))
+            self._jobs[job.id] = job
+            self._ensure_started()
+            self._cond.notify()
+        logger.info(f"Queued {kind} job {job.id[:8]}.")
+        self._publish_positions()
+        return job
+
+    def get(self, job_id):
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def queue_depth(self):
+        with self._cond:
+            queued = sum(1 for _, _, job in self._heap if job.status == QUEUED)
+            return queued + (len(self._running) if self._running else 0)
+
+    def cancel(self, job_id, client_id=None):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or (client_id is not None and job.client_id != client_id):
+                return False
+            if job.status == QUEUED:
+                # Left in the heap and skipped by the worker when popped.
+                self._mark_finished(job, CANCELLED)
+            elif job.status == RUNNING and job.cancellable:
+                job.cancel_event.set()
+                logger.info(f"Cancellation requested for running job {job_id[:8]}.")
+                return True
+            else:
+                return False
+
+        job.future.set_exception(JobCancelled("Job was cancelled before it started."))
+        job._notify()
+        self._publish_positions()
+        return True
+
+    def cancel_client_jobs(self, client_id):
+        with self._cond:
+            job_ids = [
+                job.id
+                for job in self._jobs.values()
+                if job.client_id == client_id and job.status in (QUEUED, RUNNING)
+            ]
+        for job_id in job_ids:
+            self.cancel(job_id, client_id)
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run, name="arttic-job-scheduler", daemon=True
+            )
+            self._thread.start()
+
+    def _mark_finished(self, job, status):
+        job.status = status
+        job.position = None
+        job.finished_at = time.time()
+        metrics.inc("arttic_jobs_total", kind=job.kind, status=status)
+        self._finished.append(job.id)
+        while len(self._finished) > self._max_finished_jobs:
+            self._jobs.pop(self._finished.popleft(), None)
+
+    def _publish_positions(self):
+        with self._cond:
+            queued = sorted(
+                (entry for entry in self._heap if entry[2].status == QUEUED),
+                key=lambda entry: entry[:2],
+            )
+            offset = 1 if self._running else 0
+            changed = []
+            for index, (_, _, job) in enumerate(queued):
+                position = index + offset
+                if job.position != position:
+                    job.position = position
+                    changed.append(job)
+        for job in changed:
+            job._notify()
+
+    def _start_job(self, job):
+        job.status = RUNNING
+        job.position = 0
+        job.started_at = time.time()
+        metrics.observe(
+            "arttic_queue_wait_seconds", job.started_at - job.created_at, kind=job.kind
+        )
+
+    def _collect_batch(self, first):
+        batch = [first]
+        if first.batch_key is None or self.max_batch_size <= 1:
+            return batch
+        for entry in sorted(self._heap, key=lambda entry: entry[:2]):
+            job = entry[2]
+            if job.status != QUEUED:
+                continue
+            if job.batch_key is None:
+                break
+            if job.batch_key == first.batch_key:
+                self._start_job(job)
+                batch.append(job)
+                if len(batch) >= self.max_batch_size:
+                    break
+        return batch
+
+    def _next_batch(self):
+        with self._cond:
+            while True:
+                while not self._heap:
+                    self._cond.wait()
+                _, _, job = heapq.heappop(self._heap)
+                if job.status == QUEUED:
+                    self._start_job(job)
+                    batch = self._collect_batch(job)
+                    self._running = batch
+                    return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            for job in batch:
+                job._notify()
+            self._publish_positions()
+
+            if len(batch) > 1:
+                self._run_batch(batch)
+            else:
+                self._run_single(batch[0])
+
+    def _run_single(self, job):
+        kwargs = dict(job.kwargs)
+        if job.cancellable:
+            kwargs["cancel_event"] = job.cancel_event
+
+        try:
+            result = job.func(**kwargs)
+        except JobCancelled as e:
+            logger.info(f"Job {job.id[:8]} cancelled.")
+            self._complete([job], [(CANCELLED, e)])
+        except Exception as e:
+            self._complete([job], [(FAILED, e)])
+        else:
+            self._complete([job], [(DONE, result)])
+
+    def _run_batch(self, batch):
+        logger.info(f"Running {len(batch)} '{batch[0].kind}' jobs as one batch.")
+        cancel_events = [job.cancel_event for job in batch]
+        try:
+            results = batch[0].batch_func(
+                [dict(job.kwargs) for job in batch], cancel_events=cancel_events
+            )
+        except Exception as e:
+            status = CANCELLED if isinstance(e, JobCancelled) else FAILED
+            self._complete(batch, [(status, e)] * len(batch))
+            return
+
+        outcomes = []
+        for result in results:
+            if isinstance(result, JobCancelled):
+                outcomes.append((CANCELLED, result))
+            elif isinstance(result, Exception):
+                outcomes.append((FAILED, result))
+            else:
+                outcomes.append((DONE, result))
+        self._complete(batch, outcomes)
+
+    def _complete(self, jobs, outcomes):
+        with self._cond:
+            self._running = None
+            for job, (status, _) in zip(jobs, outcomes):
+                self._mark_finished(job, status)
+        for job, (status, value) in zip(jobs, outcomes):
+            if status == DONE:
+                job.future.set_result(value)
+            else:
+                job.future.set_exception(value)
+            job._notify()
+        self._publish_positions()
+
+
+job_scheduler = JobScheduler()
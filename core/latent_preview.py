@@ -0,0 +1,194 @@
+import io
+import time
+import base64
+import asyncio
+import logging
+import threading
+import torch
+from PIL import Image
+
+logger = logging.getLogger("arttic_lab")
+
+PREVIEW_INTERVAL = 0.5
+PREVIEW_MAX_SIZE = 256
+PREVIEW_JPEG_QUALITY = 70
+
+# Linear maps from each latent space to approximate RGB in [-1, 1], as
+# (per-channel RGB weights, RGB bias). Good enough to watch composition and
+# colour emerge at a tiny fraction of the cost of a VAE decode.
+LATENT_RGB_FACTORS = {
+    "sd15": (
+        [
+            [0.3512, 0.2297, 0.3227],
+            [0.3250, 0.4974, 0.2350],
+            [-0.2829, 0.1762, 0.2721],
+            [-0.2120, -0.2616, -0.7177],
+        ],
+        None,
+    ),
+    "sdxl": (
+        [
+            [0.3651, 0.4232, 0.4341],
+            [-0.2533, -0.0042, 0.1068],
+            [0.1076, 0.1111, -0.0362],
+            [-0.3165, -0.2492, -0.2188],
+        ],
+        [0.1084, -0.0175, -0.0011],
+    ),
+    "sd3": (
+        [
+            [-0.0645, 0.0177, 0.1052],
+            [0.0028, 0.0312, 0.0650],
+            [0.1848, 0.0762, 0.0360],
+            [0.0944, 0.0360, 0.0889],
+            [0.0897, 0.0506, -0.0364],
+            [-0.0020, 0.1203, 0.0284],
+            [0.0855, 0.0118, 0.0283],
+            [-0.0539, 0.0658, 0.1047],
+            [-0.0057, 0.0116, 0.0700],
+            [-0.0412, 0.0281, -0.0039],
+            [0.1106, 0.1171, 0.1220],
+            [-0.0248, 0.0682, -0.0481],
+            [0.0815, 0.0846, 0.1207],
+            [-0.0120, -0.0055, -0.0867],
+            [-0.0749, -0.0634, -0.0456],
+            [-0.1418, -0.1457, -0.1259],
+        ],
+        [0.2394, 0.2135, 0.1925],
+    ),
+    "flux": (
+        [
+            [-0.0346, 0.0244, 0.0681],
+            [0.0034, 0.0210, 0.0687],
+            [0.0275, -0.0668, -0.0433],
+            [-0.0174, 0.0160, 0.0617],
+            [0.0859, 0.0721, 0.0329],
+            [0.0004, 0.0383, 0.0115],
+            [0.0405, 0.0861, 0.0915],
+            [-0.0236, -0.0185, -0.0259],
+            [-0.0245, 0.0250, 0.1180],
+            [0.1008, 0.0755, -0.0421],
+            [-0.0515, 0.0201, 0.0011],
+            [0.0428, -0.0012, -0.0036],
+            [0.0817, 0.0765, 0.0749],
+            [-0.1264, -0.0522, -0.1103],
+            [-0.0280, -0.0881, -0.0499],
+            [-0.1262, -0.0982, -0.0778],
+        ],
+        [-0.0329, -0.0718, -0.0851],
+    ),
+}
+
+
+def latents_to_image(latents, latent_format, max_size=PREVIEW_MAX_SIZE):
+    """Project one (C, h, w) latent to a PIL image, or None if unsupported"""
+    factors, bias = LATENT_RGB_FACTORS.get(latent_format, (None, None))
+    if factors is None or latents.shape[0] != len(factors):
+        return None
+    weight = torch.tensor(factors, dtype=torch.float32, device=latents.device)
+    rgb = torch.einsum("chw,cr->hwr", latents.float(), weight)
+    if bias is not None:
+        rgb += torch.tensor(bias, dtype=torch.float32, device=latents.device)
+    rgb = ((rgb + 1) / 2).clamp(0, 1).mul(255).to(torch.uint8).cpu().numpy()
+
+    image = Image.fromarray(rgb)
+    scale = max_size / max(image.size)
+    return image.resize(
+        (max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+        Image.Resampling.BILINEAR,
+    )
+
+
+def encode_preview(image):
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=PREVIEW_JPEG_QUALITY)
+    return "data:image/jpeg;base64," + base64.b64encode(buffer.getvalue()).decode()
+
+
+class PreviewSession:
+    """Throttled previews for one sampling pass.
+
+    `targets` holds a (preview_callback, loop) pair per image in the batch,
+    or None for images nobody asked to preview. The sampling thread only
+    calls `on_step`, which hands a reference to the step's latents to the
+    previewer thread at most once per `interval`.
+    """
+
+    def __init__(self, pipe, targets, steps, width, height, interval=PREVIEW_INTERVAL):
+        self.pipe = pipe
+        self.targets = targets
+        self.steps = steps
+        self.width = width
+        self.height = height
+        self.interval = interval
+        self.closed = False
+        self._last_sent = 0.0
+
+    def on_step(self, step, latents):
+        # The final image follows right after the last step.
+        if step + 1 >= self.steps:
+            return
+        now = time.perf_counter()
+        if now - self._last_sent < self.interval:
+            return
+        self._last_sent = now
+        latent_previewer.submit(self, step + 1, latents.detach())
+
+    def close(self):
+        """Stop sending previews; the finished image supersedes them"""
+        self.closed = True
+
+    def render(self, step, latents):
+        latents = self.pipe.preview_latents(latents, self.width, self.height)
+        for index, target in enumerate(self.targets):
+            if target is None or self.closed:
+                continue
+            image = latents_to_image(latents[index], self.pipe.LATENT_FORMAT)
+            if image is None:
+                return
+            preview_callback, loop = target
+            asyncio.run_coroutine_threadsafe(
+                preview_callback(
+                    {"image": encode_preview(image), "step": step, "steps": self.steps}
+                ),
+                loop,
+            )
+
+
+class LatentPreviewer:
+    """Renders previews on a dedicated thread, newest frame first.
+
+    Only one frame waits at a time: submitting while the worker is busy
+    replaces the waiting frame, so a slow client or encoder drops stale
+    previews instead of holding on to old latents.
+    """
+
+    def __init__(self):
+        self._pending = None
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def submit(self, session, step, latents):
+        with self._cond:
+            self._pending = (session, step, latents)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="arttic-latent-preview", daemon=True
+                )
+                self._thread.start()
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None:
+                    self._cond.wait()
+                session, step, latents = self._pending
+                self._pending = None
+            try:
+                session.render(step, latents)
+            except Exception as e:
+                logger.debug(f"Could not render a latent preview: {e}")
+
+
+latent_previewer = LatentPreviewer()
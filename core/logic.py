@@ -4,11 +4,10 @@ import time
 import random
 import logging
 import math
-import re
 import asyncio
 import sys
 import subprocess
-from glob import glob
+from datetime import datetime
 from diffusers import (
     EulerAncestralDiscreteScheduler,
     EulerDiscreteScheduler,
@@ -17,10 +16,23 @@ from diffusers import (
     DDIMScheduler,
     UniPCMultistepScheduler,
 )
-from pipelines import get_pipeline_for_model
+from pipelines import get_pipeline_for_model, architecture_detector, artifact_cache
+from pipelines.backends import get_backend, select_backend
 from pipelines.sdxl_pipeline import SDXLPipeline
 from .prompt_book import prompt_book
 from .metadata_handler import metadata_handler
+from .gallery_index import gallery_index
+from .output_allocator import output_allocator
+from .output_writer import output_writer
+from .job_scheduler import job_scheduler, JobCancelled
+from .image_grid import make_image_grid, grid_shape
+from .model_cache import model_cache
+from .model_catalog import model_catalog, describe_entry, DEFAULT_RESOLUTIONS
+from .metrics import metrics
+from .embedding_cache import embedding_cache
+from .lora_manager import lora_manager
+from .memory_model import memory_model
+from .latent_preview import PreviewSession
 from pipelines.sd2_pipeline import SD2Pipeline
 from pipelines.sd3_pipeline import SD3Pipeline
 from pipelines.flux_pipeline import ArtTicFLUXPipeline
@@ -34,6 +46,7 @@ app_state = {
     "current_pipe": None,
     "current_model_name": "",
     "current_lora_name": "",
+    "current_scheduler_name": "",
     "is_model_loaded": False,
     "status_message": "No model loaded.",
     "current_cpu_offload_state": False,
@@ -45,7 +58,13 @@ app_state = {
 
 APP_LOGGER_NAME = "arttic_lab"
 RESTART_EXIT_CODE = 21
+GALLERY_PAGE_SIZE = 60
 logger = logging.getLogger(APP_LOGGER_NAME)
+OUTPUT_FORMATS = ("png", "webp")
+output_settings = {"format": "png", "png_compress_level": 4}
+BATCH_SWEEP_PARAMS = ("steps", "guidance", "seed", "scheduler")
+MAX_BATCH_IMAGES = 64
+
 SCHEDULER_MAP = {
     "Euler A": EulerAncestralDiscreteScheduler,
     "DPM++ 2M": DPMSolverMultistepScheduler,
@@ -56,6 +75,31 @@ SCHEDULER_MAP = {
 }
 
 
+def configure_outputs(image_format="png", png_compress_level=4):
+    if image_format not in OUTPUT_FORMATS:
+        raise ValueError(
+            f"Unsupported output format '{image_format}'. Use one of: {', '.join(OUTPUT_FORMATS)}."
+        )
+    if not 0 <= int(png_compress_level) <= 9:
+        raise ValueError("PNG compression level must be between 0 and 9.")
+    output_settings.update(
+        {"format": image_format, "png_compress_level": int(png_compress_level)}
+    )
+    logger.info(
+        f"Saving outputs as {image_format.upper()}"
+        + (
+            f" (compression level {png_compress_level})."
+            if image_format == "png"
+            else " (lossless)."
+        )
+    )
+
+
+def configure_batching(max_batch_size):
+    job_scheduler.max_batch_size = max(1, int(max_batch_size))
+    logger.info(f"Micro-batching up to {job_scheduler.max_batch_size} requests.")
+
+
 def get_app_status():
     return {
         "is_model_loaded": app_state["is_model_loaded"],
@@ -64,72 +108,115 @@ def get_app_status():
 
 
 def get_config():
+    gallery_page = get_gallery_page()
     return {
         "models": get_available_models(),
         "loras": get_available_loras(),
         "schedulers": list(SCHEDULER_MAP.keys()),
-        "gallery_images": [img for img in get_output_images()],
+        "gallery_images": gallery_page["images"],
+        "gallery_next_cursor": gallery_page["next_cursor"],
+        "gallery_total": gallery_page["total"],
         "prompts": prompt_book.get_all_prompts(),
     }
 
 
 def get_available_models():
-    models_path = os.path.join("./models", "*.safetensors")
-    return sorted(
-        [os.path.basename(p).replace(".safetensors", "") for p in glob(models_path)]
-    )
+    return [entry["name"] for entry in model_catalog.list("model")]
 
 
 def get_available_loras():
-    os.makedirs("./loras", exist_ok=True)
-    loras_path = os.path.join("./loras", "*.safetensors")
-    return sorted(
-        [os.path.basename(p).replace(".safetensors", "") for p in glob(loras_path)]
-    )
+    return [entry["name"] for entry in model_catalog.list("lora")]
 
 
 def get_output_images():
-    outputs_path = os.path.join("./outputs", "*.png")
-    image_files = []
+    return gallery_index.list_images()
 
-    for f in sorted(glob(outputs_path), key=os.path.getmtime, reverse=True):
-        filename = os.path.basename(f)
-        filepath = os.path.join("./outputs", filename)
 
-        metadata = metadata_handler.extract_metadata_from_image(filepath)
+def _parse_gallery_date(value, end_of_day=False):
+    if value in (None, ""):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"Invalid date '{value}'. Use YYYY-MM-DD or ISO 8601.")
+    if end_of_day and len(str(value)) == 10:
+        parsed = parsed.replace(hour=23, minute=59, second=59, microsecond=999999)
+    return parsed.timestamp()
+
+
+def get_gallery_page(
+    cursor=None,
+    limit=GALLERY_PAGE_SIZE,
+    sort="mtime",
+    order="desc",
+    model=None,
+    lora=None,
+    date_from=None,
+    date_to=None,
+    prompt=None,
+):
+    return gallery_index.query(
+        cursor=cursor,
+        limit=limit,
+        sort=sort,
+        order=order,
+        model=model,
+        lora=lora,
+        date_from=_parse_gallery_date(date_from),
+        date_to=_parse_gallery_date(date_to, end_of_day=True),
+        prompt=prompt,
+    )
 
-        image_info = {"filename": filename, "has_metadata": metadata is not None}
 
-        if metadata:
-            image_info.update(
-                {
-                    "prompt_preview": (
-                        metadata.get("prompt", "")[:50] + "..."
-                        if len(metadata.get("prompt", "")) > 50
-                        else metadata.get("prompt", "")
-                    ),
-                    "model_name": metadata.get("model_name", ""),
-                    "timestamp_generation": metadata.get("timestamp_generation", ""),
-                }
-            )
+def get_gallery_item(filename):
+    return gallery_index.get(filename)
 
-        image_files.append(image_info)
 
-    return image_files
+def reconcile_gallery_index():
+    gallery_index.reconcile()
+
+
+def initialize_outputs():
+    os.makedirs("./outputs", exist_ok=True)
+    output_allocator.seed()
+    reconcile_gallery_index()
+
+
+def initialize_catalog():
+    model_catalog.refresh()
+    model_catalog.start_watcher()
 
 
 def get_model_files():
-    models_dir = "./models"
-    os.makedirs(models_dir, exist_ok=True)
-    files = glob(os.path.join(models_dir, "*.safetensors"))
-    return sorted([os.path.basename(f) for f in files])
+    return [entry["filename"] for entry in model_catalog.list("model")]
 
 
 def get_lora_files():
-    loras_dir = "./loras"
-    os.makedirs(loras_dir, exist_ok=True)
-    files = glob(os.path.join(loras_dir, "*.safetensors"))
-    return sorted([os.path.basename(f) for f in files])
+    return [entry["filename"] for entry in model_catalog.list("lora")]
+
+
+def get_model_catalog():
+    return {
+        "models": [describe_entry(entry) for entry in model_catalog.list("model")],
+        "loras": [describe_entry(entry) for entry in model_catalog.list("lora")],
+    }
+
+
+def get_settings_data(refresh=False):
+    if refresh:
+        model_catalog.refresh()
+    catalog = get_model_catalog()
+    return {
+        "models": [entry["filename"] for entry in catalog["models"]],
+        "loras": [entry["filename"] for entry in catalog["loras"]],
+        "file_info": {
+            entry["filename"]: entry for entry in catalog["models"] + catalog["loras"]
+        },
+    }
 
 
 def delete_model_file(filename):
@@ -151,6 +238,7 @@ def delete_model_file(filename):
 
     try:
         os.remove(file_path)
+        _forget_model_file(file_path)
         logger.info(f"Successfully deleted model file: {filename}")
         return {"status": "success", "message": f"Deleted '{filename}'."}
     except Exception as e:
@@ -175,6 +263,7 @@ def delete_lora_file(filename):
 
     try:
         os.remove(file_path)
+        _forget_lora_file(file_path)
         logger.info(f"Successfully deleted lora file: {filename}")
         return {"status": "success", "message": f"Deleted '{filename}'."}
     except Exception as e:
@@ -182,20 +271,27 @@ def delete_lora_file(filename):
         raise IOError(f"Could not delete file '{filename}'.")
 
 
-def _get_next_image_number():
-    files = get_output_images()
-    if not files:
-        return 1
+def _forget_model_file(file_path):
+    model_cache.discard_model(os.path.splitext(os.path.basename(file_path))[0])
+    embedding_cache.discard_model(file_path)
+    architecture_detector.forget(file_path)
+    model_catalog.refresh()
+
+
+def _forget_lora_file(file_path):
+    embedding_cache.clear()
+    lora_manager.discard(os.path.splitext(os.path.basename(file_path))[0])
+    model_catalog.refresh()
+
 
-    highest_num = 0
-    pattern = re.compile(r"ArtTic-LAB_(\d+)\.png")
-    for f in files:
-        match = pattern.match(f["filename"])
-        if match:
-            num = int(match.group(1))
-            if num > highest_num:
-                highest_num = num
-    return highest_num + 1
+def invalidate_file(folder, filename):
+    """Drop cached state for a file deleted by another process"""
+    forget = {"models": _forget_model_file, "loras": _forget_lora_file}.get(folder)
+    if forget is None or not filename:
+        raise ValueError(f"Cannot invalidate '{filename}' in '{folder}'.")
+    forget(os.path.abspath(os.path.join(f"./{folder}", os.path.basename(filename))))
+    logger.info(f"Invalidated cached state for {folder}/{filename}.")
+    return {"status": "success", "message": f"Invalidated '{filename}'."}
 
 
 def delete_image(filename):
@@ -217,6 +313,7 @@ def delete_image(filename):
 
     try:
         os.remove(file_path)
+        gallery_index.remove(os.path.basename(file_path))
         logger.info(f"Successfully deleted image: {filename}")
         return {"status": "success", "message": f"Deleted '{filename}'."}
     except Exception as e:
@@ -224,23 +321,29 @@ def delete_image(filename):
         raise IOError(f"Could not delete file '{filename}'.")
 
 
-def unload_model():
+def unload_model(keep_cached=True):
     if not app_state["is_model_loaded"]:
         logger.info("Unload command received, but no model is currently loaded.")
         return {"status_message": "No model loaded."}
 
     logger.info(f"Unloading model '{app_state['current_model_name']}' from VRAM...")
-    pipe_to_delete = app_state["current_pipe"]
+    pipe_to_unload = app_state["current_pipe"]
 
-    if hasattr(pipe_to_delete, "pipe"):
-        del pipe_to_delete.pipe
-    del pipe_to_delete
+    if keep_cached:
+        key = model_cache.make_key(
+            app_state["current_model_name"], app_state["current_cpu_offload_state"]
+        )
+        model_cache.park(key, pipe_to_unload)
+    elif hasattr(pipe_to_unload, "pipe"):
+        del pipe_to_unload.pipe
+    del pipe_to_unload
 
     app_state.update(
         {
             "current_pipe": None,
             "current_model_name": "",
             "current_lora_name": "",
+            "current_scheduler_name": "",
             "is_model_loaded": False,
             "status_message": "No model loaded.",
             "current_cpu_offload_state": False,
@@ -251,19 +354,48 @@ def unload_model():
         }
     )
 
-    torch.xpu.empty_cache()
+    get_backend().empty_cache()
 
     logger.info("Model unloaded and VRAM cache cleared.")
     return {"status_message": app_state["status_message"]}
 
 
-def _calculate_max_resolution(model_type):
-    if not torch.xpu.is_available():
+def _memory_state(pipe):
+    """MemoryProfile.plan arguments describing the loaded pipeline right now"""
+    backend = get_backend()
+    available = backend.available_memory()
+    if available is None:
+        return None
+    memory = backend.memory_stats()
+    is_flux = isinstance(pipe, ArtTicFLUXPipeline)
+    tiled = app_state["current_vae_tiling_state"] and not is_flux
+    return {
+        "available": available,
+        "total": memory["total"] if memory else available,
+        "tiled": tiled,
+        "can_tile": not tiled and not is_flux,
+        "can_offload": backend.supports_cpu_offload() and not pipe.is_offloaded,
+        "offloaded": pipe.is_offloaded,
+    }
+
+
+def _calculate_max_resolution(model_type, model_name=None, offload=False):
+    pipe = app_state["current_pipe"]
+    profile = memory_model.get(pipe) if pipe else None
+    state = _memory_state(pipe) if profile else None
+    if state:
+        state["can_offload"] = state["can_offload"] and offload
+        return profile.max_side(**state)
+    if offload:
+        return 2048
+
+    memory = get_backend().memory_stats()
+    if memory is None:
         return 1024
 
     GB = 1024**3
-    total_mem = torch.xpu.get_device_properties(0).total_memory / GB
-    reserved_mem = torch.xpu.memory_reserved(0) / GB
+    total_mem = memory["total"] / GB
+    reserved_mem = memory["reserved"] / GB
     free_mem = total_mem - reserved_mem
 
     vram_per_megapixel = {
@@ -279,6 +411,9 @@ def _calculate_max_resolution(model_type):
         "SD 1.5": 0.26,
         "SD 2.x": 0.59,
     }.get(model_type, 1.05)
+    entry = model_catalog.get("model", model_name) if model_name else None
+    if entry and entry["architecture"] in DEFAULT_RESOLUTIONS:
+        base_res_mp = DEFAULT_RESOLUTIONS[entry["architecture"]] ** 2 / 1024**2
 
     try:
         effective_free_mem = max(0, free_mem - 0.25)
@@ -305,70 +440,85 @@ def load_model(
 
     lora_name = lora_name if lora_name != "None" else ""
 
+    def update_progress(progress, desc):
+        if progress_callback and loop:
+            asyncio.run_coroutine_threadsafe(progress_callback(progress, desc), loop)
+
     if (
         app_state["is_model_loaded"]
         and app_state["current_model_name"] == model_name
-        and app_state["current_lora_name"] == lora_name
         and app_state["current_cpu_offload_state"] == cpu_offload
         and app_state["current_vae_tiling_state"] == vae_tiling
     ):
-        logger.info(
-            f"Model '{model_name}' with the same configuration is already loaded. Skipping."
+        if app_state["current_scheduler_name"] != scheduler_name:
+            set_scheduler(scheduler_name)
+        if app_state["current_lora_name"] == lora_name:
+            logger.info(
+                f"Model '{model_name}' with the same configuration is already loaded. Skipping."
+            )
+        else:
+            # LoRAs are adapters on the loaded model; no reload needed.
+            with _load_stage("lora"):
+                _set_default_lora(app_state["current_pipe"], lora_name, update_progress)
+            app_state["status_message"] = _ready_status_message()
+            update_progress(1, "Model Ready!")
+        max_res_vram = _calculate_max_resolution(
+            app_state["current_model_type"], model_name
+        )
+        max_res_offload = _calculate_max_resolution(
+            app_state["current_model_type"], model_name, offload=True
         )
-        max_res_vram = _calculate_max_resolution(app_state["current_model_type"])
         return {
             "status_message": app_state["status_message"],
             "model_type": app_state["current_model_type"],
             "width": app_state["default_width"],
             "height": app_state["default_height"],
             "max_res_vram": max_res_vram,
-            "max_res_offload": 2048,
+            "max_res_offload": max_res_offload,
         }
 
-    def update_progress(progress, desc):
-        if progress_callback and loop:
-            asyncio.run_coroutine_threadsafe(progress_callback(progress, desc), loop)
-
     try:
         if app_state["is_model_loaded"]:
             unload_model()
 
         logger.info(f"Loading model: {model_name}...")
         update_progress(0, f"Getting pipeline for {model_name}...")
+        load_start = time.perf_counter()
 
-        pipe = get_pipeline_for_model(model_name)
-        pipe.load_pipeline(update_progress)
-        pipe.place_on_device(use_cpu_offload=cpu_offload)
-
-        if lora_name:
-            lora_path = os.path.join("./loras", f"{lora_name}.safetensors")
-            if os.path.exists(lora_path):
-                logger.info(f"Loading LoRA: {lora_name}")
-                update_progress(0.7, f"Loading LoRA: {lora_name}")
-                pipe.pipe.load_lora_weights(lora_path)
-                app_state["current_lora_name"] = lora_name
-            else:
-                logger.warning(f"LoRA file not found: {lora_path}. Skipping.")
-                app_state["current_lora_name"] = ""
+        with _load_stage("cache_restore"):
+            pipe = _restore_cached_model(model_name, cpu_offload)
+        if pipe:
+            load_source = "cache"
+            update_progress(0.5, f"Restoring {model_name} from the model cache...")
         else:
-            app_state["current_lora_name"] = ""
-
-        pipe.optimize_with_ipex(update_progress)
-
-        if not isinstance(pipe, (SD3Pipeline, ArtTicFLUXPipeline)):
-            logger.info(f"Setting scheduler to: {scheduler_name}")
-            SchedulerClass = SCHEDULER_MAP[scheduler_name]
-            pipe.pipe.scheduler = SchedulerClass.from_config(pipe.pipe.scheduler.config)
+            load_source = "disk"
+            catalog_entry = model_catalog.get("model", model_name)
+            with _load_stage("detect"):
+                pipe = get_pipeline_for_model(
+                    model_name,
+                    model_hash=catalog_entry["hash"] if catalog_entry else None,
+                )
+            with _load_stage("from_single_file"):
+                pipe.load_pipeline(update_progress)
+            with _load_stage("place_on_device"):
+                pipe.place_on_device(use_cpu_offload=cpu_offload)
+
+            with _load_stage("optimize"):
+                pipe.optimize_for_device(update_progress)
+
+        with _load_stage("lora"):
+            _set_default_lora(pipe, lora_name, update_progress)
+
+        with _load_stage("scheduler"):
+            _apply_scheduler(pipe, scheduler_name)
+            app_state["current_scheduler_name"] = scheduler_name
 
         if not isinstance(pipe, ArtTicFLUXPipeline):
-            if vae_tiling:
-                logger.info("Enabling VAE Slicing & Tiling.")
-                pipe.pipe.enable_vae_slicing()
-                pipe.pipe.enable_vae_tiling()
-            else:
-                logger.info("Disabling VAE Slicing & Tiling.")
-                pipe.pipe.disable_vae_slicing()
-                pipe.pipe.disable_vae_tiling()
+            with _load_stage("vae_tiling"):
+                logger.info(
+                    f"{'Enabling' if vae_tiling else 'Disabling'} VAE Slicing & Tiling."
+                )
+                _set_vae_tiling(pipe, vae_tiling)
         else:
             logger.info("VAE Tiling is not applicable for FLUX models.")
 
@@ -394,31 +544,32 @@ def load_model(
             default_res = 512
 
         status_suffix = "(CPU Offload)" if cpu_offload else ""
-        lora_suffix = (
-            f" + {app_state['current_lora_name']}"
-            if app_state["current_lora_name"]
-            else ""
-        )
-        status_message = (
-            f"Ready: {model_name} ({model_type}){lora_suffix} {status_suffix}"
-        )
-
         app_state.update(
             {
-                "status_message": status_message,
                 "is_model_loaded": True,
                 "current_model_type": model_type,
                 "default_width": default_res,
                 "default_height": default_res,
             }
         )
+        with _load_stage("calibrate"):
+            memory_model.ensure(pipe, default_res, update_progress)
 
+        status_message = app_state["status_message"] = _ready_status_message()
+
+        load_time = time.perf_counter() - load_start
+        metrics.observe("arttic_model_load_seconds", load_time, source=load_source)
+        metrics.inc("arttic_model_loads_total", source=load_source)
         logger.info(
-            f"Model '{model_name}' is ready! Type: {model_type} {status_suffix}."
+            f"Model '{model_name}' is ready in {load_time:.2f}s! "
+            f"Type: {model_type} {status_suffix}."
         )
         update_progress(1, "Model Ready!")
 
-        max_res_vram = _calculate_max_resolution(model_type)
+        max_res_vram = _calculate_max_resolution(model_type, model_name)
+        max_res_offload = _calculate_max_resolution(
+            model_type, model_name, offload=True
+        )
 
         return {
             "status_message": status_message,
@@ -426,18 +577,215 @@ def load_model(
             "width": default_res,
             "height": default_res,
             "max_res_vram": max_res_vram,
-            "max_res_offload": 2048,
+            "max_res_offload": max_res_offload,
         }
     except Exception as e:
         logger.error(
             f"Failed to load model '{model_name}'. Full error: {e}", exc_info=True
         )
-        unload_model()
+        unload_model(keep_cached=False)
         raise RuntimeError(
             f"Failed to load model '{model_name}'. Check logs for details."
         )
 
 
+def _set_vae_tiling(pipe, enabled):
+    if enabled:
+        pipe.pipe.enable_vae_slicing()
+        pipe.pipe.enable_vae_tiling()
+    else:
+        pipe.pipe.disable_vae_slicing()
+        pipe.pipe.disable_vae_tiling()
+
+
+def _ready_status_message():
+    status_suffix = "(CPU Offload)" if app_state["current_cpu_offload_state"] else ""
+    lora_suffix = (
+        f" + {app_state['current_lora_name']}" if app_state["current_lora_name"] else ""
+    )
+    return (
+        f"Ready: {app_state['current_model_name']} "
+        f"({app_state['current_model_type']}){lora_suffix} {status_suffix}"
+    )
+
+
+def _set_default_lora(pipe, lora_name, update_progress):
+    """Attach the LoRA chosen at load time, used when a request names none"""
+    app_state["current_lora_name"] = ""
+    if not lora_name:
+        return
+    try:
+        update_progress(0.7, f"Loading LoRA: {lora_name}")
+        lora_manager.preload(pipe, lora_name)
+    except ValueError as e:
+        logger.warning(f"{e} Skipping.")
+        return
+    app_state["current_lora_name"] = lora_name
+
+
+def get_metrics_text():
+    backend = get_backend()
+    memory = backend.memory_stats()
+    if memory:
+        for kind, value in memory.items():
+            metrics.set("arttic_device_memory_bytes", value, kind=kind)
+    metrics.set("arttic_queue_depth", job_scheduler.queue_depth())
+    return metrics.render()
+
+
+def _load_stage(stage):
+    return metrics.span("arttic_model_load_stage_seconds", stage=stage)
+
+
+def supports_schedulers(pipe=None):
+    """Whether the sampler can be chosen; SD3 and FLUX use flow matching"""
+    pipe = pipe or app_state["current_pipe"]
+    return not isinstance(pipe, (SD3Pipeline, ArtTicFLUXPipeline))
+
+
+def _scheduler_for(pipe, scheduler_name):
+    """The pipeline's own instance of `scheduler_name`, built on first use.
+
+    Instances are kept on the pipeline, so they live as long as the model
+    does, model cache included, and are all built from the checkpoint's
+    scheduler config rather than from whichever sampler ran last. They hold
+    per-run state, so only the generation job running on the pipeline may
+    install one.
+    """
+    if scheduler_name not in SCHEDULER_MAP:
+        raise ValueError(f"Unknown scheduler '{scheduler_name}'.")
+    if getattr(pipe, "schedulers", None) is None:
+        pipe.schedulers = {}
+        pipe.scheduler_config = pipe.pipe.scheduler.config
+    scheduler = pipe.schedulers.get(scheduler_name)
+    if scheduler is None:
+        SchedulerClass = SCHEDULER_MAP[scheduler_name]
+        scheduler = pipe.schedulers[scheduler_name] = SchedulerClass.from_config(
+            pipe.scheduler_config
+        )
+    return scheduler
+
+
+def _apply_scheduler(pipe, scheduler_name):
+    if not supports_schedulers(pipe):
+        return False
+    logger.info(f"Setting scheduler to: {scheduler_name}")
+    pipe.pipe.scheduler = _scheduler_for(pipe, scheduler_name)
+    return True
+
+
+def set_scheduler(scheduler_name):
+    """Change the default sampler for requests that do not pick their own.
+
+    Takes effect from the next generation, so it is safe while one runs.
+    """
+    if not app_state["is_model_loaded"]:
+        raise ConnectionAbortedError("Cannot change the scheduler, no model is loaded.")
+    if scheduler_name not in SCHEDULER_MAP:
+        raise ValueError(f"Unknown scheduler '{scheduler_name}'.")
+    app_state["current_scheduler_name"] = scheduler_name
+    if not supports_schedulers():
+        return False
+    logger.info(f"Default scheduler set to: {scheduler_name}")
+    return True
+
+
+def _restore_cached_model(model_name, cpu_offload):
+    pipe = model_cache.checkout(model_cache.make_key(model_name, cpu_offload))
+    if pipe is None:
+        return None
+    try:
+        pipe.restore_to_device()
+    except Exception as e:
+        logger.warning(
+            f"Could not restore cached model '{model_name}', reloading from disk: {e}"
+        )
+        if hasattr(pipe, "pipe"):
+            del pipe.pipe
+        get_backend().empty_cache()
+        return None
+    logger.info(f"Restored '{model_name}' from the model cache.")
+    return pipe
+
+
+def configure_model_cache(ram_budget_gb):
+    model_cache.configure(ram_budget_gb)
+
+
+def configure_embedding_cache(budget_mb):
+    embedding_cache.configure(budget_mb)
+
+
+def configure_lora_cache(budget_mb, fuse=False):
+    lora_manager.configure(budget_mb, fuse)
+
+
+def configure_memory_model(calibrate=False):
+    memory_model.configure(calibrate)
+
+
+def configure_device(device="auto", threads=None):
+    select_backend(device, threads)
+
+
+def configure_artifact_cache(enabled):
+    artifact_cache.configure(enabled)
+
+
+def get_worker_status():
+    """What a front router needs to place jobs on this process"""
+    backend = get_backend()
+    return {
+        "is_model_loaded": app_state["is_model_loaded"],
+        "model_name": app_state["current_model_name"],
+        "lora_name": app_state["current_lora_name"],
+        "scheduler_name": app_state["current_scheduler_name"],
+        "cpu_offload": app_state["current_cpu_offload_state"],
+        "cached_models": model_cache.cached_models(),
+        "queue_depth": job_scheduler.queue_depth(),
+        "device": backend.describe(),
+        "memory": backend.memory_stats(),
+    }
+
+
+def _ensure_model(model, progress_callback=None, loop=None):
+    """Load `model` (load_model arguments) unless it is what is loaded"""
+    if model:
+        load_model(**model, progress_callback=progress_callback, loop=loop)
+
+
+def generation_batch_key(
+    steps,
+    guidance,
+    width,
+    height,
+    lora_weight,
+    model=None,
+    loras=None,
+    scheduler=None,
+    **_,
+):
+    """Requests with equal keys can share one batched pipeline call."""
+    try:
+        return (
+            "generate_image",
+            int(steps),
+            float(guidance),
+            int(width),
+            int(height),
+            float(lora_weight or 0),
+            tuple(sorted(model.items())) if model else None,
+            (
+                tuple((lora["name"], float(lora["weight"])) for lora in loras)
+                if loras is not None
+                else None
+            ),
+            scheduler,
+        )
+    except (TypeError, ValueError):
+        return None
+
+
 def generate_image(
     prompt,
     negative_prompt,
@@ -449,83 +797,709 @@ def generate_image(
     lora_weight,
     progress_callback=None,
     loop=None,
+    completion_callback=None,
+    cancel_event=None,
+    init_image=None,
+    strength=None,
+    preview_callback=None,
+    model=None,
+    loras=None,
+    scheduler=None,
 ):
+    """Run the sampler and hand the image to the output writer.
+
+    Without a completion_callback this blocks until the file is on disk.
+    With one, it returns as soon as sampling finishes and the callback is
+    scheduled on `loop` once the write lands, so the caller can start the
+    next job while the previous image is still being encoded. Setting
+    `cancel_event` aborts sampling at the next step with JobCancelled, and
+    a `preview_callback` receives throttled low-resolution previews.
+    A `model` (load_model arguments) is loaded first if it is not active.
+    `loras` ([{"name", "weight"}]) replaces the loaded LoRA for this image
+    and `scheduler` the sampler chosen at load time.
+    """
+    _ensure_model(model, progress_callback, loop)
+    request = {
+        "prompt": prompt,
+        "negative_prompt": negative_prompt,
+        "steps": steps,
+        "guidance": guidance,
+        "seed": seed,
+        "width": width,
+        "height": height,
+        "lora_weight": lora_weight,
+        "progress_callback": progress_callback,
+        "loop": loop,
+        "completion_callback": completion_callback,
+        "preview_callback": preview_callback,
+        "init_image": init_image,
+        "loras": loras,
+        "scheduler": scheduler,
+    }
+    result = _run_generation([request], [cancel_event])[0]
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+def generate_image_batch(requests, cancel_events=None):
+    """Run compatible generate_image requests as one batched pipeline call.
+
+    `requests` are generate_image keyword dicts sharing a generation_batch_key.
+    Returns one entry per request: its result, or the exception for it.
+    """
+    cancel_events = cancel_events or [None] * len(requests)
+    first = requests[0]
+    _ensure_model(first.get("model"), first.get("progress_callback"), first.get("loop"))
+    try:
+        return _run_generation(requests, cancel_events)
+    except OOMError:
+        if len(requests) == 1:
+            raise
+        logger.warning(
+            f"Batch of {len(requests)} ran out of memory. Retrying one at a time."
+        )
+
+    results = []
+    for request, cancel_event in zip(requests, cancel_events):
+        try:
+            results.extend(_run_generation([request], [cancel_event]))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+def _parse_sweep_axis(axis):
+    if not axis:
+        return None
+    param = axis.get("param")
+    if param not in BATCH_SWEEP_PARAMS:
+        raise ValueError(
+            f"Cannot sweep '{param}'. Use one of: {', '.join(BATCH_SWEEP_PARAMS)}."
+        )
+    values = axis.get("values")
+    if isinstance(values, str):
+        values = [value.strip() for value in values.split(",") if value.strip()]
+    if not values:
+        raise ValueError(f"The '{param}' sweep needs at least one value.")
+    if param == "scheduler":
+        if not supports_schedulers():
+            raise ValueError("This model does not support switching schedulers.")
+        unknown = [value for value in values if value not in SCHEDULER_MAP]
+        if unknown:
+            raise ValueError(f"Unknown scheduler(s): {', '.join(unknown)}.")
+        return param, list(values)
+    cast = {"steps": int, "guidance": float, "seed": int}[param]
+    try:
+        return param, [cast(value) for value in values]
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid value in the '{param}' sweep.")
+
+
+def _axis_label(param, value):
+    return value if param == "scheduler" else f"{param}: {value}"
+
+
+def generate_batch(
+    prompt,
+    negative_prompt,
+    steps,
+    guidance,
+    seed,
+    width,
+    height,
+    lora_weight,
+    batch_size=1,
+    n_iter=1,
+    x_axis=None,
+    y_axis=None,
+    make_grid=False,
+    progress_callback=None,
+    loop=None,
+    item_callback=None,
+    cancel_event=None,
+    model=None,
+    loras=None,
+    scheduler=None,
+):
+    """Generate several images against the loaded model in one job.
+
+    Each of the `n_iter` iterations samples `batch_size` images in a single
+    pipeline call, once per cell of the optional X/Y sweep. Axes are
+    {"param": "steps" | "guidance" | "seed" | "scheduler", "values": [...]}.
+    Seeds advance per image from `seed` (random if unset) and repeat across
+    cells so the sweep compares like with like. Every finished image is
+    passed to `item_callback` on `loop`; `make_grid` also saves a contact
+    sheet of the whole run. A `model` is loaded first, as in generate_image,
+    and `scheduler` is the sampler for cells the sweep does not set.
+    """
+    _ensure_model(model, progress_callback, loop)
     if not app_state["is_model_loaded"]:
         raise ConnectionAbortedError("Cannot generate, no model is loaded.")
 
-    logger.info("Starting image generation...")
+    batch_size = max(1, int(batch_size or 1))
+    n_iter = max(1, int(n_iter or 1))
+    x_sweep = _parse_sweep_axis(x_axis)
+    y_sweep = _parse_sweep_axis(y_axis)
+    x_values = x_sweep[1] if x_sweep else [None]
+    y_values = y_sweep[1] if y_sweep else [None]
+    samples_per_cell = batch_size * n_iter
+    total = samples_per_cell * len(x_values) * len(y_values)
+    if total > MAX_BATCH_IMAGES:
+        raise ValueError(
+            f"A batch may produce at most {MAX_BATCH_IMAGES} images, this one asks for {total}."
+        )
+
+    base_seed = int(seed) if seed is not None else random.randint(0, 2**32 - 1)
+    base_request = {
+        "prompt": prompt,
+        "negative_prompt": negative_prompt,
+        "steps": steps,
+        "guidance": guidance,
+        "width": width,
+        "height": height,
+        "lora_weight": lora_weight,
+        "loras": loras,
+        "scheduler": scheduler,
+        "completion_callback": item_callback,
+        "loop": loop,
+    }
+
+    logger.info(f"Starting batch of {total} images...")
     start_time = time.time()
-    seed = int(seed if seed is not None else random.randint(0, 2**32 - 1))
-    generator = torch.Generator("xpu").manual_seed(seed)
+
+    results = []
+    saved_futures = []
+    cells = {}
+    done = 0
+    for iteration in range(n_iter):
+        for row, y_value in enumerate(y_values):
+            for column, x_value in enumerate(x_values):
+                if cancel_event is not None and cancel_event.is_set():
+                    raise JobCancelled("Batch was cancelled.")
+                overrides = {}
+                for sweep, value in ((x_sweep, x_value), (y_sweep, y_value)):
+                    if sweep:
+                        overrides[sweep[0]] = value
+
+                cell_seed = int(overrides.pop("seed", base_seed))
+                requests = []
+                for sample in range(batch_size):
+                    index = iteration * batch_size + sample
+                    requests.append(
+                        {
+                            **base_request,
+                            **overrides,
+                            "seed": (cell_seed + index) % 2**32,
+                            "batch_item": {
+                                "index": done + sample,
+                                "total": total,
+                                "x": x_value,
+                                "y": y_value,
+                            },
+                        }
+                    )
+
+                if progress_callback and loop:
+
+                    async def cell_progress(progress, desc, offset=done):
+                        await progress_callback(
+                            (offset + progress * batch_size) / total,
+                            f"Image {offset + 1}/{total}: {desc}",
+                        )
+
+                    requests[0]["progress_callback"] = cell_progress
+
+                outputs = []
+                cell_results = _run_generation(
+                    requests, [cancel_event] * batch_size, outputs=outputs
+                )
+                results.extend(
+                    result
+                    for result in cell_results
+                    if not isinstance(result, Exception)
+                )
+                saved_futures.extend(saved for _, saved in outputs)
+                if make_grid:
+                    cells.setdefault((row, column), []).extend(
+                        image for image, _ in outputs
+                    )
+                done += batch_size
+
+    for saved in saved_futures:
+        saved.exception()
+    if cancel_event is not None and cancel_event.is_set():
+        raise JobCancelled("Batch was cancelled.")
+
+    generation_time = time.time() - start_time
+    info_text = f"Generated {total} images in {generation_time:.2f}s on '{app_state['current_model_name']}' starting at seed {base_seed}."
+    logger.info(info_text)
+    grid = None
+    if make_grid:
+        grid = _save_batch_grid(
+            base_request,
+            cells,
+            x_sweep,
+            y_sweep,
+            samples_per_cell,
+            base_seed,
+            [result["image_filename"] for result in results],
+        )
+    return {"images": results, "grid": grid, "info": info_text}
+
+
+def _save_batch_grid(
+    request, cells, x_sweep, y_sweep, samples_per_cell, base_seed, filenames
+):
+    if x_sweep or y_sweep:
+        x_values = x_sweep[1] if x_sweep else [None]
+        y_values = y_sweep[1] if y_sweep else [None]
+        rows, row_labels = [], []
+        for row, y_value in enumerate(y_values):
+            for sample in range(samples_per_cell):
+                rows.append(
+                    [
+                        cells.get((row, column), [None] * samples_per_cell)[sample]
+                        for column in range(len(x_values))
+                    ]
+                )
+                row_labels.append(
+                    _axis_label(y_sweep[0], y_value) if y_sweep and sample == 0 else ""
+                )
+        column_labels = (
+            [_axis_label(x_sweep[0], value) for value in x_values] if x_sweep else None
+        )
+        sheet = make_image_grid(
+            rows,
+            column_labels=column_labels,
+            row_labels=row_labels if y_sweep else None,
+        )
+    else:
+        images = cells.get((0, 0), [])
+        row_count, column_count = grid_shape(len(images))
+        sheet = make_image_grid(
+            [
+                images[row * column_count : (row + 1) * column_count]
+                for row in range(row_count)
+            ]
+        )
+
+    grid_info = {"images": filenames}
+    for name, sweep in (("x_axis", x_sweep), ("y_axis", y_sweep)):
+        if sweep:
+            grid_info[name] = {"param": sweep[0], "values": sweep[1]}
+    metadata = metadata_handler.create_metadata(
+        prompt=request["prompt"],
+        negative_prompt=request["negative_prompt"],
+        model_name=app_state["current_model_name"],
+        seed=base_seed,
+        width=sheet.width,
+        height=sheet.height,
+        steps=request["steps"],
+        cfg_scale=request["guidance"],
+        lora_info=_lora_info(_request_loras(request)),
+        extra={"grid": grid_info},
+    )
+    result, saved = _queue_output(
+        {**request, "batch_item": {"grid": True}},
+        sheet,
+        metadata,
+        f"Contact sheet of {len(filenames)} images.",
+    )
+    saved.exception()
+    return result
+
+
+def _run_generation(requests, cancel_events, outputs=None):
+    if not app_state["is_model_loaded"]:
+        raise ConnectionAbortedError("Cannot generate, no model is loaded.")
+
+    first = requests[0]
+    steps = int(first["steps"])
+    batch_size = len(requests)
+    vae_tiling = _admit_generation(
+        int(first["width"]), int(first["height"]), batch_size
+    )
+
+    if any(request.get("init_image") for request in requests):
+        logger.warning("Img2Img is not supported yet. Ignoring the input image.")
+
+    if batch_size == 1:
+        logger.info("Starting image generation...")
+    else:
+        logger.info(f"Starting batched generation of {batch_size} images...")
+    start_time = time.time()
+
+    seeds = [
+        int(
+            request["seed"]
+            if request.get("seed") is not None
+            else random.randint(0, 2**32 - 1)
+        )
+        for request in requests
+    ]
+    backend = get_backend()
+    generators = [backend.generator(seed) for seed in seeds]
+    batch_suffix = f" (batch of {batch_size})" if batch_size > 1 else ""
+    spans = _GenerationSpans(app_state["current_pipe"].pipe)
+    previews = None
+    preview_targets = [
+        (
+            (request["preview_callback"], request["loop"])
+            if request.get("preview_callback") and request.get("loop")
+            else None
+        )
+        for request in requests
+    ]
+    if any(preview_targets):
+        previews = PreviewSession(
+            app_state["current_pipe"],
+            preview_targets,
+            steps,
+            int(first["width"]),
+            int(first["height"]),
+        )
 
     def pipeline_progress_callback(pipe, step, timestep, callback_kwargs):
-        progress = step / int(steps)
-        if progress_callback and loop:
-            asyncio.run_coroutine_threadsafe(
-                progress_callback(progress, f"Sampling... {step + 1}/{int(steps)}"),
-                loop,
-            )
+        spans.step_done()
+        if all(event is not None and event.is_set() for event in cancel_events):
+            raise JobCancelled("Generation was cancelled.")
+        progress = step / steps
+        for request in requests:
+            if request.get("progress_callback") and request.get("loop"):
+                asyncio.run_coroutine_threadsafe(
+                    request["progress_callback"](
+                        progress, f"Sampling... {step + 1}/{steps}{batch_suffix}"
+                    ),
+                    request["loop"],
+                )
+        if previews and "latents" in callback_kwargs:
+            previews.on_step(step, callback_kwargs["latents"])
         return callback_kwargs
 
+    prompts = [request["prompt"] for request in requests]
+    negative_prompts = [request.get("negative_prompt") or "" for request in requests]
     gen_kwargs = {
-        "prompt": prompt,
-        "num_inference_steps": int(steps),
-        "guidance_scale": float(guidance),
-        "width": int(width),
-        "height": int(height),
-        "generator": generator,
+        "prompt": prompts[0] if batch_size == 1 else prompts,
+        "num_inference_steps": steps,
+        "guidance_scale": float(first["guidance"]),
+        "width": int(first["width"]),
+        "height": int(first["height"]),
+        "generator": generators[0] if batch_size == 1 else generators,
         "callback_on_step_end": pipeline_progress_callback,
     }
 
-    if app_state["current_lora_name"] and float(lora_weight) > 0:
-        gen_kwargs["cross_attention_kwargs"] = {"scale": float(lora_weight)}
-        logger.info(
-            f"Applying LoRA '{app_state['current_lora_name']}' with weight {lora_weight}"
+    if supports_schedulers():
+        app_state["current_pipe"].pipe.scheduler = _scheduler_for(
+            app_state["current_pipe"], _request_scheduler(first)
         )
 
-    if negative_prompt and negative_prompt.strip():
-        gen_kwargs["negative_prompt"] = negative_prompt
+    # Adapter weights carry the LoRA scale, for the text encoders as well.
+    loras = _request_loras(first)
+    with metrics.span("arttic_generation_stage_seconds", stage="lora"):
+        lora_manager.apply(app_state["current_pipe"], loras)
 
+    if any(negative.strip() for negative in negative_prompts):
+        gen_kwargs["negative_prompt"] = (
+            negative_prompts[0] if batch_size == 1 else negative_prompts
+        )
+    else:
+        # Left unset, SDXL uses zeroed negative embeddings rather than "".
+        negative_prompts = [None] * batch_size
+
+    backend.reset_peak_memory()
     try:
-        image = app_state["current_pipe"].generate(**gen_kwargs).images[0]
+        if vae_tiling:
+            _set_vae_tiling(app_state["current_pipe"], True)
+        prompt_embeds = _prompt_embedding_kwargs(
+            prompts, negative_prompts, float(first["guidance"]) > 1, loras
+        )
+        if prompt_embeds:
+            gen_kwargs.pop("prompt")
+            gen_kwargs.pop("negative_prompt", None)
+            gen_kwargs.update(prompt_embeds)
+        images = app_state["current_pipe"].generate(**gen_kwargs).images
     except torch.OutOfMemoryError as e:
-        torch.xpu.empty_cache()
-        logger.error(f"XPU Out of Memory during generation: {e}")
+        backend.empty_cache()
+        metrics.inc("arttic_generation_failures_total", reason="oom")
+        logger.error(f"{backend.name.upper()} Out of Memory during generation: {e}")
         raise OOMError(
             "Your GPU ran out of memory while generating the image. Try reducing the resolution or steps."
         )
+    except JobCancelled:
+        raise
+    except Exception:
+        metrics.inc("arttic_generation_failures_total", reason="error")
+        raise
+    finally:
+        if vae_tiling:
+            _set_vae_tiling(app_state["current_pipe"], False)
+        spans.close()
+        if previews:
+            previews.close()
 
     generation_time = time.time() - start_time
     logger.info(f"Generation completed in {generation_time:.2f} seconds.")
+    logger.info(spans.record(app_state["current_model_type"], batch_size))
+    peak_memory = backend.peak_memory()
+    if peak_memory is not None:
+        metrics.set("arttic_generation_peak_memory_bytes", peak_memory)
+        metrics.set_max("arttic_peak_memory_bytes", peak_memory)
+
+    results = []
+    for request, image, seed, cancel_event in zip(
+        requests, images, seeds, cancel_events
+    ):
+        if cancel_event is not None and cancel_event.is_set():
+            results.append(JobCancelled("Generation was cancelled."))
+            continue
+        result, saved = _save_generation(request, image, seed, generation_time)
+        if outputs is not None:
+            outputs.append((image, saved))
+        results.append(result)
+    return results
+
+
+def _admit_generation(width, height, batch_size):
+    """Make sure a pass fits in free memory before starting it.
+
+    Returns True when VAE tiling must be switched on for this pass only. A
+    pass that cannot fit is rejected with OOMError before it runs; CPU
+    Offload is never switched on per pass, only chosen when loading.
+    Without a memory profile for the model every pass is let through.
+    """
+    pipe = app_state["current_pipe"]
+    profile = memory_model.get(pipe)
+    state = _memory_state(pipe) if profile else None
+    if state is None:
+        return False
+
+    state["can_offload"] = False
+    plan = profile.plan(width, height, batch_size, **state)
+    if plan is None:
+        metrics.inc("arttic_memory_admission_total", decision="reject")
+        need = profile.peak_bytes(
+            width, height, batch_size, state["tiled"], state["offloaded"]
+        )
+        max_side = profile.max_side(**state)
+        offload_hint = (
+            " or reload the model with CPU Offload"
+            if get_backend().supports_cpu_offload() and not state["offloaded"]
+            else ""
+        )
+        raise OOMError(
+            f"{width}x{height} needs about {need / 1024**3:.1f} GB but only "
+            f"{state['available'] / 1024**3:.1f} GB is free. Try {max_side}x{max_side} or smaller{offload_hint}."
+        )
+
+    use_tiling, _ = plan
+    if use_tiling and not state["tiled"]:
+        metrics.inc("arttic_memory_admission_total", decision="tile")
+        logger.info(f"Tiling the VAE decode so {width}x{height} fits in memory.")
+        return True
+    metrics.inc("arttic_memory_admission_total", decision="ok")
+    return False
 
-    os.makedirs("./outputs", exist_ok=True)
-    filename = f"ArtTic-LAB_{_get_next_image_number()}.png"
-    filepath = os.path.join("./outputs", filename)
-    image.save(filepath)
 
-    lora_info = None
-    if app_state["current_lora_name"]:
-        lora_info = {"name": app_state["current_lora_name"], "weight": lora_weight}
+def _prompt_embedding_kwargs(prompts, negative_prompts, do_cfg, loras):
+    """Text embeddings for a pass, batched, reusing cached encodings.
+
+    `loras` is the active (name, weight) stack, which changes the text
+    encoders' output. Returns None if the embeddings cannot be precomputed,
+    in which case the pipeline encodes the prompt text itself.
+    """
+    pipe = app_state["current_pipe"]
+    per_prompt = []
+    try:
+        for prompt, negative_prompt in zip(prompts, negative_prompts):
+            key = embedding_cache.make_key(pipe, loras, prompt, negative_prompt, do_cfg)
+            embeds = embedding_cache.get(key)
+            metrics.inc(
+                "arttic_embedding_cache_total",
+                result="miss" if embeds is None else "hit",
+            )
+            if embeds is None:
+                embeds = embedding_cache.put(
+                    key,
+                    pipe.encode_prompt(prompt, negative_prompt, do_cfg),
+                )
+            per_prompt.append(embeds)
+    except torch.OutOfMemoryError:
+        raise
+    except Exception as e:
+        logger.warning(f"Could not precompute prompt embeddings: {e}")
+        return None
+
+    device = pipe.pipe._execution_device
+    kwargs = {}
+    for name in per_prompt[0]:
+        tensors = [embeds[name] for embeds in per_prompt]
+        if all(tensor is not None for tensor in tensors):
+            kwargs[name] = torch.cat(tensors).to(device)
+    return kwargs
+
+
+class _GenerationSpans:
+    """Per-stage timings of one sampling pass.
+
+    Text encoding is timed with forward hooks on the text encoders, each
+    denoise step from consecutive step-end callbacks, and VAE decode from the
+    last step until the pipeline returns its images.
+    """
+
+    TEXT_ENCODERS = ("text_encoder", "text_encoder_2", "text_encoder_3")
+
+    def __init__(self, pipe):
+        self.start = time.perf_counter()
+        self.text_encode = 0.0
+        self.steps = []
+        self._encode_started = None
+        self._last_mark = self.start
+        self._handles = []
+        for name in self.TEXT_ENCODERS:
+            module = getattr(pipe, name, None)
+            if isinstance(module, torch.nn.Module):
+                self._handles.append(
+                    module.register_forward_pre_hook(self._encode_begin)
+                )
+                self._handles.append(module.register_forward_hook(self._encode_end))
+
+    def _encode_begin(self, module, args):
+        self._encode_started = time.perf_counter()
+
+    def _encode_end(self, module, args, output):
+        now = time.perf_counter()
+        if self._encode_started is not None:
+            self.text_encode += now - self._encode_started
+            self._encode_started = None
+        self._last_mark = now
+
+    def step_done(self):
+        now = time.perf_counter()
+        self.steps.append(now - self._last_mark)
+        self._last_mark = now
+
+    def close(self):
+        self.end = time.perf_counter()
+        for handle in self._handles:
+            handle.remove()
+        self._handles = []
+
+    def record(self, model_type, batch_size):
+        """Export the spans as metrics and return a one-line summary"""
+        stage = "arttic_generation_stage_seconds"
+        total = self.end - self.start
+        decode = self.end - self._last_mark
+        denoise = sum(self.steps)
+        metrics.observe("arttic_generation_seconds", total, model_type=model_type)
+        metrics.inc("arttic_images_total", batch_size, model_type=model_type)
+        metrics.observe(stage, self.text_encode, stage="text_encode")
+        metrics.observe(stage, denoise, stage="denoise")
+        metrics.observe(stage, decode, stage="vae_decode")
+        for duration in self.steps:
+            metrics.observe(
+                "arttic_denoise_step_seconds", duration, model_type=model_type
+            )
+
+        per_step = f", {denoise / len(self.steps):.3f}s/step" if self.steps else ""
+        return (
+            f"Stages: text encode {self.text_encode:.2f}s, denoise {denoise:.2f}s "
+            f"({len(self.steps)} steps{per_step}), VAE decode {decode:.2f}s."
+        )
+
+
+def _request_loras(request):
+    """The (name, weight) LoRAs for a request: its own, else the loaded one"""
+    if request.get("loras") is not None:
+        return [(lora["name"], float(lora["weight"])) for lora in request["loras"]]
+    lora_weight = float(request.get("lora_weight") or 0)
+    if app_state["current_lora_name"] and lora_weight > 0:
+        return [(app_state["current_lora_name"], lora_weight)]
+    return []
+
+
+def _request_scheduler(request):
+    return request.get("scheduler") or app_state["current_scheduler_name"]
+
+
+def _lora_info(loras):
+    if not loras:
+        return None
+    if len(loras) == 1:
+        return {"name": loras[0][0], "weight": loras[0][1]}
+    return {
+        "name": " + ".join(name for name, _ in loras),
+        "loras": [{"name": name, "weight": weight} for name, weight in loras],
+    }
+
+
+def _save_generation(request, image, seed, generation_time):
+    loras = _request_loras(request)
+
+    extra = None
+    if request.get("scheduler") and supports_schedulers():
+        extra = {"scheduler": request["scheduler"]}
 
     metadata = metadata_handler.create_metadata(
-        prompt=prompt,
-        negative_prompt=negative_prompt,
+        prompt=request["prompt"],
+        negative_prompt=request["negative_prompt"],
         model_name=app_state["current_model_name"],
         seed=seed,
-        width=width,
-        height=height,
-        steps=steps,
-        cfg_scale=guidance,
-        lora_info=lora_info,
+        width=request["width"],
+        height=request["height"],
+        steps=request["steps"],
+        cfg_scale=request["guidance"],
+        lora_info=_lora_info(loras),
+        extra=extra,
     )
 
-    metadata_handler.embed_metadata_to_image(filepath, metadata)
-
     info_text = f"Generated in {generation_time:.2f}s on '{app_state['current_model_name']}' with seed {seed}."
-    if app_state["current_lora_name"]:
-        info_text += f" LoRA: {app_state['current_lora_name']} @ {lora_weight}."
+    if loras:
+        stack = " + ".join(f"{name} @ {weight}" for name, weight in loras)
+        info_text += f" LoRA: {stack}."
+
+    return _queue_output(request, image, metadata, info_text)
+
+
+def _queue_output(request, image, metadata, info_text):
+    """Hand an image to the output writer and return (result, saved_future).
+
+    Blocks until the file is written unless the request carries a
+    completion_callback and loop to notify instead.
+    """
+    image_format = output_settings["format"]
+    filename, filepath = output_allocator.allocate(f".{image_format}")
+    saved = output_writer.submit(
+        image,
+        filepath,
+        metadata,
+        image_format=image_format,
+        compress_level=output_settings["png_compress_level"],
+    )
 
-    return {"image_filename": filename, "info": info_text}
+    result = {"image_filename": filename, "info": info_text}
+    if request.get("batch_item") is not None:
+        result["batch_item"] = request["batch_item"]
+
+    completion_callback = request.get("completion_callback")
+    loop = request.get("loop")
+    if completion_callback and loop:
+        saved.add_done_callback(
+            lambda future: _notify_saved(future, result, completion_callback, loop)
+        )
+    else:
+        saved.result()
+    return result, saved
+
+
+def _notify_saved(future, result, completion_callback, loop):
+    completion = dict(result)
+    error = future.exception()
+    if error:
+        completion["error"] = f"Could not save '{result['image_filename']}': {error}"
+    else:
+        completion["gallery_item"] = gallery_index.get(result["image_filename"])
+    asyncio.run_coroutine_threadsafe(completion_callback(completion), loop)
 
 
 def get_prompts():
@@ -566,9 +1540,9 @@ def restart_backend():
 
 def clear_cache():
     try:
-        if hasattr(torch, "xpu") and torch.xpu.is_available():
-            torch.xpu.empty_cache()
-            torch.xpu.synchronize()
+        backend = get_backend()
+        backend.empty_cache()
+        backend.synchronize()
         logger.info("VRAM cache cleared.")
         return {"status": "success", "message": "VRAM cache cleared"}
     except Exception as e:
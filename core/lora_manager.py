@@ -0,0 +1,197 @@
+import os
+import logging
+import threading
+from collections import OrderedDict
+from safetensors.torch import load_file
+
+logger = logging.getLogger("arttic_lab")
+
+MB = 1024**2
+LORAS_DIR = "./loras"
+DEFAULT_BUDGET_MB = 1024
+MAX_RESIDENT_ADAPTERS = 4
+
+
+def lora_path(name):
+    return os.path.join(LORAS_DIR, f"{name}.safetensors")
+
+
+def adapter_name(name):
+    # PEFT uses adapter names as module keys, which cannot contain dots.
+    return "lora_" + "".join(c if c.isalnum() else "_" for c in name)
+
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def lora_signature(name):
+    """(mtime, size) of a LoRA file, or None if it does not exist"""
+    try:
+        return _file_signature(lora_path(name))
+    except FileNotFoundError:
+        return None
+
+
+def _state_dict_bytes(state_dict):
+    return sum(tensor.numel() * tensor.element_size() for tensor in state_dict.values())
+
+
+class LoraManager:
+    """Applies LoRAs to the loaded pipeline as named adapters.
+
+    Parsed LoRA files are kept in an LRU in host RAM, so attaching one to any
+    model skips the disk read. Each pipeline keeps up to
+    MAX_RESIDENT_ADAPTERS adapters attached and switching between them is a
+    `set_adapters` call; the base model is never reloaded. Adapters a
+    pipeline already had when first seen (SD3 injects its weights as one)
+    always stay active at full weight. With `fuse` on, the active stack is
+    merged into the weights for faster sampling and unmerged when it
+    changes.
+    """
+
+    def __init__(self, budget_mb=DEFAULT_BUDGET_MB):
+        self.budget = int(budget_mb * MB)
+        self.fuse = False
+        self._state_dicts = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def configure(self, budget_mb, fuse=False):
+        with self._lock:
+            self.budget = max(0, int(float(budget_mb) * MB))
+            self._evict_locked()
+        self.fuse = bool(fuse)
+        logger.info(
+            f"LoRA cache budget set to {budget_mb} MB"
+            + (", fusing active LoRAs." if self.fuse else ".")
+        )
+
+    def state_dict(self, name):
+        """The parsed LoRA file and its (mtime, size) signature"""
+        path = lora_path(name)
+        try:
+            signature = _file_signature(path)
+        except FileNotFoundError:
+            raise ValueError(f"LoRA '{name}' was not found in {LORAS_DIR}.")
+        with self._lock:
+            entry = self._state_dicts.get(path)
+            if entry and entry[0] == signature:
+                self._state_dicts.move_to_end(path)
+                return entry[1], signature
+
+        state_dict = load_file(path)
+        size = _state_dict_bytes(state_dict)
+        with self._lock:
+            previous = self._state_dicts.pop(path, None)
+            if previous:
+                self._size -= previous[2]
+            if size <= self.budget:
+                self._state_dicts[path] = (signature, state_dict, size)
+                self._size += size
+                self._evict_locked()
+        return state_dict, signature
+
+    def discard(self, name):
+        with self._lock:
+            entry = self._state_dicts.pop(lora_path(name), None)
+            if entry:
+                self._size -= entry[2]
+
+    def clear(self):
+        with self._lock:
+            self._state_dicts.clear()
+            self._size = 0
+
+    def _evict_locked(self):
+        while self._state_dicts and self._size > self.budget:
+            _, (_, _, size) = self._state_dicts.popitem(last=False)
+            self._size -= size
+
+    @staticmethod
+    def _pipe_state(pipe):
+        state = getattr(pipe, "lora_state", None)
+        if state is None:
+            base = set()
+            try:
+                for names in pipe.pipe.get_list_adapters().values():
+                    base.update(names)
+            except Exception:
+                pass
+            state = pipe.lora_state = {
+                "base": sorted(base),
+                "adapters": OrderedDict(),
+                "active": (),
+                "stack": (),
+                "fused": False,
+            }
+        return state
+
+    def preload(self, pipe, name):
+        """Attach a LoRA without activating it, so first use is quick"""
+        state = self._pipe_state(pipe)
+        adapter = self._attach(pipe, state, name)
+        # The applied stack must survive; it may be fused into the weights.
+        self._evict_adapters(pipe, state, keep=[*state["stack"], adapter])
+
+    def apply(self, pipe, loras):
+        """Make exactly `loras`, a list of (name, weight), active on `pipe`"""
+        state = self._pipe_state(pipe)
+        wanted = tuple((name, float(weight)) for name, weight in loras if weight)
+        if wanted == state["active"]:
+            return
+        if state["fused"]:
+            pipe.pipe.unfuse_lora()
+            state["fused"] = False
+
+        adapters = [self._attach(pipe, state, name) for name, _ in wanted]
+        self._evict_adapters(pipe, state, keep=adapters)
+        names = state["base"] + adapters
+        weights = [1.0] * len(state["base"]) + [weight for _, weight in wanted]
+        if names:
+            pipe.pipe.enable_lora()
+            pipe.pipe.set_adapters(names, adapter_weights=weights)
+        elif state["adapters"]:
+            pipe.pipe.disable_lora()
+        if self.fuse and adapters:
+            pipe.pipe.fuse_lora(adapter_names=adapters)
+            state["fused"] = True
+        state["active"] = wanted
+        state["stack"] = tuple(adapters)
+        if wanted:
+            stack = " + ".join(f"{name} @ {weight}" for name, weight in wanted)
+            logger.info(f"Active LoRAs: {stack}{' (fused)' if state['fused'] else ''}.")
+
+    def _attach(self, pipe, state, name):
+        adapter = adapter_name(name)
+        state_dict, signature = self.state_dict(name)
+        attached = state["adapters"].get(adapter)
+        if attached == signature:
+            state["adapters"].move_to_end(adapter)
+            return adapter
+        if attached is not None:
+            # The file changed on disk since it was attached.
+            pipe.pipe.delete_adapters([adapter])
+        logger.info(f"Attaching LoRA: {name}")
+        # load_lora_weights may rewrite the dict it is given; keep ours intact.
+        pipe.pipe.load_lora_weights(dict(state_dict), adapter_name=adapter)
+        state["adapters"][adapter] = signature
+        state["active"] = None
+        return adapter
+
+    @staticmethod
+    def _evict_adapters(pipe, state, keep):
+        stale = [name for name in state["adapters"] if name not in keep]
+        while stale and len(state["adapters"]) > MAX_RESIDENT_ADAPTERS:
+            if state["fused"]:
+                # Deleting an adapter under fused weights would leave it merged.
+                pipe.pipe.unfuse_lora()
+                state["fused"] = False
+                state["active"] = None
+            name = stale.pop(0)
+            pipe.pipe.delete_adapters([name])
+            del state["adapters"][name]
+
+
+lora_manager = LoraManager()
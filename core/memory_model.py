@@ -0,0 +1,381 @@
+import os
+import json
+import time
+import logging
+import threading
+import torch
+from pipelines.artifact_cache import library_versions
+from pipelines.backends import get_backend
+
+logger = logging.getLogger("arttic_lab")
+
+PROFILE_FILE = os.path.join("./cache", "memory_profiles.json")
+MB = 1024**2
+GB = 1024**3
+# Calibration sides, as fractions of the model's native resolution.
+CALIBRATION_SCALES = (0.5, 0.75, 1.0)
+# Predictions are padded by this fraction, and this much is always kept free.
+SAFETY_MARGIN = 0.15
+HEADROOM_BYTES = 256 * MB
+# Decoded images are float32 RGB before they become PIL images.
+OUTPUT_BYTES_PER_PIXEL = 12
+MIN_SIDE = 512
+MAX_SIDE = 4096
+
+
+def _polyfit(points, degree):
+    """Least-squares polynomial coefficients, lowest order first"""
+    size = degree + 1
+    matrix = [
+        [sum(x ** (row + col) for x, _ in points) for col in range(size)]
+        for row in range(size)
+    ]
+    vector = [sum(y * x**row for x, y in points) for row in range(size)]
+    for col in range(size):
+        pivot = max(range(col, size), key=lambda row: abs(matrix[row][col]))
+        if abs(matrix[pivot][col]) < 1e-12:
+            return None
+        matrix[col], matrix[pivot] = matrix[pivot], matrix[col]
+        vector[col], vector[pivot] = vector[pivot], vector[col]
+        for row in range(col + 1, size):
+            factor = matrix[row][col] / matrix[col][col]
+            for k in range(col, size):
+                matrix[row][k] -= factor * matrix[col][k]
+            vector[row] -= factor * vector[col]
+    coeffs = [0.0] * size
+    for row in reversed(range(size)):
+        rest = sum(matrix[row][k] * coeffs[k] for k in range(row + 1, size))
+        coeffs[row] = (vector[row] - rest) / matrix[row][row]
+    return coeffs
+
+
+def fit_curve(points):
+    """Fit bytes = a + b*mp + c*mp^2 to (megapixels, bytes) points.
+
+    Attention grows with the square of the pixel count and convolutions
+    linearly. A fit that bends downwards would promise memory that is not
+    there, so fewer terms are tried until every slope is non-negative.
+    """
+    distinct = len({x for x, _ in points})
+    for degree in (2, 1):
+        if distinct > degree:
+            coeffs = _polyfit(points, degree)
+            if coeffs and all(coeff >= 0 for coeff in coeffs[1:]):
+                return coeffs + [0.0] * (2 - degree)
+    return [max(y for _, y in points), 0.0, 0.0]
+
+
+def _module_bytes(module):
+    if not isinstance(module, torch.nn.Module):
+        return 0
+    return sum(param.numel() * param.element_size() for param in module.parameters())
+
+
+def fits(need, available):
+    return need * (1 + SAFETY_MARGIN) + HEADROOM_BYTES <= available
+
+
+class MemoryProfile:
+    """Fitted peak memory of one model, in bytes above its resident weights.
+
+    `denoise` covers text encoding and sampling at batch size 1, `vae` the
+    decode of one image without tiling. `weights` holds the parameter bytes
+    of the denoiser, the VAE and the largest component, for predicting the
+    peaks under CPU offload, where one component is on the device at a time.
+    """
+
+    def __init__(self, denoise, vae, vae_tile_mp, weights, points=None):
+        self.denoise = denoise
+        self.vae = vae
+        self.vae_tile_mp = vae_tile_mp
+        self.weights = weights
+        self.points = points or {}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data["denoise"],
+            data["vae"],
+            data["vae_tile_mp"],
+            data["weights"],
+            data.get("points"),
+        )
+
+    def to_dict(self):
+        return {
+            "denoise": self.denoise,
+            "vae": self.vae,
+            "vae_tile_mp": self.vae_tile_mp,
+            "weights": self.weights,
+            "points": self.points,
+        }
+
+    def denoise_bytes(self, megapixels, batch_size):
+        a, b, c = self.denoise
+        return max(0.0, a + batch_size * (b * megapixels + c * megapixels**2))
+
+    def vae_bytes(self, megapixels, batch_size, tiled):
+        # Tiling decodes one tile of one image at a time (slicing comes with it).
+        decoded = min(megapixels, self.vae_tile_mp) if tiled else megapixels
+        images = 1 if tiled else batch_size
+        a, b, c = self.vae
+        output = OUTPUT_BYTES_PER_PIXEL * megapixels * MB * batch_size
+        return max(0.0, a + images * (b * decoded + c * decoded**2)) + output
+
+    def peak_bytes(self, width, height, batch_size, tiled, offloaded=False):
+        megapixels = width * height / MB
+        denoise = self.denoise_bytes(megapixels, batch_size)
+        vae = self.vae_bytes(megapixels, batch_size, tiled)
+        if not offloaded:
+            return max(denoise, vae)
+        return max(
+            self.weights["denoiser"] + denoise,
+            self.weights["vae"] + vae,
+            self.weights["largest"],
+        )
+
+    def plan(
+        self,
+        width,
+        height,
+        batch_size,
+        available,
+        total,
+        tiled,
+        can_tile,
+        can_offload,
+        offloaded,
+    ):
+        """Pick (vae_tiling, cpu_offload) for a pass, or None if nothing fits.
+
+        Tries the current setup, then VAE tiling, then CPU offload, where
+        `total` stands in for free memory since the weights leave the device.
+        """
+        options = [(tiled, offloaded)]
+        if can_tile:
+            options.append((True, offloaded))
+        if can_offload and not offloaded:
+            options.append((tiled or can_tile, True))
+        for use_tiling, use_offload in options:
+            need = self.peak_bytes(width, height, batch_size, use_tiling, use_offload)
+            room = total if use_offload and not offloaded else available
+            if fits(need, room):
+                return use_tiling, use_offload
+        return None
+
+    def max_side(self, available, total, tiled, can_tile, can_offload, offloaded):
+        """Largest square side, in steps of 64, that some plan can fit"""
+        for side in range(MAX_SIDE, MIN_SIDE - 1, -64):
+            plan = self.plan(
+                side,
+                side,
+                1,
+                available,
+                total,
+                tiled,
+                can_tile,
+                can_offload,
+                offloaded,
+            )
+            if plan:
+                return side
+        return MIN_SIDE
+
+
+class MemoryModel:
+    """Per-model memory profiles, kept in ./cache.
+
+    With calibration enabled, a model's first load runs one denoising step
+    and one VAE decode at a few resolutions and fits a curve to the measured
+    peaks. Profiles are keyed by checkpoint, pipeline class, dtype, device
+    and library versions, so they are measured again only when one of those
+    changes. Pipelines loaded with CPU offload reuse the profile measured
+    without it.
+    """
+
+    def __init__(self, profile_file=PROFILE_FILE):
+        self.profile_file = profile_file
+        self.calibrate_on_load = False
+        self._lock = threading.Lock()
+        self._profiles = None
+
+    def configure(self, calibrate):
+        self.calibrate_on_load = bool(calibrate)
+        if self.calibrate_on_load:
+            logger.info("Memory calibration enabled for first loads of each model.")
+
+    def _load_profiles(self):
+        if self._profiles is None:
+            try:
+                with open(self.profile_file, "r", encoding="utf-8") as f:
+                    self._profiles = json.load(f)
+            except (FileNotFoundError, ValueError):
+                self._profiles = {}
+        return self._profiles
+
+    def _save_profiles(self):
+        os.makedirs(os.path.dirname(self.profile_file) or ".", exist_ok=True)
+        tmp_path = f"{self.profile_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._profiles, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.profile_file)
+
+    @staticmethod
+    def _key(pipe):
+        key = getattr(pipe, "memory_profile_key", None)
+        if key:
+            return key
+        source = pipe.model_hash
+        if not source:
+            try:
+                stat = os.stat(pipe.model_path)
+                source = f"{os.path.abspath(pipe.model_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+            except (OSError, TypeError):
+                source = str(pipe.model_path)
+        versions = ",".join(f"{k}={v}" for k, v in sorted(library_versions().items()))
+        pipe.memory_profile_key = "|".join(
+            [source, type(pipe).__name__, str(pipe.dtype), get_backend().name, versions]
+        )
+        return pipe.memory_profile_key
+
+    def get(self, pipe):
+        with self._lock:
+            data = self._load_profiles().get(self._key(pipe))
+        return MemoryProfile.from_dict(data) if data else None
+
+    def ensure(self, pipe, native_side, progress=None):
+        """The pipeline's profile, calibrating it first if needed and allowed"""
+        profile = self.get(pipe)
+        if profile or not self.calibrate_on_load or pipe.is_offloaded:
+            return profile
+        try:
+            profile = self._calibrate(pipe, native_side, progress)
+        except Exception as e:
+            logger.warning(f"Memory calibration failed: {e}")
+            return None
+        if profile is None:
+            return None
+        with self._lock:
+            self._load_profiles()[self._key(pipe)] = {
+                **profile.to_dict(),
+                "calibrated_at": time.time(),
+            }
+            try:
+                self._save_profiles()
+            except OSError as e:
+                logger.warning(f"Could not save memory profiles: {e}")
+        return profile
+
+    def _calibrate(self, pipe, native_side, progress):
+        backend = get_backend()
+        if backend.memory_in_use() is None or backend.available_memory() is None:
+            return None
+        sides = sorted(
+            {
+                max(256, int(native_side * scale) // 64 * 64)
+                for scale in CALIBRATION_SCALES
+            }
+        )
+        vae = pipe.pipe.vae
+        was_tiled = getattr(vae, "use_tiling", False)
+        was_sliced = getattr(vae, "use_slicing", False)
+        vae.disable_tiling()
+        vae.disable_slicing()
+        denoise_points, vae_points = [], []
+        start = time.perf_counter()
+        try:
+            for index, side in enumerate(sides):
+                if progress:
+                    progress(
+                        0.85 + 0.1 * index / len(sides),
+                        f"Measuring memory use at {side}x{side}...",
+                    )
+                megapixels = side * side / MB
+                try:
+                    denoise = self._measure(
+                        backend, lambda: self._denoise_step(pipe, side)
+                    )
+                    decode = self._measure(
+                        backend, lambda: self._decode_zeros(pipe, side)
+                    )
+                except torch.OutOfMemoryError:
+                    backend.empty_cache()
+                    logger.warning(f"Calibration ran out of memory at {side}x{side}.")
+                    break
+                denoise_points.append((megapixels, denoise))
+                vae_points.append((megapixels, decode))
+        finally:
+            if was_tiled:
+                vae.enable_tiling()
+            if was_sliced:
+                vae.enable_slicing()
+            backend.empty_cache()
+        if not denoise_points:
+            return None
+
+        tile_side = getattr(vae, "tile_sample_min_size", 512)
+        components = [
+            module
+            for module in getattr(pipe.pipe, "components", {}).values()
+            if isinstance(module, torch.nn.Module)
+        ]
+        denoiser = getattr(pipe.pipe, "unet", None) or getattr(
+            pipe.pipe, "transformer", None
+        )
+        profile = MemoryProfile(
+            fit_curve(denoise_points),
+            fit_curve(vae_points),
+            tile_side * tile_side / MB,
+            {
+                "denoiser": _module_bytes(denoiser),
+                "vae": _module_bytes(vae),
+                "largest": max((_module_bytes(m) for m in components), default=0),
+            },
+            {"denoise": denoise_points, "vae": vae_points},
+        )
+        peaks = ", ".join(
+            f"{round((x * MB) ** 0.5)}px: {max(d, v) / GB:.2f} GB"
+            for (x, d), (_, v) in zip(denoise_points, vae_points)
+        )
+        logger.info(
+            f"Calibrated memory use in {time.perf_counter() - start:.1f}s ({peaks})."
+        )
+        return profile
+
+    @staticmethod
+    def _measure(backend, run):
+        backend.synchronize()
+        backend.empty_cache()
+        baseline = backend.memory_in_use()
+        backend.reset_peak_memory()
+        with torch.no_grad():
+            run()
+        backend.synchronize()
+        return max(0, backend.peak_memory() - baseline)
+
+    @staticmethod
+    def _denoise_step(pipe, side):
+        pipe.generate(
+            prompt="",
+            num_inference_steps=1,
+            guidance_scale=5.0,
+            width=side,
+            height=side,
+            output_type="latent",
+            generator=get_backend().generator(0),
+        )
+
+    @staticmethod
+    def _decode_zeros(pipe, side):
+        vae = pipe.pipe.vae
+        scale = getattr(pipe.pipe, "vae_scale_factor", 8)
+        latents = torch.zeros(
+            (1, vae.config.latent_channels, side // scale, side // scale),
+            dtype=vae.dtype,
+            device=pipe.pipe._execution_device,
+        )
+        with get_backend().autocast(pipe.dtype):
+            vae.decode(latents, return_dict=False)
+
+
+memory_model = MemoryModel()
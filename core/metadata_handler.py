@@ -6,11 +6,25 @@ from datetime import datetime
 from PIL import Image
 from PIL.PngImagePlugin import PngInfo
 import os
+from .metrics import metrics
+
+EXIF_IMAGE_DESCRIPTION = 0x010E
 
 
 class MetadataHandler:
     def __init__(self):
-        pass
+        self._write_listeners = []
+
+    def add_write_listener(self, listener):
+        """Register a callable(image_path, metadata) run after metadata is written"""
+        self._write_listeners.append(listener)
+
+    def _notify_written(self, image_path, metadata):
+        for listener in self._write_listeners:
+            try:
+                listener(image_path, metadata)
+            except Exception as e:
+                print(f"Error in metadata write listener: {e}")
 
     def create_metadata(
         self,
@@ -23,6 +37,7 @@ class MetadataHandler:
         steps,
         cfg_scale,
         lora_info=None,
+        extra=None,
     ):
         """Create metadata for an image"""
         metadata = {
@@ -42,6 +57,8 @@ class MetadataHandler:
 
         if lora_info:
             metadata["lora_info"] = lora_info
+        if extra:
+            metadata.update(extra)
 
         # Create a hash of the metadata to ensure integrity
         metadata_str = json.dumps(metadata, sort_keys=True)
@@ -49,21 +66,44 @@ class MetadataHandler:
 
         return metadata
 
+    def save_image_with_metadata(
+        self, image, image_path, metadata, image_format="png", compress_level=6
+    ):
+        """Encode an image once with its metadata attached"""
+        # Our metadata is stored as a JSON string; ASCII-only keeps it valid
+        # in both a PNG tEXt chunk and the WebP EXIF ImageDescription tag.
+        stage = "arttic_generation_stage_seconds"
+        with metrics.span(stage, stage="metadata_embed"):
+            metadata_json = json.dumps(metadata)
+            if image_format == "webp":
+                exif = Image.Exif()
+                exif[EXIF_IMAGE_DESCRIPTION] = metadata_json
+                save_kwargs = {"format": "WEBP", "lossless": True, "exif": exif}
+            else:
+                pnginfo = PngInfo()
+                pnginfo.add_text("parameters", metadata_json)
+                save_kwargs = {
+                    "format": "PNG",
+                    "pnginfo": pnginfo,
+                    "compress_level": compress_level,
+                }
+
+        with metrics.span(stage, stage="image_encode"):
+            image.save(image_path, **save_kwargs)
+
+        with metrics.span(stage, stage="gallery_update"):
+            self._notify_written(image_path, metadata)
+
     def embed_metadata_to_image(self, image_path, metadata):
-        """Embed metadata to an image file"""
+        """Embed metadata to an existing image file"""
         try:
-            # Open the image
             image = Image.open(image_path)
+            image.load()
 
-            # Create PngInfo object to store metadata
-            pnginfo = PngInfo()
-
-            # Add our metadata as a JSON string
-            metadata_json = json.dumps(metadata)
-            pnginfo.add_text("parameters", metadata_json)
-
-            # Save image with metadata
-            image.save(image_path, pnginfo=pnginfo, format="PNG")
+            image_format = "webp" if image.format == "WEBP" else "png"
+            self.save_image_with_metadata(
+                image, image_path, metadata, image_format=image_format
+            )
 
             return True
         except Exception as e:
@@ -76,8 +116,15 @@ class MetadataHandler:
             image = Image.open(image_path)
 
             # Check for our metadata in the image
-            if hasattr(image, "text") and "parameters" in image.text:
-                metadata_json = image.text["parameters"]
+            metadata_json = None
+            if image.format == "WEBP":
+                metadata_json = image.getexif().get(EXIF_IMAGE_DESCRIPTION)
+            else:
+                # Read from info rather than .text so the pixel data is not
+                # decoded; our tEXt chunk is always written before IDAT.
+                metadata_json = image.info.get("parameters")
+
+            if metadata_json:
                 metadata = json.loads(metadata_json)
 
                 # Verify the hash to ensure metadata integrity
@@ -0,0 +1,278 @@
+import time
+import math
+import threading
+from contextlib import contextmanager
+
+COUNTER = "counter"
+GAUGE = "gauge"
+HISTOGRAM = "histogram"
+
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+    60,
+    120,
+    300,
+)
+
+
+class _Metric:
+    def __init__(self, name, kind, help_text, buckets=None):
+        self.name = name
+        self.kind = kind
+        self.help_text = help_text
+        self.buckets = tuple(buckets or DEFAULT_BUCKETS)
+        self.series = {}
+
+
+class MetricsRegistry:
+    """Thread-safe counters, gauges and histograms rendered as Prometheus text.
+
+    Metrics are declared once with `describe` and then updated by name with
+    keyword labels, e.g. `metrics.observe("arttic_stage_seconds", 0.4,
+    stage="vae_decode")`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def describe(self, name, kind, help_text, buckets=None):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = _Metric(name, kind, help_text, buckets)
+
+    def _series(self, name, kind, labels):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = _Metric(name, kind, "")
+        elif metric.kind != kind:
+            raise ValueError(f"Metric '{name}' is a {metric.kind}, not a {kind}.")
+        key = tuple(sorted((key, str(value)) for key, value in labels.items()))
+        return metric, key
+
+    def inc(self, name, amount=1, **labels):
+        with self._lock:
+            metric, key = self._series(name, COUNTER, labels)
+            metric.series[key] = metric.series.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            metric, key = self._series(name, GAUGE, labels)
+            metric.series[key] = value
+
+    def set_max(self, name, value, **labels):
+        """Raise a gauge to `value` if it is the highest seen so far"""
+        with self._lock:
+            metric, key = self._series(name, GAUGE, labels)
+            metric.series[key] = max(metric.series.get(key, value), value)
+
+    def observe(self, name, value, **labels):
+        with self._lock:
+            metric, key = self._series(name, HISTOGRAM, labels)
+            series = metric.series.get(key)
+            if series is None:
+                series = metric.series[key] = [[0] * len(metric.buckets), 0.0, 0]
+            for index, bound in enumerate(metric.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def span(self, name, **labels):
+        """Observe the wall time of the enclosed block in histogram `name`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for metric in self._metrics.values():
+                if not metric.series:
+                    continue
+                if metric.help_text:
+                    lines.append(f"# HELP {metric.name} {metric.help_text}")
+                lines.append(f"# TYPE {metric.name} {metric.kind}")
+                for key, value in sorted(metric.series.items()):
+                    if metric.kind == HISTOGRAM:
+                        lines.extend(self._render_histogram(metric, key, value))
+                    else:
+                        lines.append(f"{metric.name}{_labels(key)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _render_histogram(metric, key, series):
+        bucket_counts, total, count = series
+        for bound, bucket_count in zip(metric.buckets, bucket_counts):
+            bucket_key = key + (("le", _number(bound)),)
+            yield f"{metric.name}_bucket{_labels(bucket_key)} {bucket_count}"
+        yield f"{metric.name}_bucket{_labels(key + (('le', '+Inf'),))} {count}"
+        yield f"{metric.name}_sum{_labels(key)} {_number(total)}"
+        yield f"{metric.name}_count{_labels(key)} {count}"
+
+
+def merge_rendered(sources):
+    """Combine rendered registries into one exposition.
+
+    `sources` is a list of (text, labels) pairs; `labels` are added to every
+    sample of that text, e.g. `{"worker": "xpu:0"}`. Samples of a metric
+    from all sources are grouped under one HELP/TYPE header.
+    """
+    families = {}
+    for text, labels in sources:
+        extra = ",".join(
+            f'{name}="{_escape(str(value))}"' for name, value in labels.items()
+        )
+        family = None
+        for line in text.splitlines():
+            if line.startswith("# HELP ") or line.startswith("# TYPE "):
+                name, _, value = line[7:].partition(" ")
+                family = families.setdefault(
+                    name, {"help": None, "type": None, "samples": []}
+                )
+                family["help" if line[2] == "H" else "type"] = value
+            elif line and not line.startswith("#") and family is not None:
+                family["samples"].append(_add_labels(line, extra))
+    lines = []
+    for name, family in families.items():
+        if not family["samples"]:
+            continue
+        if family["help"]:
+            lines.append(f"# HELP {name} {family['help']}")
+        if family["type"]:
+            lines.append(f"# TYPE {name} {family['type']}")
+        lines.extend(family["samples"])
+    return "\n".join(lines) + "\n"
+
+
+def _add_labels(sample, extra):
+    if not extra:
+        return sample
+    name, brace, rest = sample.partition("{")
+    if brace:
+        return f"{name}{{{extra},{rest}"
+    name, _, value = sample.partition(" ")
+    return f"{name}{{{extra}}} {value}"
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(key):
+    if not key:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in key) + "}"
+
+
+def _number(value):
+    if isinstance(value, float) and math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+metrics = MetricsRegistry()
+
+metrics.describe(
+    "arttic_queue_wait_seconds", HISTOGRAM, "Time jobs spent queued before running."
+)
+metrics.describe("arttic_jobs_total", COUNTER, "Finished jobs by kind and status.")
+metrics.describe("arttic_queue_depth", GAUGE, "Jobs currently queued or running.")
+metrics.describe(
+    "arttic_generation_seconds",
+    HISTOGRAM,
+    "End-to-end sampling time of a generation pass, excluding the file write.",
+)
+metrics.describe(
+    "arttic_generation_stage_seconds",
+    HISTOGRAM,
+    "Time spent in each stage of image generation and saving.",
+)
+metrics.describe(
+    "arttic_denoise_step_seconds",
+    HISTOGRAM,
+    "Duration of individual denoising steps.",
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 32),
+)
+metrics.describe("arttic_images_total", COUNTER, "Images produced by the sampler.")
+metrics.describe(
+    "arttic_generation_failures_total", COUNTER, "Failed generation passes by reason."
+)
+metrics.describe(
+    "arttic_embedding_cache_total",
+    COUNTER,
+    "Prompt embedding cache lookups by result (hit or miss).",
+)
+metrics.describe(
+    "arttic_model_load_seconds", HISTOGRAM, "Total time to make a model ready."
+)
+metrics.describe(
+    "arttic_model_load_stage_seconds", HISTOGRAM, "Time spent in each model load stage."
+)
+metrics.describe(
+    "arttic_model_loads_total", COUNTER, "Model loads by source (disk or cache)."
+)
+metrics.describe(
+    "arttic_generation_peak_memory_bytes",
+    GAUGE,
+    "Peak device memory allocated during the most recent generation.",
+)
+metrics.describe(
+    "arttic_peak_memory_bytes",
+    GAUGE,
+    "Highest peak memory observed during any generation.",
+)
+metrics.describe(
+    "arttic_device_memory_bytes", GAUGE, "Device memory by kind (total, reserved)."
+)
+metrics.describe(
+    "arttic_memory_admission_total",
+    COUNTER,
+    "Generation passes by memory decision (ok, tile or reject).",
+)
+metrics.describe("arttic_ws_connections", GAUGE, "Connected WebSocket clients.")
+metrics.describe(
+    "arttic_ws_frames_coalesced_total",
+    COUNTER,
+    "Queued WebSocket frames replaced by a newer frame of the same type.",
+)
+metrics.describe(
+    "arttic_ws_frames_dropped_total",
+    COUNTER,
+    "WebSocket frames dropped because a client fell behind.",
+)
+metrics.describe(
+    "arttic_ws_disconnects_total",
+    COUNTER,
+    "WebSocket clients disconnected for not keeping up.",
+)
+metrics.describe(
+    "arttic_router_dispatch_total",
+    COUNTER,
+    "Jobs routed to each worker, by reason (loaded, cached or load).",
+)
+metrics.describe(
+    "arttic_worker_up", GAUGE, "Whether each inference worker is answering."
+)
+metrics.describe(
+    "arttic_worker_queue_depth", GAUGE, "Jobs queued or running on each worker."
+)
+metrics.describe(
+    "arttic_worker_free_memory_bytes",
+    GAUGE,
+    "Unreserved device memory reported by each worker.",
+)
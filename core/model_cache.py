@@ -0,0 +1,124 @@
+import gc
+import itertools
+import logging
+import threading
+from collections import OrderedDict
+import torch
+
+logger = logging.getLogger("arttic_lab")
+
+GB = 1024**3
+DEFAULT_RAM_BUDGET_GB = 16
+
+
+def pipeline_bytes(pipe):
+    """Bytes held by the parameters and buffers of every pipeline component"""
+    total = 0
+    for component in pipe.pipe.components.values():
+        if isinstance(component, torch.nn.Module):
+            for tensor in itertools.chain(component.parameters(), component.buffers()):
+                total += tensor.numel() * tensor.element_size()
+    return total
+
+
+class ModelCache:
+    """Keeps recently used, already optimized pipelines parked in host RAM.
+
+    Only the active pipeline lives on the device. Unloading parks it here
+    instead of destroying it, so switching back is a device transfer rather
+    than a full parse of the checkpoint. Entries are evicted least recently
+    used first once their combined size exceeds the RAM budget.
+    """
+
+    def __init__(self, ram_budget_gb=DEFAULT_RAM_BUDGET_GB):
+        self.ram_budget = int(ram_budget_gb * GB)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def configure(self, ram_budget_gb):
+        with self._lock:
+            self.ram_budget = max(0, int(float(ram_budget_gb) * GB))
+            evicted = self._evict_locked()
+        self._release(evicted)
+        if self.ram_budget:
+            logger.info(f"Model cache budget set to {ram_budget_gb} GB of host RAM.")
+        else:
+            logger.info("Model cache disabled.")
+
+    @staticmethod
+    def make_key(model_name, cpu_offload):
+        # LoRAs are adapters that travel with the pipeline, not part of its identity.
+        return (model_name, bool(cpu_offload))
+
+    def park(self, key, pipe):
+        """Move a pipeline off the device and keep it for later reuse"""
+        size = pipeline_bytes(pipe)
+        if size > self.ram_budget:
+            logger.info(
+                f"Not caching '{key[0]}' ({size / GB:.1f} GB exceeds the model cache budget)."
+            )
+            self._release([(key, pipe)])
+            return False
+
+        try:
+            pipe.offload_to_host()
+        except Exception as e:
+            logger.warning(f"Could not park '{key[0]}' in host RAM: {e}")
+            self._release([(key, pipe)])
+            return False
+
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (pipe, size)
+            evicted = self._evict_locked()
+        self._release(evicted)
+        logger.info(f"Parked '{key[0]}' in host RAM ({size / GB:.1f} GB).")
+        return True
+
+    def checkout(self, key):
+        """Remove and return a parked pipeline, or None if it is not cached"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        return entry[0] if entry else None
+
+    def discard_model(self, model_name):
+        with self._lock:
+            keys = [key for key in self._entries if key[0] == model_name]
+            dropped = [(key, self._entries.pop(key)[0]) for key in keys]
+        self._release(dropped)
+
+    def clear(self):
+        with self._lock:
+            dropped = [(key, pipe) for key, (pipe, _) in self._entries.items()]
+            self._entries.clear()
+        self._release(dropped)
+
+    def cached_models(self):
+        with self._lock:
+            return [
+                {"model_name": key[0], "cpu_offload": key[1], "size_gb": size / GB}
+                for key, (_, size) in reversed(self._entries.items())
+            ]
+
+    def _evict_locked(self):
+        evicted = []
+        total = sum(size for _, size in self._entries.values())
+        while self._entries and total > self.ram_budget:
+            key, (pipe, size) = self._entries.popitem(last=False)
+            total -= size
+            evicted.append((key, pipe))
+        return evicted
+
+    @staticmethod
+    def _release(entries):
+        if not entries:
+            return
+        for key, pipe in entries:
+            logger.info(f"Evicting '{key[0]}' from the model cache.")
+            if hasattr(pipe, "pipe"):
+                del pipe.pipe
+        del entries[:]
+        gc.collect()
+
+
+model_cache = ModelCache()
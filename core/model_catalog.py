@@ -0,0 +1,246 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from pipelines.detector import (
+    ARCHITECTURE_LABELS,
+    architecture_detector,
+    read_safetensors_header,
+)
+
+logger = logging.getLogger("arttic_lab")
+
+CATALOG_FILE = os.path.join("./cache", "model_catalog.json")
+CATALOG_DIRS = {"model": "./models", "lora": "./loras"}
+POLL_INTERVAL = 5.0
+HASH_CHUNK_BYTES = 1024 * 1024
+GB = 1024**3
+
+DTYPE_BYTES = {
+    "F64": 8,
+    "I64": 8,
+    "U64": 8,
+    "F32": 4,
+    "I32": 4,
+    "U32": 4,
+    "F16": 2,
+    "BF16": 2,
+    "I16": 2,
+    "U16": 2,
+    "F8_E4M3": 1,
+    "F8_E5M2": 1,
+    "I8": 1,
+    "U8": 1,
+    "BOOL": 1,
+}
+
+DEFAULT_RESOLUTIONS = {
+    "sd15": 512,
+    "sd2": 768,
+    "sdxl": 1024,
+    "sd3": 1024,
+    "flux": 1024,
+}
+
+
+def quick_hash(path, header_size, size):
+    """Hash the header, size and first/last MiB instead of the whole file"""
+    digest = hashlib.sha256(str(size).encode())
+    with open(path, "rb") as f:
+        digest.update(f.read(8 + header_size + HASH_CHUNK_BYTES))
+        if size > 8 + header_size + 2 * HASH_CHUNK_BYTES:
+            f.seek(-HASH_CHUNK_BYTES, os.SEEK_END)
+            digest.update(f.read(HASH_CHUNK_BYTES))
+    return digest.hexdigest()[:16]
+
+
+def _summarize_tensors(header):
+    param_count = 0
+    bytes_by_dtype = {}
+    for key, info in header.items():
+        if key == "__metadata__" or not isinstance(info, dict):
+            continue
+        count = 1
+        for dim in info.get("shape", []):
+            count *= dim
+        param_count += count
+        dtype = info.get("dtype", "")
+        tensor_bytes = count * DTYPE_BYTES.get(dtype, 0)
+        bytes_by_dtype[dtype] = bytes_by_dtype.get(dtype, 0) + tensor_bytes
+    dtype = max(bytes_by_dtype, key=bytes_by_dtype.get) if bytes_by_dtype else None
+    return param_count, dtype
+
+
+class ModelCatalog:
+    """Indexed view of the checkpoints in ./models and ./loras.
+
+    Each file is inspected once (header only) and remembered by size and
+    mtime in a JSON index. A polling watcher thread picks up files that are
+    added, replaced or removed, so listing models never scans or opens the
+    checkpoints on the request path.
+    """
+
+    def __init__(
+        self, directories=None, catalog_file=CATALOG_FILE, poll_interval=POLL_INTERVAL
+    ):
+        self.directories = directories or dict(CATALOG_DIRS)
+        self.catalog_file = catalog_file
+        self.poll_interval = poll_interval
+        self._lock = threading.RLock()
+        self._entries = None
+        self._listeners = []
+        self._watcher = None
+        self._stop = threading.Event()
+
+    def add_change_listener(self, listener):
+        self._listeners.append(listener)
+
+    def _load(self):
+        if self._entries is None:
+            try:
+                with open(self.catalog_file, "r", encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except (FileNotFoundError, ValueError):
+                self._entries = {}
+            self._scan_locked()
+        return self._entries
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.catalog_file) or ".", exist_ok=True)
+        tmp_path = f"{self.catalog_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.catalog_file)
+
+    def _inspect(self, kind, path, stat):
+        entry = {
+            "kind": kind,
+            "filename": os.path.basename(path),
+            "name": os.path.splitext(os.path.basename(path))[0],
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "architecture": None,
+            "param_count": None,
+            "dtype": None,
+            "hash": None,
+        }
+        try:
+            header = read_safetensors_header(path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read header of '{path}': {e}")
+            return entry
+
+        entry["param_count"], entry["dtype"] = _summarize_tensors(header)
+        if kind == "model":
+            entry["architecture"] = architecture_detector.detect(path, header=header)
+        try:
+            with open(path, "rb") as f:
+                header_size = int.from_bytes(f.read(8), "little")
+            entry["hash"] = quick_hash(path, header_size, stat.st_size)
+        except OSError as e:
+            logger.warning(f"Could not hash '{path}': {e}")
+        return entry
+
+    def _scan_locked(self):
+        seen = set()
+        changed = False
+        for kind, directory in self.directories.items():
+            os.makedirs(directory, exist_ok=True)
+            with os.scandir(directory) as entries:
+                for dir_entry in entries:
+                    if not dir_entry.name.endswith(".safetensors"):
+                        continue
+                    if not dir_entry.is_file():
+                        continue
+                    catalog_key = f"{kind}/{dir_entry.name}"
+                    seen.add(catalog_key)
+                    stat = dir_entry.stat()
+                    existing = self._entries.get(catalog_key)
+                    if (
+                        existing
+                        and existing["size"] == stat.st_size
+                        and existing["mtime_ns"] == stat.st_mtime_ns
+                    ):
+                        continue
+                    logger.info(f"Indexing {kind} '{dir_entry.name}'...")
+                    self._entries[catalog_key] = self._inspect(
+                        kind, dir_entry.path, stat
+                    )
+                    changed = True
+
+        for catalog_key in [key for key in self._entries if key not in seen]:
+            del self._entries[catalog_key]
+            changed = True
+
+        if changed:
+            try:
+                self._save()
+            except OSError as e:
+                logger.warning(f"Could not save model catalog: {e}")
+        return changed
+
+    def refresh(self):
+        """Rescan the directories now; returns True if anything changed"""
+        with self._lock:
+            if self._entries is None:
+                self._load()
+                return False
+            changed = self._scan_locked()
+        if changed:
+            for listener in self._listeners:
+                try:
+                    listener()
+                except Exception as e:
+                    logger.warning(f"Model catalog listener failed: {e}")
+        return changed
+
+    def list(self, kind):
+        with self._lock:
+            entries = [
+                dict(entry) for entry in self._load().values() if entry["kind"] == kind
+            ]
+        return sorted(entries, key=lambda entry: entry["filename"])
+
+    def get(self, kind, name):
+        with self._lock:
+            for entry in self._load().values():
+                if entry["kind"] == kind and name in (entry["name"], entry["filename"]):
+                    return dict(entry)
+        return None
+
+    def start_watcher(self):
+        if self._watcher is None or not self._watcher.is_alive():
+            self._stop.clear()
+            self._watcher = threading.Thread(
+                target=self._watch, name="arttic-model-catalog", daemon=True
+            )
+            self._watcher.start()
+
+    def stop_watcher(self):
+        self._stop.set()
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning(f"Model catalog refresh failed: {e}")
+
+
+def describe_entry(entry):
+    """Public view of a catalog entry for the API and UI"""
+    architecture = entry.get("architecture")
+    return {
+        "name": entry["name"],
+        "filename": entry["filename"],
+        "architecture": ARCHITECTURE_LABELS.get(architecture),
+        "default_resolution": DEFAULT_RESOLUTIONS.get(architecture),
+        "param_count": entry["param_count"],
+        "dtype": entry["dtype"],
+        "size_gb": round(entry["size"] / GB, 2),
+        "hash": entry["hash"],
+    }
+
+
+model_catalog = ModelCatalog()
@@ -0,0 +1,94 @@
+import os
+import re
+import threading
+import logging
+
+logger = logging.getLogger("arttic_lab")
+
+OUTPUTS_DIR = "./outputs"
+COUNTER_FILE = os.path.join("./cache", "output_counter")
+FILENAME_PREFIX = "ArtTic-LAB_"
+FILENAME_PATTERN = re.compile(rf"^{re.escape(FILENAME_PREFIX)}(\d+)\.\w+$")
+
+
+class OutputAllocator:
+    """Hands out unique ArtTic-LAB_N filenames in constant time.
+
+    The counter lives in memory behind a lock and is persisted to a small
+    file; the outputs directory is only scanned once to seed it. Each name
+    is claimed with an exclusive create, so concurrent writers (threads or
+    separate processes sharing ./outputs) can never land on the same file.
+    """
+
+    def __init__(self, outputs_dir=OUTPUTS_DIR, counter_file=COUNTER_FILE):
+        self.outputs_dir = outputs_dir
+        self.counter_file = counter_file
+        self._lock = threading.Lock()
+        self._next_number = None
+
+    def _read_counter(self):
+        try:
+            with open(self.counter_file, "r", encoding="utf-8") as f:
+                return int(f.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def _write_counter(self, value):
+        os.makedirs(os.path.dirname(self.counter_file) or ".", exist_ok=True)
+        tmp_suffix = f"{os.getpid()}.{threading.get_ident()}.tmp"
+        tmp_path = f"{self.counter_file}.{tmp_suffix}"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(str(value))
+        os.replace(tmp_path, self.counter_file)
+
+    def _scan_highest_number(self):
+        highest_num = 0
+        if not os.path.isdir(self.outputs_dir):
+            return highest_num
+        with os.scandir(self.outputs_dir) as entries:
+            for entry in entries:
+                match = FILENAME_PATTERN.match(entry.name)
+                if match:
+                    highest_num = max(highest_num, int(match.group(1)))
+        return highest_num
+
+    def seed(self):
+        with self._lock:
+            self._seed_locked()
+
+    def _seed_locked(self):
+        scanned = self._scan_highest_number() + 1
+        self._next_number = max(scanned, self._read_counter())
+        logger.info(f"Output counter seeded at {self._next_number}.")
+
+    def allocate(self, extension=".png"):
+        """Reserve the next free output file and return (filename, filepath).
+
+        The returned path already exists as an empty file owned by the
+        caller, who is expected to overwrite it (or remove it on failure).
+        """
+        os.makedirs(self.outputs_dir, exist_ok=True)
+        with self._lock:
+            if self._next_number is None:
+                self._seed_locked()
+            while True:
+                number = self._next_number
+                self._next_number += 1
+                filename = f"{FILENAME_PREFIX}{number}{extension}"
+                filepath = os.path.join(self.outputs_dir, filename)
+                try:
+                    fd = os.open(filepath, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                except FileExistsError:
+                    # Another process may be allocating too; skip past its counter.
+                    self._next_number = max(self._next_number, self._read_counter())
+                    continue
+                os.close(fd)
+                break
+            try:
+                self._write_counter(self._next_number)
+            except OSError as e:
+                logger.warning(f"Could not persist output counter: {e}")
+        return filename, filepath
+
+
+output_allocator = OutputAllocator()
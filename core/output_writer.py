@@ -0,0 +1,84 @@
+import os
+import queue
+import atexit
+import threading
+import logging
+from concurrent.futures import Future
+from .metadata_handler import metadata_handler
+
+logger = logging.getLogger("arttic_lab")
+
+MAX_PENDING_WRITES = 4
+
+
+class OutputWriter:
+    """Encodes and writes finished images on a dedicated thread.
+
+    The queue is bounded so a slow disk applies backpressure to the sampler
+    instead of letting decoded images pile up in RAM.
+    """
+
+    def __init__(self, max_pending=MAX_PENDING_WRITES):
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        with self._start_lock:
+            if self._thread is None:
+                atexit.register(self.drain)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="arttic-output-writer", daemon=True
+                )
+                self._thread.start()
+
+    def submit(self, image, filepath, metadata, image_format="png", compress_level=6):
+        """Queue an image for writing and return a Future resolving to its path"""
+        self._ensure_started()
+        future = Future()
+        self._queue.put(
+            (future, image, filepath, metadata, image_format, compress_level)
+        )
+        return future
+
+    def drain(self):
+        """Block until every queued image has been written"""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+
+    @staticmethod
+    def _discard(filepath):
+        try:
+            os.remove(filepath)
+        except OSError:
+            pass
+
+    def _run(self):
+        while True:
+            future, image, filepath, metadata, image_format, compress_level = (
+                self._queue.get()
+            )
+            try:
+                if not future.set_running_or_notify_cancel():
+                    self._discard(filepath)
+                    continue
+                try:
+                    metadata_handler.save_image_with_metadata(
+                        image,
+                        filepath,
+                        metadata,
+                        image_format=image_format,
+                        compress_level=compress_level,
+                    )
+                except Exception as e:
+                    logger.error(f"Failed to write '{filepath}': {e}", exc_info=True)
+                    self._discard(filepath)
+                    future.set_exception(e)
+                else:
+                    future.set_result(filepath)
+            finally:
+                self._queue.task_done()
+
+
+output_writer = OutputWriter()
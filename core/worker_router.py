@@ -0,0 +1,583 @@
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import logging
+import threading
+import subprocess
+from collections import deque
+import requests
+from pipelines.backends import list_devices, physical_core_count
+from .job_scheduler import (
+    Job,
+    JobCancelled,
+    MAX_FINISHED_JOBS,
+    QUEUED,
+    RUNNING,
+    DONE,
+    FAILED,
+    CANCELLED,
+    FINISHED_STATES,
+)
+from .gallery_index import gallery_index
+from .metrics import metrics, merge_rendered
+from .logic import OOMError
+
+logger = logging.getLogger("arttic_lab")
+
+APP_SCRIPT = "app.py"
+POLL_INTERVAL = 2
+CONNECT_TIMEOUT = 5
+# Workers send an SSE keep-alive every 15s; four missed ones means it is gone.
+EVENT_READ_TIMEOUT = 60
+# How many queued jobs a model switch is worth when choosing a worker.
+LOAD_COST = 4
+CACHED_LOAD_COST = 2
+CALLBACK_KWARGS = (
+    "progress_callback",
+    "loop",
+    "completion_callback",
+    "item_callback",
+    "preview_callback",
+)
+MODEL_JOB_KINDS = ("generate_image", "generate_batch")
+FANOUT_JOB_KINDS = ("unload_model", "clear_cache", "invalidate_file")
+REMOTE_ERRORS = {
+    "JobCancelled": JobCancelled,
+    "OOMError": OOMError,
+    "ValueError": ValueError,
+    "ConnectionAbortedError": ConnectionAbortedError,
+}
+
+
+def plan_workers(spec):
+    """Devices for --workers: "auto", a count, or e.g. "xpu:0,xpu:1" / "cpu:0,cpu:1" """
+    available = list_devices()
+    spec = (spec or "auto").strip()
+    if spec == "auto":
+        return available
+    if spec.isdigit():
+        count = int(spec)
+        if not 1 <= count <= len(available):
+            raise ValueError(
+                f"Asked for {count} workers but only {len(available)} devices "
+                f"are available ({', '.join(d['name'] for d in available)})."
+            )
+        return available[:count]
+    by_name = {device["name"]: device for device in available}
+    planned = []
+    for name in (part.strip() for part in spec.split(",") if part.strip()):
+        if name not in by_name:
+            raise ValueError(
+                f"Unknown worker device '{name}'. Available: {', '.join(by_name)}."
+            )
+        planned.append(by_name[name])
+    return planned
+
+
+class WorkerProcess:
+    """One app.py --worker process that owns a single device.
+
+    Intel GPUs are pinned with ZE_AFFINITY_MASK, so every worker sees its
+    card as xpu:0. NUMA nodes are pinned with numactl when it is installed
+    (CPUs and memory), otherwise by CPU affinity only.
+    """
+
+    def __init__(self, device, port, worker_args=()):
+        self.name = device["name"]
+        self.device = device["device"]
+        self.index = device["index"]
+        self.cpus = device["cpus"]
+        self.port = port
+        self.url = f"http://127.0.0.1:{port}"
+        self.worker_args = list(worker_args)
+        self.process = None
+        self.session = requests.Session()
+        self.healthy = False
+        self.status = {}
+        self.queue_depth = 0
+        self.assigned_model = None
+
+    def start(self):
+        command = [
+            sys.executable,
+            APP_SCRIPT,
+            "--worker",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(self.port),
+            "--device",
+            self.device,
+            *self.worker_args,
+        ]
+        env = os.environ.copy()
+        popen_kwargs = {}
+        if self.device == "xpu":
+            env["ZE_AFFINITY_MASK"] = str(self.index)
+        if self.cpus:
+            command += ["--threads", str(physical_core_count(self.cpus))]
+            if shutil.which("numactl"):
+                command = [
+                    "numactl",
+                    f"--cpunodebind={self.index}",
+                    f"--membind={self.index}",
+                    *command,
+                ]
+            elif hasattr(os, "sched_setaffinity"):
+                cpus = self.cpus
+                popen_kwargs["preexec_fn"] = lambda: os.sched_setaffinity(0, cpus)
+        logger.info(f"Starting worker {self.name} on port {self.port}...")
+        self.process = subprocess.Popen(command, env=env, **popen_kwargs)
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+    def poll(self):
+        if self.process and self.process.poll() is not None:
+            if self.healthy or not self.status:
+                logger.error(
+                    f"Worker {self.name} exited with code {self.process.returncode}."
+                )
+            self.healthy = False
+            self.status = {"exited": True}
+            return
+        try:
+            response = self.session.get(
+                f"{self.url}/api/worker", timeout=CONNECT_TIMEOUT
+            )
+            response.raise_for_status()
+            status = response.json()
+        except (requests.RequestException, ValueError):
+            if self.healthy:
+                logger.warning(f"Worker {self.name} stopped answering.")
+            self.healthy = False
+            return
+        if not self.healthy:
+            logger.info(f"Worker {self.name} is ready ({status['device']}).")
+        self.healthy = True
+        self.status = status
+        self.queue_depth = status["queue_depth"]
+        # While jobs are queued the worker may not have reached the model we
+        # sent it yet, so keep assuming it until the queue drains.
+        if self.queue_depth == 0:
+            self.assigned_model = None
+
+    def has_model(self):
+        return bool(self.assigned_model or self.status.get("is_model_loaded"))
+
+    def free_memory(self):
+        memory = self.status.get("memory")
+        if not memory:
+            return 0
+        return memory["total"] - memory["reserved"]
+
+    def load_cost(self, model):
+        if not model:
+            return 0
+        key = _model_key(model)
+        loaded = self.assigned_model
+        if loaded is None and self.status.get("is_model_loaded"):
+            loaded = _model_key(self.status)
+        if loaded == key:
+            return 0
+        for cached in self.status.get("cached_models", []):
+            if (cached["model_name"], cached["cpu_offload"]) == key:
+                return CACHED_LOAD_COST
+        return LOAD_COST
+
+    def describe(self):
+        if not self.healthy:
+            return f"{self.name}: unavailable"
+        model_name = self.status.get("model_name")
+        return f"{self.name}: {model_name or 'no model'}"
+
+
+class RemoteJob(Job):
+    """A job run on a worker process, shaped like a local scheduler Job"""
+
+    def __init__(self, kind, kwargs, client_id, priority, on_update, cancellable):
+        super().__init__(
+            kind,
+            None,
+            kwargs,
+            client_id=client_id,
+            priority=priority,
+            on_update=on_update,
+            cancellable=cancellable,
+        )
+        self.worker = None
+        self.remote_id = None
+
+    def to_dict(self):
+        data = super().to_dict()
+        data["worker"] = self.worker.name if self.worker else None
+        return data
+
+
+class WorkerRouter:
+    """Front-process stand-in for the job scheduler that runs jobs on workers.
+
+    Each worker is a full ArtTic-LAB server on a private port with its own
+    model residency and queue; jobs are forwarded through its /api/jobs
+    endpoints and followed over SSE, with progress, previews and saved
+    images relayed to the original callbacks. A generation is sent to the
+    worker where it is cheapest, counting queued jobs plus the cost of
+    switching models, and carries the client's model so the worker loads it
+    first if it has to. Unload and clear-cache go to every worker involved.
+    """
+
+    def __init__(self, devices, base_port, worker_args=()):
+        self.workers = [
+            WorkerProcess(device, base_port + index, worker_args)
+            for index, device in enumerate(devices)
+        ]
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._finished = deque()
+        self._client_models = {}
+        self._default_model = None
+        self._poller = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        for worker in self.workers:
+            worker.start()
+        self._poller = threading.Thread(
+            target=self._poll_workers, name="arttic-worker-router", daemon=True
+        )
+        self._poller.start()
+
+    def stop(self):
+        self._stopped.set()
+        for worker in self.workers:
+            worker.stop()
+
+    def _poll_workers(self):
+        while not self._stopped.is_set():
+            for worker in self.workers:
+                worker.poll()
+            self._stopped.wait(POLL_INTERVAL)
+
+    def get_app_status(self):
+        loaded = [w for w in self.workers if w.status.get("is_model_loaded")]
+        if not loaded:
+            return {"is_model_loaded": False, "status_message": "No model loaded."}
+        return {
+            "is_model_loaded": True,
+            "status_message": "Ready: " + "; ".join(w.describe() for w in loaded),
+        }
+
+    def get_metrics_text(self):
+        for worker in self.workers:
+            metrics.set("arttic_worker_up", int(worker.healthy), worker=worker.name)
+            metrics.set(
+                "arttic_worker_queue_depth", worker.queue_depth, worker=worker.name
+            )
+            if worker.status.get("memory"):
+                metrics.set(
+                    "arttic_worker_free_memory_bytes",
+                    worker.free_memory(),
+                    worker=worker.name,
+                )
+        metrics.set("arttic_queue_depth", self.queue_depth())
+        sources = [(metrics.render(), {})]
+        # Generation, stage and queue metrics are recorded in the workers.
+        for worker in self.workers:
+            if not worker.healthy:
+                continue
+            try:
+                response = worker.session.get(
+                    f"{worker.url}/api/metrics", timeout=CONNECT_TIMEOUT
+                )
+                response.raise_for_status()
+            except requests.RequestException as e:
+                logger.warning(f"Could not read metrics from {worker.name}: {e}")
+                continue
+            sources.append((response.text, {"worker": worker.name}))
+        return merge_rendered(sources)
+
+    # The JobScheduler interface used by web/server.py. `func`, `batch_key`
+    # and `batch_func` are local concerns; workers batch on their own.
+
+    def submit(
+        self,
+        kind,
+        func,
+        kwargs=None,
+        client_id=None,
+        priority=0,
+        on_update=None,
+        cancellable=False,
+        batch_key=None,
+        batch_func=None,
+    ):
+        job = RemoteJob(kind, kwargs, client_id, priority, on_update, cancellable)
+        with self._lock:
+            self._jobs[job.id] = job
+        threading.Thread(
+            target=self._run, args=(job,), name="arttic-remote-job", daemon=True
+        ).start()
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def queue_depth(self):
+        return sum(worker.queue_depth for worker in self.workers if worker.healthy)
+
+    def cancel(self, job_id, client_id=None):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or (client_id is not None and job.client_id != client_id):
+                return False
+            if job.status in FINISHED_STATES:
+                return False
+            job.cancel_event.set()
+            worker, remote_id = job.worker, job.remote_id
+        if remote_id is None:
+            # Not handed to a worker yet; _run notices before dispatching.
+            return True
+        try:
+            response = worker.session.delete(
+                f"{worker.url}/api/jobs/{remote_id}", timeout=CONNECT_TIMEOUT
+            )
+        except requests.RequestException:
+            return False
+        return response.status_code == 200
+
+    def cancel_client_jobs(self, client_id):
+        with self._lock:
+            job_ids = [
+                job.id
+                for job in self._jobs.values()
+                if job.client_id == client_id and job.status in (QUEUED, RUNNING)
+            ]
+        for job_id in job_ids:
+            self.cancel(job_id, client_id)
+        self._client_models.pop(client_id, None)
+
+    def _run(self, job):
+        kwargs = dict(job.kwargs)
+        callbacks = {name: kwargs.pop(name, None) for name in CALLBACK_KWARGS}
+        try:
+            if job.kind in FANOUT_JOB_KINDS:
+                result = self._run_fanout(job, kwargs)
+            else:
+                result = self._run_routed(job, kwargs, callbacks)
+        except JobCancelled as e:
+            self._finish(job, CANCELLED, e)
+        except Exception as e:
+            self._finish(job, FAILED, e)
+        else:
+            self._finish(job, DONE, result)
+
+    def _run_routed(self, job, params, callbacks):
+        if job.kind == "load_model":
+            model = params
+        else:
+            model = (
+                params.get("model")
+                or self._client_models.get(job.client_id)
+                or self._default_model
+            )
+            if job.kind in MODEL_JOB_KINDS:
+                if not model:
+                    raise ConnectionAbortedError("Cannot generate, no model is loaded.")
+                params["model"] = model
+            if callbacks["preview_callback"]:
+                params["live_preview"] = True
+
+        worker = self._pick_worker(model)
+        try:
+            result = self._dispatch(job, worker, params, callbacks)
+        finally:
+            worker.queue_depth = max(0, worker.queue_depth - 1)
+        if job.kind == "load_model":
+            if job.client_id:
+                self._client_models[job.client_id] = model
+            self._default_model = model
+        return result
+
+    def _run_fanout(self, job, params):
+        if job.kind == "unload_model":
+            # Only the caller's own model; others' models stay where they are.
+            model = self._client_models.pop(job.client_id, None)
+            in_use = model and any(
+                _model_key(other) == _model_key(model)
+                for other in self._client_models.values()
+            )
+            targets = [
+                worker
+                for worker in self.workers
+                if worker.healthy
+                and model
+                and not in_use
+                and worker.load_cost(model) == 0
+            ]
+            if model and model == self._default_model:
+                self._default_model = next(iter(self._client_models.values()), None)
+            if not targets:
+                return {"status_message": "No model loaded."}
+        else:
+            targets = [worker for worker in self.workers if worker.healthy]
+        result = None
+        for worker in targets:
+            result = self._dispatch(job, worker, params, {})
+            if job.kind == "unload_model":
+                worker.assigned_model = None
+        return result
+
+    def _pick_worker(self, model):
+        candidates = [worker for worker in self.workers if worker.healthy]
+        if not candidates:
+            raise RuntimeError("No inference worker is ready yet.")
+        with self._lock:
+            # Ties go to a worker with nothing loaded, so a new model does
+            # not evict one that other clients are using.
+            worker = min(
+                candidates,
+                key=lambda w: (
+                    w.queue_depth + w.load_cost(model),
+                    w.has_model(),
+                    -w.free_memory(),
+                ),
+            )
+            cost = worker.load_cost(model)
+            worker.queue_depth += 1
+            if model:
+                worker.assigned_model = _model_key(model)
+        reason = "loaded" if cost == 0 else "cached" if cost < LOAD_COST else "load"
+        metrics.inc("arttic_router_dispatch_total", worker=worker.name, reason=reason)
+        return worker
+
+    def _dispatch(self, job, worker, params, callbacks):
+        """Run one job on `worker` and return its result"""
+        body = {"kind": job.kind, "priority": job.priority, **params}
+        with self._lock:
+            if job.cancel_event.is_set():
+                raise JobCancelled("Job was cancelled before it started.")
+            job.worker = worker
+        try:
+            response = worker.session.post(
+                f"{worker.url}/api/jobs", json=body, timeout=CONNECT_TIMEOUT
+            )
+        except requests.RequestException as e:
+            worker.healthy = False
+            raise RuntimeError(f"Worker {worker.name} is unavailable: {e}")
+        if response.status_code != 202:
+            raise ValueError(_response_error(response))
+        with self._lock:
+            job.remote_id = response.json()["job_id"]
+            cancelled = job.cancel_event.is_set()
+        if cancelled:
+            self.cancel(job.id)
+
+        try:
+            for event, data in self._events(worker, job.remote_id):
+                if event == "status":
+                    self._on_remote_status(job, data)
+                elif event == "progress":
+                    _call(
+                        callbacks,
+                        "progress_callback",
+                        data["progress"],
+                        data["description"],
+                    )
+                elif event == "preview":
+                    _call(callbacks, "preview_callback", data)
+                elif event == "item":
+                    _call(callbacks, "item_callback", _with_gallery_item(data))
+                elif event == "result":
+                    if job.kind == "generate_image":
+                        _call(
+                            callbacks, "completion_callback", _with_gallery_item(data)
+                        )
+                    return data
+                elif event == "error":
+                    error_class = REMOTE_ERRORS.get(data.get("type"), RuntimeError)
+                    raise error_class(data["message"])
+        except requests.RequestException as e:
+            raise RuntimeError(f"Lost track of the job on worker {worker.name}: {e}")
+        raise RuntimeError(f"Worker {worker.name} ended the job without a result.")
+
+    @staticmethod
+    def _events(worker, remote_id):
+        url = f"{worker.url}/api/jobs/{remote_id}/events"
+        with worker.session.get(
+            url, stream=True, timeout=(CONNECT_TIMEOUT, EVENT_READ_TIMEOUT)
+        ) as response:
+            response.raise_for_status()
+            event, data = None, []
+            for line in response.iter_lines(decode_unicode=True):
+                if line:
+                    if line.startswith("event:"):
+                        event = line[6:].strip()
+                    elif line.startswith("data:"):
+                        data.append(line[5:].strip())
+                    continue
+                if event:
+                    yield event, json.loads("\n".join(data))
+                event, data = None, []
+
+    @staticmethod
+    def _on_remote_status(job, status):
+        if status["status"] not in (QUEUED, RUNNING):
+            return
+        if status["status"] == RUNNING and job.started_at is None:
+            job.started_at = status["started_at"]
+        job.status = status["status"]
+        job.position = status["position"]
+        job._notify()
+
+    def _finish(self, job, status, value):
+        with self._lock:
+            job.status = status
+            job.position = None
+            job.finished_at = time.time()
+            self._finished.append(job.id)
+            while len(self._finished) > MAX_FINISHED_JOBS:
+                self._jobs.pop(self._finished.popleft(), None)
+        metrics.inc("arttic_jobs_total", kind=job.kind, status=status)
+        if status == DONE:
+            job.future.set_result(value)
+        else:
+            job.future.set_exception(value)
+        job._notify()
+
+
+def _model_key(model):
+    """(model, offload) as a worker reports them; LoRAs switch without a reload"""
+    return (model["model_name"], bool(model.get("cpu_offload")))
+
+
+def _call(callbacks, name, *args):
+    callback, loop = callbacks.get(name), callbacks.get("loop")
+    if callback and loop:
+        asyncio.run_coroutine_threadsafe(callback(*args), loop)
+
+
+def _with_gallery_item(completion):
+    # Workers write to the shared gallery index, so the entry is already there.
+    if "error" in completion or "image_filename" not in completion:
+        return dict(completion)
+    return {
+        **completion,
+        "gallery_item": gallery_index.get(completion["image_filename"]),
+    }
+
+
+def _response_error(response):
+    try:
+        detail = response.json().get("detail")
+    except ValueError:
+        detail = None
+    return str(detail or f"Worker answered {response.status_code}.")
@@ -2,9 +2,13 @@ import logging
 import sys
 import http
 import torch
-import intel_extension_for_pytorch as ipex
 import diffusers
 
+try:
+    import intel_extension_for_pytorch as ipex
+except ImportError:
+    ipex = None
+
 APP_LOGGER_NAME = "arttic_lab"
 APP_VERSION = "3.2.0"
 
@@ -84,17 +88,18 @@ def log_system_info():
     py_version = (
         f"{sys.version_info.major}.{sys.version_info.minor}.{sys.version_info.micro}"
     )
+    ipex_version = ipex.__version__ if ipex else "not installed"
     logger.info(
-        f"  Python: {py_version}, Torch: {torch.__version__}, IPEX: {ipex.__version__}, Diffusers: {diffusers.__version__}"
+        f"  Python: {py_version}, Torch: {torch.__version__}, IPEX: {ipex_version}, Diffusers: {diffusers.__version__}"
     )
 
-    if torch.xpu.is_available():
+    if hasattr(torch, "xpu") and torch.xpu.is_available():
         gpu_name = torch.xpu.get_device_name(0)
         logger.info(
             f"  Intel GPU: {CustomFormatter.MINT_2}{gpu_name}{CustomFormatter.RESET} (Detected)"
         )
     else:
-        logger.error("  Intel GPU: Not Detected! The application may not work.")
+        logger.warning("  Intel GPU: Not Detected. Pipelines can still run on the CPU.")
 
     logger.info("-" * 60)
 
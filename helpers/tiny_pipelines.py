@@ -0,0 +1,304 @@
+"""Tiny randomly initialized pipelines for benchmarking without checkpoints.
+
+Each class subclasses the real ArtTic pipeline for its architecture, so
+core.logic treats it exactly like a loaded model, but builds its components
+from small random configs instead of reading ./models. Nothing here touches
+the network.
+"""
+
+import os
+import json
+import tempfile
+import torch
+from diffusers import (
+    AutoencoderKL,
+    DDIMScheduler,
+    EulerDiscreteScheduler,
+    FlowMatchEulerDiscreteScheduler,
+    FluxPipeline,
+    FluxTransformer2DModel,
+    SD3Transformer2DModel,
+    StableDiffusion3Pipeline,
+    StableDiffusionPipeline,
+    StableDiffusionXLPipeline,
+    UNet2DConditionModel,
+)
+from transformers import (
+    CLIPTextConfig,
+    CLIPTextModel,
+    CLIPTextModelWithProjection,
+    CLIPTokenizer,
+    T5Config,
+    T5EncoderModel,
+)
+from transformers.models.clip.tokenization_clip import bytes_to_unicode
+from pipelines import register_pipeline
+from pipelines.sd15_pipeline import SD15Pipeline
+from pipelines.sd2_pipeline import SD2Pipeline
+from pipelines.sdxl_pipeline import SDXLPipeline
+from pipelines.sd3_pipeline import SD3Pipeline
+from pipelines.flux_pipeline import ArtTicFLUXPipeline
+
+TINY_SEED = 0
+_tokenizer_dir = None
+
+
+def _tiny_tokenizer():
+    """Byte-level CLIP tokenizer with no merges, written once to a temp dir"""
+    global _tokenizer_dir
+    if _tokenizer_dir is None:
+        _tokenizer_dir = tempfile.mkdtemp(prefix="arttic-tiny-tokenizer-")
+        vocab = {"<|startoftext|>": 0, "<|endoftext|>": 1}
+        for char in bytes_to_unicode().values():
+            vocab.setdefault(char, len(vocab))
+            vocab.setdefault(f"{char}</w>", len(vocab))
+        with open(
+            os.path.join(_tokenizer_dir, "vocab.json"), "w", encoding="utf-8"
+        ) as f:
+            json.dump(vocab, f)
+        with open(
+            os.path.join(_tokenizer_dir, "merges.txt"), "w", encoding="utf-8"
+        ) as f:
+            f.write("#version: 0.2\n")
+    return CLIPTokenizer(
+        os.path.join(_tokenizer_dir, "vocab.json"),
+        os.path.join(_tokenizer_dir, "merges.txt"),
+        model_max_length=77,
+    )
+
+
+def _clip_config(**overrides):
+    config = dict(
+        bos_token_id=0,
+        eos_token_id=1,
+        pad_token_id=1,
+        hidden_size=32,
+        intermediate_size=37,
+        layer_norm_eps=1e-05,
+        num_attention_heads=4,
+        num_hidden_layers=2,
+        vocab_size=1000,
+        hidden_act="gelu",
+        projection_dim=32,
+    )
+    config.update(overrides)
+    return CLIPTextConfig(**config)
+
+
+def _sd_components(sd2=False):
+    torch.manual_seed(TINY_SEED)
+    unet = UNet2DConditionModel(
+        block_out_channels=(8, 16),
+        layers_per_block=1,
+        sample_size=32,
+        in_channels=4,
+        out_channels=4,
+        down_block_types=("DownBlock2D", "CrossAttnDownBlock2D"),
+        up_block_types=("CrossAttnUpBlock2D", "UpBlock2D"),
+        cross_attention_dim=32,
+        attention_head_dim=(2, 4) if sd2 else 8,
+        use_linear_projection=sd2,
+        norm_num_groups=2,
+    )
+    vae = AutoencoderKL(
+        block_out_channels=[8, 16],
+        in_channels=3,
+        out_channels=3,
+        down_block_types=["DownEncoderBlock2D"] * 2,
+        up_block_types=["UpDecoderBlock2D"] * 2,
+        latent_channels=4,
+        norm_num_groups=2,
+    )
+    scheduler = DDIMScheduler(
+        beta_start=0.00085,
+        beta_end=0.012,
+        beta_schedule="scaled_linear",
+        clip_sample=False,
+        set_alpha_to_one=False,
+    )
+    return StableDiffusionPipeline(
+        vae=vae,
+        text_encoder=CLIPTextModel(_clip_config()),
+        tokenizer=_tiny_tokenizer(),
+        unet=unet,
+        scheduler=scheduler,
+        safety_checker=None,
+        feature_extractor=None,
+        requires_safety_checker=False,
+    )
+
+
+def _sdxl_components():
+    torch.manual_seed(TINY_SEED)
+    unet = UNet2DConditionModel(
+        block_out_channels=(8, 16),
+        layers_per_block=1,
+        sample_size=32,
+        in_channels=4,
+        out_channels=4,
+        down_block_types=("DownBlock2D", "CrossAttnDownBlock2D"),
+        up_block_types=("CrossAttnUpBlock2D", "UpBlock2D"),
+        attention_head_dim=(2, 4),
+        use_linear_projection=True,
+        addition_embed_type="text_time",
+        addition_time_embed_dim=8,
+        transformer_layers_per_block=(1, 1),
+        projection_class_embeddings_input_dim=80,
+        cross_attention_dim=64,
+        norm_num_groups=2,
+    )
+    vae = AutoencoderKL(
+        block_out_channels=[8, 16],
+        in_channels=3,
+        out_channels=3,
+        down_block_types=["DownEncoderBlock2D"] * 2,
+        up_block_types=["UpDecoderBlock2D"] * 2,
+        latent_channels=4,
+        norm_num_groups=2,
+    )
+    scheduler = EulerDiscreteScheduler(
+        beta_start=0.00085,
+        beta_end=0.012,
+        steps_offset=1,
+        beta_schedule="scaled_linear",
+        timestep_spacing="leading",
+    )
+    return StableDiffusionXLPipeline(
+        vae=vae,
+        text_encoder=CLIPTextModel(_clip_config()),
+        text_encoder_2=CLIPTextModelWithProjection(_clip_config()),
+        tokenizer=_tiny_tokenizer(),
+        tokenizer_2=_tiny_tokenizer(),
+        unet=unet,
+        scheduler=scheduler,
+    )
+
+
+def _flow_vae(latent_channels):
+    return AutoencoderKL(
+        sample_size=32,
+        in_channels=3,
+        out_channels=3,
+        block_out_channels=(8,),
+        layers_per_block=1,
+        latent_channels=latent_channels,
+        norm_num_groups=1,
+        use_quant_conv=False,
+        use_post_quant_conv=False,
+        shift_factor=0.0609,
+        scaling_factor=1.5035,
+    )
+
+
+def _sd3_components():
+    torch.manual_seed(TINY_SEED)
+    transformer = SD3Transformer2DModel(
+        sample_size=32,
+        patch_size=1,
+        in_channels=4,
+        num_layers=1,
+        attention_head_dim=8,
+        num_attention_heads=4,
+        caption_projection_dim=32,
+        joint_attention_dim=64,
+        pooled_projection_dim=64,
+        out_channels=4,
+    )
+    return StableDiffusion3Pipeline(
+        transformer=transformer,
+        scheduler=FlowMatchEulerDiscreteScheduler(),
+        vae=_flow_vae(latent_channels=4),
+        text_encoder=CLIPTextModelWithProjection(_clip_config()),
+        tokenizer=_tiny_tokenizer(),
+        text_encoder_2=CLIPTextModelWithProjection(_clip_config()),
+        tokenizer_2=_tiny_tokenizer(),
+        text_encoder_3=None,
+        tokenizer_3=None,
+    )
+
+
+def _flux_components():
+    torch.manual_seed(TINY_SEED)
+    transformer = FluxTransformer2DModel(
+        patch_size=1,
+        in_channels=4,
+        num_layers=1,
+        num_single_layers=1,
+        attention_head_dim=16,
+        num_attention_heads=2,
+        joint_attention_dim=32,
+        pooled_projection_dim=32,
+        axes_dims_rope=[4, 4, 8],
+    )
+    text_encoder_2 = T5EncoderModel(
+        T5Config(
+            vocab_size=1000,
+            d_model=32,
+            d_kv=8,
+            d_ff=37,
+            num_layers=2,
+            num_heads=4,
+        )
+    )
+    return FluxPipeline(
+        transformer=transformer,
+        scheduler=FlowMatchEulerDiscreteScheduler(),
+        vae=_flow_vae(latent_channels=1),
+        text_encoder=CLIPTextModel(_clip_config()),
+        tokenizer=_tiny_tokenizer(),
+        text_encoder_2=text_encoder_2,
+        # Any tokenizer that pads to the requested length works for the
+        # random T5 above; reusing the tiny CLIP one avoids sentencepiece.
+        tokenizer_2=_tiny_tokenizer(),
+    )
+
+
+class _TinyMixin:
+    def __init__(self, build, *args, **kwargs):
+        super().__init__(f"tiny://{self.__class__.__name__}", *args, **kwargs)
+        self._build = build
+
+    def load_pipeline(self, progress):
+        progress(0.2, "Building tiny random pipeline...")
+        self.pipe = self._build().to(dtype=self.dtype)
+        self.pipe.set_progress_bar_config(disable=True)
+
+
+class TinySD15Pipeline(_TinyMixin, SD15Pipeline):
+    def __init__(self):
+        super().__init__(_sd_components)
+
+
+class TinySD2Pipeline(_TinyMixin, SD2Pipeline):
+    def __init__(self):
+        super().__init__(lambda: _sd_components(sd2=True))
+
+
+class TinySDXLPipeline(_TinyMixin, SDXLPipeline):
+    def __init__(self):
+        super().__init__(_sdxl_components)
+
+
+class TinySD3Pipeline(_TinyMixin, SD3Pipeline):
+    def __init__(self):
+        super().__init__(_sd3_components)
+
+
+class TinyFLUXPipeline(_TinyMixin, ArtTicFLUXPipeline):
+    def __init__(self):
+        super().__init__(_flux_components, is_schnell=True)
+
+
+TINY_PIPELINES = {
+    "tiny-sd15": TinySD15Pipeline,
+    "tiny-sd2": TinySD2Pipeline,
+    "tiny-sdxl": TinySDXLPipeline,
+    "tiny-sd3": TinySD3Pipeline,
+    "tiny-flux": TinyFLUXPipeline,
+}
+
+
+def register_tiny_pipelines():
+    for model_name, pipeline_class in TINY_PIPELINES.items():
+        register_pipeline(model_name, pipeline_class)
+    return list(TINY_PIPELINES)
@@ -0,0 +1,126 @@
+import os
+import json
+import shutil
+import hashlib
+import logging
+import threading
+import torch
+import diffusers
+
+logger = logging.getLogger("arttic_lab")
+
+ARTIFACT_DIR = os.path.join("./cache", "pipelines")
+MANIFEST_FILE = "artifact.json"
+
+
+def library_versions():
+    versions = {"torch": torch.__version__, "diffusers": diffusers.__version__}
+    try:
+        import intel_extension_for_pytorch as ipex
+
+        versions["ipex"] = ipex.__version__
+    except ImportError:
+        pass
+    return versions
+
+
+class PipelineArtifactCache:
+    """On-disk snapshots of converted single-file checkpoints.
+
+    The first load of a checkpoint saves the converted pipeline in diffusers
+    format (safetensors, already cast to the target dtype). Later loads
+    memory-map that snapshot instead of re-running the single-file key
+    conversion and dtype cast. Snapshots are keyed by model hash, dtype and
+    library versions, so upgrading torch, diffusers or IPEX invalidates them.
+
+    IPEX prepacked weights are device-specific and not serializable, so
+    ipex.optimize still runs after every load.
+    """
+
+    def __init__(self, root=ARTIFACT_DIR):
+        self.root = root
+        self.enabled = False
+        self._lock = threading.Lock()
+
+    def configure(self, enabled):
+        self.enabled = bool(enabled)
+        if self.enabled:
+            logger.info(f"Pipeline artifact cache enabled at '{self.root}'.")
+
+    def _key(self, model_path, model_hash, dtype):
+        if not model_hash:
+            stat = os.stat(model_path)
+            model_hash = f"{stat.st_size}-{stat.st_mtime_ns}"
+        fingerprint = json.dumps(
+            {"model": model_hash, "dtype": str(dtype), "versions": library_versions()},
+            sort_keys=True,
+        )
+        digest = hashlib.sha256(fingerprint.encode()).hexdigest()[:16]
+        name = os.path.splitext(os.path.basename(model_path))[0]
+        return f"{name}-{digest}"
+
+    def lookup(self, model_path, model_hash, dtype):
+        """Return the snapshot directory for a checkpoint, or None"""
+        if not self.enabled:
+            return None
+        path = os.path.join(self.root, self._key(model_path, model_hash, dtype))
+        if os.path.isfile(os.path.join(path, MANIFEST_FILE)):
+            return path
+        return None
+
+    def store(self, model_path, model_hash, dtype, pipe):
+        if not self.enabled:
+            return None
+        key = self._key(model_path, model_hash, dtype)
+        path = os.path.join(self.root, key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        logger.info(f"Saving converted pipeline to the artifact cache ({key})...")
+        with self._lock:
+            try:
+                shutil.rmtree(tmp_path, ignore_errors=True)
+                pipe.save_pretrained(tmp_path, safe_serialization=True)
+                with open(
+                    os.path.join(tmp_path, MANIFEST_FILE), "w", encoding="utf-8"
+                ) as f:
+                    json.dump(
+                        {
+                            "model_path": os.path.abspath(model_path),
+                            "model_hash": model_hash,
+                            "dtype": str(dtype),
+                            "versions": library_versions(),
+                        },
+                        f,
+                        indent=2,
+                    )
+                shutil.rmtree(path, ignore_errors=True)
+                os.replace(tmp_path, path)
+            except Exception as e:
+                logger.warning(f"Could not cache converted pipeline: {e}")
+                shutil.rmtree(tmp_path, ignore_errors=True)
+                return None
+            self._prune(model_path, keep=key)
+        return path
+
+    def discard(self, path):
+        logger.info(f"Discarding pipeline artifact '{os.path.basename(path)}'.")
+        shutil.rmtree(path, ignore_errors=True)
+
+    def _prune(self, model_path, keep):
+        """Remove stale snapshots of the same checkpoint"""
+        model_path = os.path.abspath(model_path)
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                if entry.name == keep or not entry.is_dir():
+                    continue
+                try:
+                    with open(
+                        os.path.join(entry.path, MANIFEST_FILE), "r", encoding="utf-8"
+                    ) as f:
+                        manifest = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                if manifest.get("model_path") == model_path:
+                    self.discard(entry.path)
+
+
+artifact_cache = PipelineArtifactCache()
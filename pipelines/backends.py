@@ -0,0 +1,268 @@
+import gc
+import os
+import sys
+import glob
+import logging
+import torch
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+try:
+    import intel_extension_for_pytorch as ipex
+except ImportError:
+    ipex = None
+
+logger = logging.getLogger("arttic_lab")
+
+DEVICE_CHOICES = ("auto", "xpu", "cpu")
+
+
+class DeviceBackend:
+    """Everything device-specific the pipelines and core logic need"""
+
+    name = ""
+    device = ""
+
+    @classmethod
+    def is_available(cls):
+        raise NotImplementedError
+
+    def autocast(self, dtype):
+        return torch.autocast(self.device, dtype=dtype)
+
+    def generator(self, seed):
+        return torch.Generator(self.device).manual_seed(seed)
+
+    def memory_stats(self):
+        """Return {"total", "reserved"} in bytes, or None if unknown"""
+        return None
+
+    def empty_cache(self):
+        gc.collect()
+
+    def synchronize(self):
+        pass
+
+    def reset_peak_memory(self):
+        pass
+
+    def peak_memory(self):
+        """Peak bytes allocated since the last reset, or None if unknown"""
+        return None
+
+    def memory_in_use(self):
+        """Bytes this process holds now, comparable with peak_memory, or None"""
+        return None
+
+    def available_memory(self):
+        """Bytes a generation could still allocate, or None if unknown"""
+        return None
+
+    def optimize(self, module, dtype, weights_prepack=False):
+        if ipex is None:
+            return module
+        # Passed explicitly since IPEX prepacks by default on CPU.
+        return ipex.optimize(
+            module.eval(), dtype=dtype, inplace=True, weights_prepack=weights_prepack
+        )
+
+    def supports_cpu_offload(self):
+        return False
+
+    def describe(self):
+        return self.name.upper()
+
+
+class XPUBackend(DeviceBackend):
+    name = "xpu"
+    device = "xpu"
+
+    @classmethod
+    def is_available(cls):
+        return hasattr(torch, "xpu") and torch.xpu.is_available()
+
+    def autocast(self, dtype):
+        return torch.xpu.amp.autocast(enabled=True, dtype=dtype)
+
+    def memory_stats(self):
+        return {
+            "total": torch.xpu.get_device_properties(0).total_memory,
+            "reserved": torch.xpu.memory_reserved(0),
+        }
+
+    def empty_cache(self):
+        torch.xpu.empty_cache()
+
+    def synchronize(self):
+        torch.xpu.synchronize()
+
+    def reset_peak_memory(self):
+        torch.xpu.reset_peak_memory_stats()
+
+    def peak_memory(self):
+        return torch.xpu.max_memory_allocated()
+
+    def memory_in_use(self):
+        return torch.xpu.memory_allocated(0)
+
+    def available_memory(self):
+        stats = self.memory_stats()
+        return stats["total"] - torch.xpu.memory_allocated(0)
+
+    def supports_cpu_offload(self):
+        return True
+
+    def describe(self):
+        return f"XPU ({torch.xpu.get_device_name(0)})"
+
+
+class CPUBackend(DeviceBackend):
+    """Host execution with bf16 autocast; IPEX is used when installed"""
+
+    name = "cpu"
+    device = "cpu"
+
+    def __init__(self):
+        self._peak_resettable = _reset_peak_rss()
+
+    @classmethod
+    def is_available(cls):
+        return True
+
+    def reset_peak_memory(self):
+        self._peak_resettable = _reset_peak_rss()
+
+    def peak_memory(self):
+        if self._peak_resettable:
+            peak = _proc_field_bytes("/proc/self/status", "VmHWM")
+            if peak is not None:
+                return peak
+        # Process high-water mark since startup.
+        if resource is None:
+            return None
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+    def memory_in_use(self):
+        # Only comparable with peak_memory when the peak can be reset.
+        if not self._peak_resettable:
+            return None
+        return _proc_field_bytes("/proc/self/status", "VmRSS")
+
+    def available_memory(self):
+        return _proc_field_bytes("/proc/meminfo", "MemAvailable")
+
+    def describe(self):
+        return f"CPU ({torch.get_num_threads()} threads)"
+
+
+def _proc_field_bytes(path, field):
+    """A "Field:  N kB" line of a /proc file, in bytes"""
+    try:
+        with open(path, "r") as f:
+            for line in f:
+                if line.startswith(f"{field}:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _reset_peak_rss():
+    # Writing 5 to clear_refs resets VmHWM to the current RSS (Linux 4.0+).
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+BACKENDS = {"xpu": XPUBackend, "cpu": CPUBackend}
+
+_backend = None
+
+
+def select_backend(name="auto", threads=None):
+    """Pick the device backend once at startup"""
+    global _backend
+    if name not in DEVICE_CHOICES:
+        raise ValueError(
+            f"Unknown device '{name}'. Use one of: {', '.join(DEVICE_CHOICES)}."
+        )
+    if name == "auto":
+        name = "xpu" if XPUBackend.is_available() else "cpu"
+    backend_class = BACKENDS[name]
+    if not backend_class.is_available():
+        raise RuntimeError(f"The '{name}' device is not available on this machine.")
+    if threads:
+        torch.set_num_threads(int(threads))
+    _backend = backend_class()
+    logger.info(f"Running on {_backend.describe()}.")
+    return _backend
+
+
+def get_backend():
+    if _backend is None:
+        return select_backend()
+    return _backend
+
+
+def _parse_cpu_list(text):
+    cpus = []
+    for part in text.strip().split(","):
+        if not part:
+            continue
+        start, _, end = part.partition("-")
+        cpus.extend(range(int(start), int(end or start) + 1))
+    return cpus
+
+
+def numa_nodes():
+    """{node: [logical cpus]} from sysfs; empty where NUMA is not exposed"""
+    nodes = {}
+    for path in glob.glob("/sys/devices/system/node/node[0-9]*"):
+        try:
+            with open(os.path.join(path, "cpulist"), "r") as f:
+                cpus = _parse_cpu_list(f.read())
+        except (OSError, ValueError):
+            continue
+        if cpus:
+            nodes[int(os.path.basename(path)[4:])] = cpus
+    return dict(sorted(nodes.items()))
+
+
+def physical_core_count(cpus):
+    """Cores behind a set of logical cpus, counting SMT siblings once"""
+    cores = set()
+    for cpu in cpus:
+        path = f"/sys/devices/system/cpu/cpu{cpu}/topology/thread_siblings_list"
+        try:
+            with open(path, "r") as f:
+                cores.add(min(_parse_cpu_list(f.read())))
+        except (OSError, ValueError):
+            cores.add(cpu)
+    return len(cores)
+
+
+def list_devices():
+    """Devices a worker process can own: each Intel GPU, else each NUMA node.
+
+    Returns dicts with the worker `name` (e.g. "xpu:1" or "cpu:0"), the
+    backend `device`, its `index` and, for NUMA nodes, the node's `cpus`.
+    """
+    if XPUBackend.is_available():
+        return [
+            {"name": f"xpu:{index}", "device": "xpu", "index": index, "cpus": None}
+            for index in range(torch.xpu.device_count())
+        ]
+    nodes = numa_nodes()
+    if not nodes:
+        return [{"name": "cpu:0", "device": "cpu", "index": 0, "cpus": None}]
+    return [
+        {"name": f"cpu:{node}", "device": "cpu", "index": node, "cpus": cpus}
+        for node, cpus in nodes.items()
+    ]
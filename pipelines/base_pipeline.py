@@ -1,17 +1,31 @@
 # pipelines/base_pipeline.py
 import torch
-import intel_extension_for_pytorch as ipex
 import logging
+from diffusers import DiffusionPipeline
+from .artifact_cache import artifact_cache
+from .backends import get_backend
+from .streaming_loader import (
+    GB,
+    StreamingCheckpoint,
+    can_stream_pipelines,
+    single_file_source,
+)
 
 logger = logging.getLogger("arttic_lab")
 
 
 class ArtTicPipeline:
-    def __init__(self, model_path, dtype=torch.bfloat16):
-        if not torch.xpu.is_available():
-            raise RuntimeError("Intel ARC GPU (XPU) not detected.")
+    # Names of the __call__ kwargs filled by encode_prompt, in the order the
+    # diffusers pipeline's own encode_prompt returns them.
+    PROMPT_EMBED_KEYS = ("prompt_embeds", "negative_prompt_embeds")
+    # Which latent-to-RGB approximation core.latent_preview applies.
+    LATENT_FORMAT = "sd15"
+
+    def __init__(self, model_path, dtype=torch.bfloat16, model_hash=None):
+        self.backend = get_backend()
         self.pipe = None
         self.model_path = model_path
+        self.model_hash = model_hash
         self.dtype = dtype
         self.is_optimized = False
         self.is_offloaded = False
@@ -19,83 +33,183 @@ class ArtTicPipeline:
     def load_pipeline(self, progress):
         raise NotImplementedError("Subclasses must implement load_pipeline")
 
+    def load_single_file(self, model_class, progress=None, span=(0.2, 0.7), **kwargs):
+        """from_single_file, served from the artifact cache when possible.
+
+        Weights are streamed from the checkpoint and byte progress is
+        reported to `progress` across the `span` of the load.
+        """
+        snapshot = artifact_cache.lookup(self.model_path, self.model_hash, self.dtype)
+        if snapshot:
+            pretrained_kwargs = {
+                "torch_dtype": self.dtype,
+                "use_safetensors": True,
+                "low_cpu_mem_usage": True,
+            }
+            if "safety_checker" in kwargs:
+                pretrained_kwargs["safety_checker"] = kwargs["safety_checker"]
+            try:
+                loaded = model_class.from_pretrained(snapshot, **pretrained_kwargs)
+                if hasattr(loaded, "set_progress_bar_config"):
+                    loaded.set_progress_bar_config(disable=True)
+                logger.info("Loaded converted weights from the artifact cache.")
+                return loaded
+            except Exception as e:
+                logger.warning(f"Pipeline artifact is unusable, rebuilding it: {e}")
+                artifact_cache.discard(snapshot)
+
+        loaded = self._stream_single_file(model_class, progress, span, kwargs)
+        if loaded is None:
+            loaded = model_class.from_single_file(
+                self.model_path, torch_dtype=self.dtype, **kwargs
+            )
+        artifact_cache.store(self.model_path, self.model_hash, self.dtype, loaded)
+        return loaded
+
+    def _stream_single_file(self, model_class, progress, span, kwargs):
+        """from_single_file over a StreamingCheckpoint, or None if unavailable"""
+        is_pipeline = issubclass(model_class, DiffusionPipeline)
+        if is_pipeline and not can_stream_pipelines():
+            return None
+        try:
+            with StreamingCheckpoint(
+                self.model_path, self.dtype, progress, *span
+            ) as checkpoint:
+                if is_pipeline:
+                    with single_file_source(checkpoint):
+                        loaded = model_class.from_single_file(
+                            self.model_path, torch_dtype=self.dtype, **kwargs
+                        )
+                else:
+                    loaded = model_class.from_single_file(
+                        checkpoint,
+                        torch_dtype=self.dtype,
+                        low_cpu_mem_usage=True,
+                        **kwargs,
+                    )
+        except torch.OutOfMemoryError:
+            raise
+        except Exception as e:
+            logger.warning(f"Streaming load failed, reading the whole file: {e}")
+            return None
+        if not checkpoint.read_bytes:
+            logger.warning(
+                "diffusers did not read the streaming checkpoint; "
+                "it was loaded without streaming."
+            )
+            return loaded
+        logger.info(
+            f"Streamed {checkpoint.read_bytes / GB:.2f} GB of weights "
+            f"from '{self.model_path}'."
+        )
+        return loaded
+
     def place_on_device(self, use_cpu_offload=False):
         if not self.pipe:
             raise RuntimeError("Pipeline must be loaded before placing on device.")
 
-        if use_cpu_offload:
+        if use_cpu_offload and self.backend.supports_cpu_offload():
             logger.info("Enabling Model CPU Offload for low VRAM usage.")
             self.pipe.enable_model_cpu_offload()
             self.is_offloaded = True
         else:
-            logger.info("Moving model to XPU (ARC GPU) for maximum performance.")
-            self.pipe.to("xpu")
+            logger.info(f"Moving model to {self.backend.describe()}.")
+            self.pipe.to(self.backend.device)
             self.is_offloaded = False
 
-    def optimize_with_ipex(self, progress):
+    def offload_to_host(self):
+        if not self.pipe:
+            raise RuntimeError("Pipeline must be loaded before moving it.")
+        if not self.is_offloaded and self.backend.device != "cpu":
+            self.pipe.to("cpu")
+
+    def restore_to_device(self):
+        if not self.pipe:
+            raise RuntimeError("Pipeline must be loaded before moving it.")
+        if not self.is_offloaded and self.backend.device != "cpu":
+            logger.info(f"Moving cached model back to {self.backend.describe()}.")
+            self.pipe.to(self.backend.device)
+
+    def optimize_for_device(self, progress):
         if self.is_optimized:
             logger.info("Model is already optimized.")
             return
         if self.is_offloaded:
-            logger.warning("IPEX optimization is not available in CPU Offload mode.")
+            logger.warning("Device optimization is not available in CPU Offload mode.")
             return
         if not self.pipe:
             raise RuntimeError("Pipeline must be loaded before optimization.")
 
-        progress(0.8, "Optimizing model with IPEX...")
+        backend_name = self.backend.describe()
+        progress(0.8, f"Optimizing model for {backend_name}...")
 
         # Optimize Text Encoders
-        if hasattr(self.pipe, "text_encoder"):
-            self.pipe.text_encoder = ipex.optimize(
-                self.pipe.text_encoder.eval(), dtype=self.dtype, inplace=True
-            )
-            logger.info("Text Encoder optimized with IPEX.")
-
-        if hasattr(self.pipe, "text_encoder_2"):
-            self.pipe.text_encoder_2 = ipex.optimize(
-                self.pipe.text_encoder_2.eval(), dtype=self.dtype, inplace=True
-            )
-            logger.info("Text Encoder 2 optimized with IPEX.")
-
-        if hasattr(self.pipe, "text_encoder_3"):
-            self.pipe.text_encoder_3 = ipex.optimize(
-                self.pipe.text_encoder_3.eval(), dtype=self.dtype, inplace=True
-            )
-            logger.info("Text Encoder 3 optimized with IPEX.")
-
-        # Optimize U-Net / Transformer
+        for encoder_name, label in (
+            ("text_encoder", "Text Encoder"),
+            ("text_encoder_2", "Text Encoder 2"),
+            ("text_encoder_3", "Text Encoder 3"),
+        ):
+            if getattr(self.pipe, encoder_name, None) is not None:
+                setattr(
+                    self.pipe,
+                    encoder_name,
+                    self.backend.optimize(getattr(self.pipe, encoder_name), self.dtype),
+                )
+                logger.info(f"{label} optimized for {backend_name}.")
+
+        # Optimize U-Net / Transformer. Like the text encoders, these are not
+        # prepacked: LoRAs are attached at runtime and PEFT only wraps plain
+        # nn.Linear / nn.Conv2d layers, which prepacking replaces.
         if hasattr(self.pipe, "unet"):
             # Suggest Channels Last memory format for Conv2d layers
             self.pipe.unet = self.pipe.unet.to(memory_format=torch.channels_last)
-            self.pipe.unet = ipex.optimize(
-                self.pipe.unet.eval(),
-                dtype=self.dtype,
-                inplace=True,
-                weights_prepack=True,
-            )
-            logger.info("U-Net optimized with IPEX (Channels Last).")
+            self.pipe.unet = self.backend.optimize(self.pipe.unet, self.dtype)
+            logger.info(f"U-Net optimized for {backend_name} (Channels Last).")
 
         elif hasattr(self.pipe, "transformer"):
-            self.pipe.transformer = ipex.optimize(
-                self.pipe.transformer.eval(), dtype=self.dtype, inplace=True
+            self.pipe.transformer = self.backend.optimize(
+                self.pipe.transformer, self.dtype
             )
-            logger.info("Transformer optimized with IPEX.")
+            logger.info(f"Transformer optimized for {backend_name}.")
 
         # Optimize VAE
         if hasattr(self.pipe, "vae"):
             self.pipe.vae = self.pipe.vae.to(memory_format=torch.channels_last)
-            self.pipe.vae = ipex.optimize(
-                self.pipe.vae.eval(),
-                dtype=self.dtype,
-                inplace=True,
-                weights_prepack=True,
+            self.pipe.vae = self.backend.optimize(
+                self.pipe.vae, self.dtype, weights_prepack=True
             )
-            logger.info("VAE optimized with IPEX (Channels Last).")
+            logger.info(f"VAE optimized for {backend_name} (Channels Last).")
 
         self.is_optimized = True
 
+    def encode_prompt(self, prompt, negative_prompt, do_cfg, lora_scale=None):
+        """Run the text encoders for one prompt.
+
+        Returns a dict of embedding kwargs that can replace `prompt` and
+        `negative_prompt` in a generate call.
+        """
+        if not self.pipe:
+            raise RuntimeError("Pipeline not loaded.")
+        with torch.no_grad(), self.backend.autocast(self.dtype):
+            outputs = self._encode_prompt(prompt, negative_prompt, do_cfg, lora_scale)
+        return dict(zip(self.PROMPT_EMBED_KEYS, outputs))
+
+    def _encode_prompt(self, prompt, negative_prompt, do_cfg, lora_scale):
+        return self.pipe.encode_prompt(
+            prompt,
+            self.pipe._execution_device,
+            1,
+            do_cfg,
+            negative_prompt=negative_prompt,
+            lora_scale=lora_scale,
+        )
+
+    def preview_latents(self, latents, width, height):
+        """Step latents as a (batch, channels, h, w) tensor for previews"""
+        return latents
+
     def generate(self, *args, **kwargs):
         if not self.pipe:
             raise RuntimeError("Pipeline not loaded.")
-        with torch.xpu.amp.autocast(enabled=True, dtype=self.dtype):
+        with self.backend.autocast(self.dtype):
             return self.pipe(*args, **kwargs)
@@ -0,0 +1,164 @@
+import os
+import json
+import struct
+import logging
+import threading
+
+logger = logging.getLogger("arttic_lab")
+
+FINGERPRINT_FILE = os.path.join("./cache", "model_fingerprints.json")
+MAX_HEADER_BYTES = 100 * 1024 * 1024
+
+SD15 = "sd15"
+SD2 = "sd2"
+SDXL = "sdxl"
+SD3 = "sd3"
+FLUX = "flux"
+
+ARCHITECTURE_LABELS = {
+    SD15: "SD 1.5",
+    SD2: "SD 2.x",
+    SDXL: "SDXL",
+    SD3: "SD3",
+    FLUX: "FLUX",
+}
+
+SD3_PREFIXES = ("text_encoders.",)
+XL_PREFIXES = ("conditioner.embedders.1",)
+V2_KEYS = frozenset(
+    {"model.diffusion_model.input_blocks.8.1.transformer_blocks.0.attn2.to_k.weight"}
+)
+FLUX_MARKERS = ("transformer.", "double_blocks.")
+UNET_MARKERS = ("input_blocks", "output_blocks")
+
+
+def read_safetensors_header(path):
+    """Parse only the JSON header of a .safetensors file, never the tensors"""
+    with open(path, "rb") as f:
+        prefix = f.read(8)
+        if len(prefix) != 8:
+            raise ValueError(f"'{path}' is too small to be a safetensors file.")
+        (header_size,) = struct.unpack("<Q", prefix)
+        if header_size > MAX_HEADER_BYTES:
+            raise ValueError(f"'{path}' has an implausible header size.")
+        header = f.read(header_size)
+    if len(header) != header_size:
+        raise ValueError(f"'{path}' has a truncated header.")
+    return json.loads(header)
+
+
+def classify_keys(keys):
+    """Classify a checkpoint from its tensor names in a single pass.
+
+    Precedence matches the original checks: SD3, SDXL, FLUX, SD 2.x, and
+    SD 1.5 as the fallback.
+    """
+    is_sd3 = is_xl = is_v2 = has_flux = has_unet = False
+    for key in keys:
+        if key.startswith(SD3_PREFIXES):
+            is_sd3 = True
+            break
+        if not is_xl and key.startswith(XL_PREFIXES):
+            is_xl = True
+        if not is_v2 and key in V2_KEYS:
+            is_v2 = True
+        if not has_flux and any(marker in key for marker in FLUX_MARKERS):
+            has_flux = True
+        if not has_unet and any(marker in key for marker in UNET_MARKERS):
+            has_unet = True
+
+    if is_sd3:
+        return SD3
+    if is_xl:
+        return SDXL
+    if has_flux and not has_unet:
+        return FLUX
+    if is_v2:
+        return SD2
+    return SD15
+
+
+class ArchitectureDetector:
+    """Detects checkpoint architectures and remembers the answer.
+
+    Results are stored in a sidecar index keyed by absolute path and
+    validated against the file's size and mtime, so a model is only read
+    again after it changes on disk.
+    """
+
+    def __init__(self, index_file=FINGERPRINT_FILE):
+        self.index_file = index_file
+        self._lock = threading.Lock()
+        self._index = None
+
+    def _load_index(self):
+        if self._index is None:
+            try:
+                with open(self.index_file, "r", encoding="utf-8") as f:
+                    self._index = json.load(f)
+            except (FileNotFoundError, ValueError):
+                self._index = {}
+        return self._index
+
+    def _save_index(self):
+        os.makedirs(os.path.dirname(self.index_file) or ".", exist_ok=True)
+        tmp_path = f"{self.index_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._index, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.index_file)
+
+    def detect(self, model_path, header=None):
+        """Return the architecture id for a checkpoint, or None if unreadable.
+
+        Callers that already parsed the header can pass it to skip the read.
+        """
+        path = os.path.abspath(model_path)
+        try:
+            stat = os.stat(path)
+        except OSError as e:
+            logger.error(f"Could not stat model '{model_path}': {e}")
+            return None
+
+        with self._lock:
+            entry = self._load_index().get(path)
+        if (
+            entry
+            and entry.get("size") == stat.st_size
+            and entry.get("mtime_ns") == stat.st_mtime_ns
+        ):
+            return entry["architecture"]
+
+        try:
+            if header is None:
+                header = read_safetensors_header(path)
+            architecture = classify_keys(header)
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not inspect model '{model_path}': {e}")
+            return None
+
+        with self._lock:
+            self._load_index()[path] = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "architecture": architecture,
+            }
+            try:
+                self._save_index()
+            except OSError as e:
+                logger.warning(f"Could not save model fingerprints: {e}")
+        return architecture
+
+    def forget(self, model_path):
+        with self._lock:
+            if self._load_index().pop(os.path.abspath(model_path), None):
+                try:
+                    self._save_index()
+                except OSError as e:
+                    logger.warning(f"Could not save model fingerprints: {e}")
+
+
+architecture_detector = ArchitectureDetector()
+
+
+def detect_model_architecture(model_path):
+    return architecture_detector.detect(model_path)
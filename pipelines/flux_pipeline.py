@@ -13,8 +13,13 @@ FLUX_SCHNELL_BASE_REPO = "black-forest-labs/FLUX.1-schnell"
 
 
 class ArtTicFLUXPipeline(ArtTicPipeline):
-    def __init__(self, model_path, dtype=torch.bfloat16, is_schnell=False):
-        super().__init__(model_path, dtype)
+    PROMPT_EMBED_KEYS = ("prompt_embeds", "pooled_prompt_embeds")
+    LATENT_FORMAT = "flux"
+
+    def __init__(
+        self, model_path, dtype=torch.bfloat16, is_schnell=False, model_hash=None
+    ):
+        super().__init__(model_path, dtype, model_hash)
         self.is_schnell = is_schnell
 
     def load_pipeline(self, progress):
@@ -28,8 +33,8 @@ class ArtTicFLUXPipeline(ArtTicPipeline):
         progress(0.2, desc)
         try:
             logger.info(f"Loading transformer from local file: {self.model_path}")
-            transformer = FluxTransformer2DModel.from_single_file(
-                self.model_path, torch_dtype=self.dtype
+            transformer = self.load_single_file(
+                FluxTransformer2DModel, progress=progress, span=(0.2, 0.4)
             )
             logger.info("Local transformer loaded successfully.")
 
@@ -74,10 +79,27 @@ class ArtTicFLUXPipeline(ArtTicPipeline):
             f"Successfully loaded FLUX {model_type} model '{os.path.basename(self.model_path)}'"
         )
 
+    def _encode_prompt(self, prompt, negative_prompt, do_cfg, lora_scale):
+        # FLUX is guidance-distilled, so only the positive prompt is encoded.
+        prompt_embeds, pooled_prompt_embeds, _ = self.pipe.encode_prompt(
+            prompt,
+            None,
+            device=self.pipe._execution_device,
+            num_images_per_prompt=1,
+            lora_scale=lora_scale,
+        )
+        return prompt_embeds, pooled_prompt_embeds
+
+    def preview_latents(self, latents, width, height):
+        # FLUX steps on packed 2x2 patches; unpack to a spatial latent.
+        return self.pipe._unpack_latents(
+            latents, height, width, self.pipe.vae_scale_factor
+        )
+
     def generate(self, *args, **kwargs):
         if self.is_schnell and "negative_prompt" in kwargs:
             logger.info(
                 "FLUX Schnell does not use a negative prompt. It will be ignored."
             )
             kwargs.pop("negative_prompt")
-        return super().generate(*args, **kwargs)
\ No newline at end of file
+        return super().generate(*args, **kwargs)
@@ -6,9 +6,9 @@ from .base_pipeline import ArtTicPipeline
 class SD2Pipeline(ArtTicPipeline):
     def load_pipeline(self, progress):
         progress(0.2, "Loading StableDiffusionPipeline (v2)...")
-        self.pipe = StableDiffusionPipeline.from_single_file(
-            self.model_path,
-            torch_dtype=self.dtype,
+        self.pipe = self.load_single_file(
+            StableDiffusionPipeline,
+            progress=progress,
             use_safetensors=True,
             safety_checker=None,
             progress_bar_config={"disable": True},
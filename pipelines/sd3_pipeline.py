@@ -10,6 +10,14 @@ SD3_BASE_MODEL_REPO = "stabilityai/stable-diffusion-3-medium-diffusers"
 
 
 class SD3Pipeline(ArtTicPipeline):
+    PROMPT_EMBED_KEYS = (
+        "prompt_embeds",
+        "negative_prompt_embeds",
+        "pooled_prompt_embeds",
+        "negative_pooled_prompt_embeds",
+    )
+    LATENT_FORMAT = "sd3"
+
     def load_pipeline(self, progress):
         progress(0.2, "Loading base SD3 components from Hugging Face...")
         try:
@@ -30,3 +38,15 @@ class SD3Pipeline(ArtTicPipeline):
         progress(0.5, "Injecting local model weights...")
         self.pipe.load_lora_weights(self.model_path)
         logger.info(f"Successfully injected weights from '{self.model_path}'")
+
+    def _encode_prompt(self, prompt, negative_prompt, do_cfg, lora_scale):
+        return self.pipe.encode_prompt(
+            prompt,
+            None,
+            None,
+            device=self.pipe._execution_device,
+            num_images_per_prompt=1,
+            do_classifier_free_guidance=do_cfg,
+            negative_prompt=negative_prompt,
+            lora_scale=lora_scale,
+        )
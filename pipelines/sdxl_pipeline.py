@@ -4,13 +4,31 @@ from .base_pipeline import ArtTicPipeline
 
 
 class SDXLPipeline(ArtTicPipeline):
+    PROMPT_EMBED_KEYS = (
+        "prompt_embeds",
+        "negative_prompt_embeds",
+        "pooled_prompt_embeds",
+        "negative_pooled_prompt_embeds",
+    )
+    LATENT_FORMAT = "sdxl"
+
     def load_pipeline(self, progress):
         progress(0.2, "Loading StableDiffusionXLPipeline...")
-        self.pipe = StableDiffusionXLPipeline.from_single_file(
-            self.model_path,
-            torch_dtype=self.dtype,
+        self.pipe = self.load_single_file(
+            StableDiffusionXLPipeline,
+            progress=progress,
             use_safetensors=True,
             variant="fp16",
             safety_checker=None,
             progress_bar_config={"disable": True},
         )
+
+    def _encode_prompt(self, prompt, negative_prompt, do_cfg, lora_scale):
+        return self.pipe.encode_prompt(
+            prompt,
+            device=self.pipe._execution_device,
+            num_images_per_prompt=1,
+            do_classifier_free_guidance=do_cfg,
+            negative_prompt=negative_prompt,
+            lora_scale=lora_scale,
+        )
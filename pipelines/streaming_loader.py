@@ -0,0 +1,172 @@
+import inspect
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from safetensors import safe_open
+from .detector import read_safetensors_header
+
+logger = logging.getLogger("arttic_lab")
+
+try:
+    from diffusers.loaders import single_file as _single_file_loader
+except ImportError:
+    _single_file_loader = None
+
+GB = 1024**3
+# Report at most this many progress updates over a whole load.
+PROGRESS_UPDATES = 50
+# Recently read tensors kept so diffusers' repeated probes of a key are free.
+MEMO_ENTRIES = 4
+
+_LAZY = object()
+_source_lock = threading.Lock()
+
+
+class StreamingCheckpoint(dict):
+    """A safetensors checkpoint whose tensors are read only when accessed.
+
+    The file is memory-mapped and each tensor is copied out and cast to
+    `dtype` at the moment diffusers' key conversion asks for it, then owned
+    by whatever component is being built. Only the last few tensors read are
+    kept, so repeated lookups of a key are not read and cast again, and host
+    memory holds one component's weights in the target dtype at a time
+    instead of the whole checkpoint at its stored precision. Bytes read are
+    reported to `progress(fraction, desc)` between `start` and `end`.
+    """
+
+    def __init__(self, path, dtype, progress=None, start=0.0, end=1.0):
+        header = read_safetensors_header(path)
+        header.pop("__metadata__", None)
+        super().__init__(dict.fromkeys(header, _LAZY))
+        self.path = path
+        self.dtype = dtype
+        self._sizes = {
+            key: info["data_offsets"][1] - info["data_offsets"][0]
+            for key, info in header.items()
+        }
+        self.total_bytes = sum(self._sizes.values())
+        self.read_bytes = 0
+        self._seen = set()
+        self._progress = progress
+        self._start = start
+        self._end = end
+        self._reported = 0
+        self._handle = None
+        self._memo = OrderedDict()
+
+    def __enter__(self):
+        self._handle = safe_open(self.path, framework="pt", device="cpu")
+        return self
+
+    def __exit__(self, *exc):
+        self._handle = None
+        self._memo.clear()
+        return False
+
+    def _load(self, key):
+        tensor = self._memo.get(key)
+        if tensor is not None:
+            self._memo.move_to_end(key)
+            return tensor
+        if self._handle is None:
+            raise RuntimeError("StreamingCheckpoint must be used as a context manager.")
+        tensor = self._handle.get_tensor(key)
+        if tensor.is_floating_point() and tensor.dtype != self.dtype:
+            tensor = tensor.to(self.dtype)
+        if key not in self._seen:
+            self._seen.add(key)
+            self.read_bytes += self._sizes.get(key, 0)
+            self._report()
+        self._memo[key] = tensor
+        if len(self._memo) > MEMO_ENTRIES:
+            self._memo.popitem(last=False)
+        return tensor
+
+    def _report(self):
+        if not self._progress or not self.total_bytes:
+            return
+        step = int(self.read_bytes / self.total_bytes * PROGRESS_UPDATES)
+        if step <= self._reported:
+            return
+        self._reported = step
+        fraction = self.read_bytes / self.total_bytes
+        self._progress(
+            self._start + (self._end - self._start) * fraction,
+            f"Loading weights... {self.read_bytes / GB:.1f}/"
+            f"{self.total_bytes / GB:.1f} GB",
+        )
+
+    def _resolve(self, key, value):
+        return self._load(key) if value is _LAZY else value
+
+    def __getitem__(self, key):
+        return self._resolve(key, super().__getitem__(key))
+
+    def get(self, key, default=None):
+        value = super().get(key, default)
+        return self._resolve(key, value)
+
+    def pop(self, key, *default):
+        value = self._resolve(key, super().pop(key, *default))
+        # Popped tensors belong to the caller now.
+        self._memo.pop(key, None)
+        return value
+
+    def __iter__(self):
+        # Being overridden stops dict() and friends from copying raw entries.
+        return super().__iter__()
+
+    def values(self):
+        return [self[key] for key in self.keys()]
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def copy(self):
+        return dict(self.items())
+
+
+@contextmanager
+def single_file_source(checkpoint):
+    """Make pipeline `from_single_file` calls read `checkpoint`.
+
+    Pipeline-level single-file loading has no argument for a preloaded
+    checkpoint, so its loader function is swapped for the duration.
+    """
+    with _source_lock:
+        original = _single_file_loader.load_single_file_checkpoint
+        _single_file_loader.load_single_file_checkpoint = (
+            lambda *args, **kwargs: checkpoint
+        )
+        try:
+            yield checkpoint
+        finally:
+            _single_file_loader.load_single_file_checkpoint = original
+
+
+def _pipeline_loader_is_patchable():
+    """Whether from_single_file still calls the loader single_file_source swaps"""
+    if _single_file_loader is None:
+        return False
+    loader = getattr(_single_file_loader, "load_single_file_checkpoint", None)
+    mixin = getattr(_single_file_loader, "FromSingleFileMixin", None)
+    if not callable(loader) or mixin is None:
+        return False
+    try:
+        code = inspect.unwrap(mixin.from_single_file).__code__
+    except AttributeError:
+        return False
+    return "load_single_file_checkpoint" in code.co_names
+
+
+_can_stream_pipelines = _pipeline_loader_is_patchable()
+if _single_file_loader is not None and not _can_stream_pipelines:
+    logger.info(
+        "This diffusers release does not load pipeline checkpoints through "
+        "load_single_file_checkpoint; pipelines are loaded without streaming."
+    )
+
+
+def can_stream_pipelines():
+    return _can_stream_pipelines
@@ -0,0 +1,141 @@
+from typing import Annotated, Literal, Optional, Union
+from pydantic import BaseModel, Field, field_validator
+
+
+class LoadModelParams(BaseModel):
+    model_name: str
+    scheduler_name: str = "Euler A"
+    vae_tiling: bool = True
+    cpu_offload: bool = False
+    lora_name: str = "None"
+
+
+class LoraSpec(BaseModel):
+    name: str
+    weight: float = 1.0
+
+
+class _SamplingParams(BaseModel):
+    prompt: str
+    negative_prompt: Optional[str] = ""
+    steps: int = Field(30, ge=1, le=500)
+    guidance: float = Field(7.0, ge=0)
+    seed: Optional[int] = Field(None, lt=2**32)
+    width: int = Field(512, ge=64, le=4096)
+    height: int = Field(512, ge=64, le=4096)
+    lora_weight: float = 0.0
+    # Overrides the LoRA chosen at load time; several entries are stacked.
+    loras: Optional[list[LoraSpec]] = None
+    # Overrides the sampler chosen at load time.
+    scheduler: Optional[str] = None
+
+    @field_validator("seed")
+    @classmethod
+    def random_seed_if_negative(cls, seed):
+        # The UI uses -1 for "random".
+        return None if seed is not None and seed < 0 else seed
+
+    @field_validator("lora_weight", mode="before")
+    @classmethod
+    def no_lora_weight(cls, weight):
+        return 0.0 if weight is None else weight
+
+
+class GenerateImageParams(_SamplingParams):
+    init_image: Optional[str] = None
+    strength: Optional[float] = Field(None, gt=0, le=1)
+
+
+class SweepAxis(BaseModel):
+    param: Literal["steps", "guidance", "seed", "scheduler"]
+    values: Union[list[Union[int, float, str]], str]
+
+
+class GenerateBatchParams(_SamplingParams):
+    batch_size: int = Field(1, ge=1)
+    n_iter: int = Field(1, ge=1)
+    x_axis: Optional[SweepAxis] = None
+    y_axis: Optional[SweepAxis] = None
+    make_grid: bool = False
+
+
+# Lower runs first. Clients may only defer their own jobs, never jump the queue.
+MIN_CLIENT_PRIORITY = 0
+MAX_CLIENT_PRIORITY = 10
+
+
+def client_priority(value):
+    try:
+        priority = int(value)
+    except (TypeError, ValueError):
+        return MIN_CLIENT_PRIORITY
+    return max(MIN_CLIENT_PRIORITY, min(MAX_CLIENT_PRIORITY, priority))
+
+
+class _JobBase(BaseModel):
+    priority: int = MIN_CLIENT_PRIORITY
+
+    @field_validator("priority", mode="before")
+    @classmethod
+    def clamp_priority(cls, priority):
+        return client_priority(priority)
+
+
+class LoadModelJob(_JobBase, LoadModelParams):
+    kind: Literal["load_model"]
+
+
+class UnloadModelJob(_JobBase):
+    kind: Literal["unload_model"]
+
+
+class ClearCacheJob(_JobBase):
+    kind: Literal["clear_cache"]
+
+
+class InvalidateFileJob(_JobBase):
+    kind: Literal["invalidate_file"]
+    folder: Literal["models", "loras"]
+    filename: str
+
+
+class GenerateImageJob(_JobBase, GenerateImageParams):
+    kind: Literal["generate_image"]
+    # Loaded first when set, so the job does not depend on earlier loads.
+    model: Optional[LoadModelParams] = None
+    live_preview: bool = False
+
+
+class GenerateBatchJob(_JobBase, GenerateBatchParams):
+    kind: Literal["generate_batch"]
+    model: Optional[LoadModelParams] = None
+
+
+class GenerateBatchRequest(_JobBase, GenerateBatchParams):
+    pass
+
+
+JobRequest = Annotated[
+    Union[
+        LoadModelJob,
+        UnloadModelJob,
+        ClearCacheJob,
+        InvalidateFileJob,
+        GenerateImageJob,
+        GenerateBatchJob,
+    ],
+    Field(discriminator="kind"),
+]
+
+JOB_FIELDS = ("kind", "priority", "live_preview")
+
+
+class JobStatus(BaseModel):
+    job_id: str
+    kind: str
+    status: str
+    position: Optional[int] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
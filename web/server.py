@@ -1,12 +1,30 @@
 import asyncio
 import logging
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-from fastapi.responses import HTMLResponse
+from collections import deque
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import (
+    HTMLResponse,
+    JSONResponse,
+    PlainTextResponse,
+    StreamingResponse,
+)
 from fastapi.staticfiles import StaticFiles
 from jinja2 import Environment, FileSystemLoader
 from core import logic as core
-from core.logic import OOMError
+from core.logic import OOMError, JobCancelled
+from web.schemas import (
+    JOB_FIELDS,
+    GenerateBatchJob,
+    GenerateBatchParams,
+    GenerateBatchRequest,
+    GenerateImageParams,
+    JobRequest,
+    JobStatus,
+    LoadModelParams,
+    client_priority,
+)
 import os
+import uuid
 
 APP_LOGGER_NAME = "arttic_lab"
 logger = logging.getLogger(APP_LOGGER_NAME)
@@ -21,6 +39,40 @@ app.mount("/icons", StaticFiles(directory="web/icons"), name="icons")
 env = Environment(loader=FileSystemLoader("web/templates"))
 index_template = env.get_template("index.html")
 
+# Set when inference runs on worker processes (app.py --workers). The router
+# takes jobs through the same interface as the local job scheduler.
+worker_router = None
+
+
+def use_worker_router(router):
+    global worker_router
+    worker_router = router
+
+
+def jobs():
+    return worker_router or core.job_scheduler
+
+
+@app.on_event("startup")
+async def initialize_outputs():
+    await asyncio.to_thread(core.initialize_outputs)
+
+
+@app.on_event("startup")
+async def initialize_catalog():
+    loop = asyncio.get_running_loop()
+
+    def on_catalog_changed():
+        asyncio.run_coroutine_threadsafe(broadcast_settings_data(), loop)
+
+    core.model_catalog.add_change_listener(on_catalog_changed)
+    await asyncio.to_thread(core.initialize_catalog)
+
+
+async def broadcast_settings_data():
+    updated_data = await asyncio.to_thread(core.get_settings_data)
+    await manager.broadcast({"type": "settings_data_updated", "data": updated_data})
+
 
 @app.get("/", response_class=HTMLResponse)
 async def read_root():
@@ -29,17 +81,65 @@ async def read_root():
 
 @app.get("/api/status")
 async def get_status():
-    return core.get_app_status()
+    return (worker_router or core).get_app_status()
+
+
+@app.get("/api/worker")
+async def get_worker_status():
+    return await asyncio.to_thread(core.get_worker_status)
 
 
 @app.get("/api/config")
 async def get_initial_config():
-    return core.get_config()
+    seq = manager.gallery_seq
+    config = await asyncio.to_thread(core.get_config)
+    config["gallery_seq"] = seq
+    return config
 
 
 @app.get("/api/gallery")
-async def get_gallery_images():
-    return {"images": core.get_output_images()}
+async def get_gallery_images(
+    cursor: str | None = None,
+    limit: int = core.GALLERY_PAGE_SIZE,
+    sort: str = "mtime",
+    order: str = "desc",
+    model: str | None = None,
+    lora: str | None = None,
+    date_from: str | None = None,
+    date_to: str | None = None,
+    prompt: str | None = None,
+):
+    try:
+        seq = manager.gallery_seq
+        page = await asyncio.to_thread(
+            core.get_gallery_page,
+            cursor=cursor,
+            limit=limit,
+            sort=sort,
+            order=order,
+            model=model,
+            lora=lora,
+            date_from=date_from,
+            date_to=date_to,
+            prompt=prompt,
+        )
+        page["seq"] = seq
+        return page
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/api/models")
+async def get_models():
+    return await asyncio.to_thread(core.get_model_catalog)
+
+
+@app.get("/api/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(
+        await asyncio.to_thread((worker_router or core).get_metrics_text),
+        media_type="text/plain; version=0.0.4",
+    )
 
 
 @app.get("/api/prompts")
@@ -82,20 +182,394 @@ async def get_image_metadata(filename: str):
     return core.get_image_metadata(filename)
 
 
+def _http_error(e):
+    if isinstance(e, JobCancelled):
+        return HTTPException(status_code=409, detail=str(e))
+    if isinstance(e, OOMError):
+        return HTTPException(status_code=503, detail=str(e))
+    if isinstance(e, (ValueError, ConnectionAbortedError)):
+        return HTTPException(status_code=400, detail=str(e))
+    return HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/generate_batch", status_code=202, response_model=JobStatus)
+async def generate_batch(request: GenerateBatchRequest):
+    # Answers with the queued job at once; follow it through /api/jobs/{id}.
+    return await create_job(
+        GenerateBatchJob(kind="generate_batch", **request.model_dump())
+    )
+
+
+JOB_EVENT_QUEUE_SIZE = 32
+SSE_KEEPALIVE_SECONDS = 15
+rest_jobs = {}
+
+
+def _job_status(job):
+    error = None
+    if job.future.done() and job.future.exception() is not None:
+        error = str(job.future.exception())
+    return JobStatus(
+        job_id=job.id,
+        kind=job.kind,
+        status=job.status,
+        position=job.position,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        error=error,
+    )
+
+
+class RestJob:
+    """Server-side companion of a job submitted through /api/jobs.
+
+    Fans status, progress and the final outcome out to SSE subscribers, and
+    holds back a generate_image result until its file has been written, so
+    the returned filename is always ready to download.
+    """
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.job = None
+        self.saved = None
+        self._subscribers = set()
+
+    def expect_saved_output(self):
+        self.saved = self.loop.create_future()
+
+    def track(self, job):
+        self.job = job
+        job.future.add_done_callback(
+            lambda _: self.loop.call_soon_threadsafe(
+                lambda: asyncio.ensure_future(self._publish_outcome())
+            )
+        )
+
+    def subscribe(self):
+        queue = asyncio.Queue(maxsize=JOB_EVENT_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        self._subscribers.discard(queue)
+
+    def publish(self, event, data):
+        for queue in list(self._subscribers):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait((event, data))
+
+    def on_update(self, job):
+        payload = _job_status(job).model_dump()
+        self.loop.call_soon_threadsafe(self.publish, "status", payload)
+
+    async def on_progress(self, progress, desc):
+        self.publish("progress", {"progress": progress, "description": desc})
+
+    async def on_preview(self, preview):
+        self.publish("preview", preview)
+
+    async def on_saved(self, completion):
+        item = completion.pop("gallery_item", None)
+        if item:
+            await manager.broadcast_gallery_event("gallery_item_added", {"image": item})
+        if self.saved is not None and not self.saved.done():
+            self.saved.set_result(completion)
+
+    async def on_batch_item(self, completion):
+        item = completion.pop("gallery_item", None)
+        if item:
+            await manager.broadcast_gallery_event("gallery_item_added", {"image": item})
+        self.publish("item", completion)
+
+    async def outcome(self):
+        """The job's result once it is final; raises the job's error"""
+        result = await asyncio.wrap_future(self.job.future)
+        if self.saved is not None:
+            completion = await asyncio.shield(self.saved)
+            if "error" in completion:
+                raise IOError(completion["error"])
+        return result
+
+    async def _publish_outcome(self):
+        try:
+            result = await self.outcome()
+        except Exception as e:
+            self.publish("error", _error_event(e))
+        else:
+            self.publish("result", result)
+        self.publish("end", None)
+
+
+def _forget_finished_rest_jobs():
+    for job_id in [job_id for job_id in rest_jobs if jobs().get(job_id) is None]:
+        del rest_jobs[job_id]
+
+
+@app.post("/api/jobs", status_code=202, response_model=JobStatus)
+async def create_job(request: JobRequest):
+    loop = asyncio.get_running_loop()
+    rest_job = RestJob(loop)
+    params = request.model_dump(exclude=set(JOB_FIELDS))
+    submit_args = {}
+
+    if request.kind == "load_model":
+        func = core.load_model
+        kwargs = {**params, "progress_callback": rest_job.on_progress, "loop": loop}
+    elif request.kind == "unload_model":
+        func = core.unload_model
+        kwargs = {}
+    elif request.kind == "clear_cache":
+        func = core.clear_cache
+        kwargs = {}
+    elif request.kind == "invalidate_file":
+        func = core.invalidate_file
+        kwargs = params
+    elif request.kind == "generate_image":
+        func = core.generate_image
+        kwargs = {
+            **params,
+            "progress_callback": rest_job.on_progress,
+            "loop": loop,
+            "completion_callback": rest_job.on_saved,
+        }
+        if request.live_preview:
+            kwargs["preview_callback"] = rest_job.on_preview
+        rest_job.expect_saved_output()
+        submit_args = {
+            "cancellable": True,
+            "batch_key": core.generation_batch_key(**kwargs),
+            "batch_func": core.generate_image_batch,
+        }
+    else:
+        func = core.generate_batch
+        kwargs = {
+            **params,
+            "progress_callback": rest_job.on_progress,
+            "loop": loop,
+            "item_callback": rest_job.on_batch_item,
+        }
+        submit_args = {"cancellable": True}
+
+    _forget_finished_rest_jobs()
+    job = jobs().submit(
+        request.kind,
+        func,
+        kwargs,
+        priority=request.priority,
+        on_update=rest_job.on_update,
+        **submit_args,
+    )
+    rest_job.track(job)
+    rest_jobs[job.id] = rest_job
+    return _job_status(job)
+
+
+def _get_job(job_id):
+    job = jobs().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job '{job_id}'.")
+    return job
+
+
+@app.get("/api/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str):
+    return _job_status(_get_job(job_id))
+
+
+@app.delete("/api/jobs/{job_id}", response_model=JobStatus)
+async def cancel_job(job_id: str):
+    job = _get_job(job_id)
+    if not jobs().cancel(job_id):
+        raise HTTPException(
+            status_code=409, detail="That job can no longer be cancelled."
+        )
+    return _job_status(job)
+
+
+@app.get("/api/jobs/{job_id}/result")
+async def get_job_result(job_id: str, wait: float = 0):
+    """The job's result; waits up to `wait` seconds, else answers 202"""
+    job = _get_job(job_id)
+    rest_job = rest_jobs.get(job_id)
+    outcome = rest_job.outcome() if rest_job else asyncio.wrap_future(job.future)
+    try:
+        return await asyncio.wait_for(outcome, timeout=max(0.0, min(wait, 300)))
+    except asyncio.TimeoutError:
+        return JSONResponse(status_code=202, content=_job_status(job).model_dump())
+    except Exception as e:
+        raise _http_error(e)
+
+
+@app.get("/api/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """Server-sent events: status, progress, preview, item, then the outcome"""
+    job = _get_job(job_id)
+    rest_job = rest_jobs.get(job_id)
+    if rest_job is None:
+        raise HTTPException(
+            status_code=404, detail="Events are only available for /api/jobs jobs."
+        )
+    queue = rest_job.subscribe()
+
+    async def events():
+        try:
+            yield _sse("status", _job_status(job).model_dump())
+            if job.future.done():
+                try:
+                    yield _sse("result", await rest_job.outcome())
+                except Exception as e:
+                    yield _sse("error", _error_event(e))
+                return
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(
+                        queue.get(), timeout=SSE_KEEPALIVE_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event == "end":
+                    return
+                yield _sse(event, data)
+        finally:
+            rest_job.unsubscribe(queue)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _error_event(e):
+    # The type lets a front router re-raise the same error for its clients.
+    return {"message": str(e), "type": type(e).__name__}
+
+
+SEND_QUEUE_SIZE = 64
+SEND_TIMEOUT = 10
+# Frames that only matter in their latest form: a queued one is replaced by
+# a newer one of the same type (and job). Progress and previews are also
+# dropped first when a client falls behind.
+COALESCED_MESSAGE_TYPES = ("progress_update", "preview_update", "job_update")
+DROPPABLE_MESSAGE_TYPES = ("progress_update", "preview_update")
+
+
+class ClientConnection:
+    """A connected UI with its own bounded send queue and writer task.
+
+    `send` never blocks the caller, so one slow client cannot hold up
+    broadcasts to the others. A client whose queue fills with messages that
+    cannot be dropped, or whose socket stops accepting writes for
+    SEND_TIMEOUT seconds, is disconnected.
+    """
+
+    def __init__(self, websocket: WebSocket, max_queue=SEND_QUEUE_SIZE):
+        self.websocket = websocket
+        self.max_queue = max_queue
+        self.closed = False
+        self._queue = deque()
+        self._wakeup = asyncio.Event()
+        self._writer = asyncio.create_task(self._write_loop())
+
+    def send(self, message: dict):
+        if self.closed:
+            return False
+        message_type = message.get("type")
+        if message_type in COALESCED_MESSAGE_TYPES and self._replace(message):
+            return True
+        if len(self._queue) >= self.max_queue and not self._drop_stale():
+            self.close("send queue is full")
+            return False
+        self._queue.append(message)
+        self._wakeup.set()
+        return True
+
+    def _replace(self, message):
+        for index, queued in enumerate(self._queue):
+            if queued.get("type") != message["type"]:
+                continue
+            # Job updates are only interchangeable for the same job.
+            if message["type"] == "job_update" and (
+                queued["data"].get("job_id") != message["data"].get("job_id")
+            ):
+                continue
+            self._queue[index] = message
+            core.metrics.inc("arttic_ws_frames_coalesced_total", type=message["type"])
+            return True
+        return False
+
+    def _drop_stale(self):
+        for index, queued in enumerate(self._queue):
+            if queued.get("type") in DROPPABLE_MESSAGE_TYPES:
+                del self._queue[index]
+                core.metrics.inc("arttic_ws_frames_dropped_total", type=queued["type"])
+                return True
+        return False
+
+    async def _write_loop(self):
+        while not self.closed:
+            if not self._queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            message = self._queue.popleft()
+            try:
+                await asyncio.wait_for(
+                    self.websocket.send_json(message), timeout=SEND_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                self.close("client stopped reading")
+            except Exception as e:
+                self.close(f"send failed: {e}")
+
+    def close(self, reason=None):
+        if self.closed:
+            return
+        self.closed = True
+        self._queue.clear()
+        self._wakeup.set()
+        if reason:
+            logger.warning(f"Disconnecting WebSocket client: {reason}.")
+            core.metrics.inc("arttic_ws_disconnects_total", reason=reason.split(":")[0])
+            asyncio.create_task(self._close_socket())
+
+    async def _close_socket(self):
+        try:
+            await asyncio.wait_for(self.websocket.close(code=1011), timeout=1)
+        except Exception:
+            pass
+
+
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: list[WebSocket] = []
+        self.active_connections: dict[WebSocket, ClientConnection] = {}
+        self.gallery_seq = 0
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        connection = ClientConnection(websocket)
+        self.active_connections[websocket] = connection
+        core.metrics.set("arttic_ws_connections", len(self.active_connections))
+        return connection
 
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        connection = self.active_connections.pop(websocket, None)
+        if connection:
+            connection.close()
+        core.metrics.set("arttic_ws_connections", len(self.active_connections))
 
     async def broadcast(self, message: dict):
-        for connection in self.active_connections:
-            await connection.send_json(message)
+        for connection in list(self.active_connections.values()):
+            connection.send(message)
+
+    async def broadcast_gallery_event(self, event_type: str, data: dict):
+        self.gallery_seq += 1
+        await self.broadcast(
+            {"type": event_type, "data": {**data, "seq": self.gallery_seq}}
+        )
 
 
 manager = ConnectionManager()
@@ -103,145 +577,252 @@ manager = ConnectionManager()
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket)
+    connection = await manager.connect(websocket)
+    client_id = uuid.uuid4().hex
+    priority = client_priority(websocket.query_params.get("priority"))
+    job_tasks = set()
+    loop = asyncio.get_running_loop()
+
+    async def send_json_safe(message):
+        connection.send(message)
+
+    async def progress_callback(progress, desc):
+        connection.send(
+            {
+                "type": "progress_update",
+                "data": {"progress": progress, "description": desc},
+            }
+        )
+
+    async def preview_callback(preview):
+        connection.send({"type": "preview_update", "data": preview})
+
+    async def completion_callback(completion):
+        item = completion.pop("gallery_item", None)
+        if item:
+            await manager.broadcast_gallery_event("gallery_item_added", {"image": item})
+        if "error" in completion:
+            await send_json_safe(
+                {"type": "generation_failed", "data": {"message": completion["error"]}}
+            )
+        else:
+            await send_json_safe({"type": "generation_complete", "data": completion})
+
+    async def batch_item_callback(completion):
+        item = completion.pop("gallery_item", None)
+        if item:
+            await manager.broadcast_gallery_event("gallery_item_added", {"image": item})
+        await send_json_safe({"type": "batch_item_complete", "data": completion})
+
+    def on_job_update(job):
+        asyncio.run_coroutine_threadsafe(
+            send_json_safe({"type": "job_update", "data": job.to_dict()}), loop
+        )
+
+    async def await_job(job, on_result, on_error):
+        try:
+            result = await asyncio.wrap_future(job.future)
+        except JobCancelled:
+            return
+        except Exception as e:
+            if on_error and await on_error(e):
+                return
+            logger.error(f"Job '{job.kind}' failed: {e}", exc_info=True)
+            await send_json_safe({"type": "error", "data": {"message": str(e)}})
+            return
+        if on_result:
+            await on_result(result)
+
+    def submit_job(
+        kind,
+        func,
+        kwargs,
+        on_result=None,
+        on_error=None,
+        cancellable=False,
+        batch_key=None,
+        batch_func=None,
+    ):
+        job = jobs().submit(
+            kind,
+            func,
+            kwargs,
+            client_id=client_id,
+            priority=priority,
+            on_update=on_job_update,
+            cancellable=cancellable,
+            batch_key=batch_key,
+            batch_func=batch_func,
+        )
+        task = asyncio.create_task(await_job(job, on_result, on_error))
+        job_tasks.add(task)
+        task.add_done_callback(job_tasks.discard)
+        return job
+
+    async def on_generation_error(e):
+        if isinstance(e, OOMError):
+            await send_json_safe(
+                {"type": "generation_failed", "data": {"message": str(e)}}
+            )
+            return True
+        return False
+
     try:
-        loop = asyncio.get_running_loop()
         while True:
             data = await websocket.receive_json()
             action = data.get("action")
             payload = data.get("payload", {})
 
-            async def progress_callback(progress, desc):
-                await websocket.send_json(
-                    {
-                        "type": "progress_update",
-                        "data": {"progress": progress, "description": desc},
-                    }
-                )
-
             try:
                 if action == "load_model":
-                    result = await asyncio.to_thread(
+
+                    async def on_model_loaded(result):
+                        await send_json_safe({"type": "model_loaded", "data": result})
+
+                    submit_job(
+                        "load_model",
                         core.load_model,
-                        **payload,
-                        progress_callback=progress_callback,
-                        loop=loop,
+                        {
+                            **LoadModelParams.model_validate(payload).model_dump(),
+                            "progress_callback": progress_callback,
+                            "loop": loop,
+                        },
+                        on_result=on_model_loaded,
                     )
-                    await websocket.send_json({"type": "model_loaded", "data": result})
 
                 elif action == "generate_image":
-                    try:
-                        gen_args = {
-                            "prompt": payload.get("prompt"),
-                            "negative_prompt": payload.get("negative_prompt"),
-                            "steps": payload.get("steps"),
-                            "guidance": payload.get("guidance"),
-                            "seed": payload.get("seed"),
-                            "width": payload.get("width"),
-                            "height": payload.get("height"),
-                            "lora_weight": payload.get("lora_weight"),
-                            "init_image": payload.get("init_image"),
-                            "strength": payload.get("strength"),
-                        }
-                        result = await asyncio.to_thread(
-                            core.generate_image,
-                            **gen_args,
-                            progress_callback=progress_callback,
-                            loop=loop,
-                        )
-                        await websocket.send_json(
-                            {"type": "generation_complete", "data": result}
-                        )
-                        await manager.broadcast(
+                    gen_args = {
+                        **GenerateImageParams.model_validate(payload).model_dump(),
+                        "progress_callback": progress_callback,
+                        "loop": loop,
+                        "completion_callback": completion_callback,
+                    }
+                    if payload.get("live_preview"):
+                        gen_args["preview_callback"] = preview_callback
+                    submit_job(
+                        "generate_image",
+                        core.generate_image,
+                        gen_args,
+                        on_error=on_generation_error,
+                        cancellable=True,
+                        batch_key=core.generation_batch_key(**gen_args),
+                        batch_func=core.generate_image_batch,
+                    )
+
+                elif action == "generate_batch":
+
+                    async def on_batch_complete(result):
+                        grid = result.get("grid")
+                        await send_json_safe(
                             {
-                                "type": "gallery_updated",
-                                "data": {"images": core.get_output_images()},
+                                "type": "batch_complete",
+                                "data": {
+                                    "images": [
+                                        image["image_filename"]
+                                        for image in result["images"]
+                                    ],
+                                    "grid": grid["image_filename"] if grid else None,
+                                    "info": result["info"],
+                                },
                             }
                         )
-                    except OOMError as e:
-                        await websocket.send_json(
-                            {"type": "generation_failed", "data": {"message": str(e)}}
-                        )
+
+                    submit_job(
+                        "generate_batch",
+                        core.generate_batch,
+                        {
+                            **GenerateBatchParams.model_validate(payload).model_dump(),
+                            "progress_callback": progress_callback,
+                            "loop": loop,
+                            "item_callback": batch_item_callback,
+                        },
+                        on_result=on_batch_complete,
+                        on_error=on_generation_error,
+                        cancellable=True,
+                    )
+
+                elif action == "cancel_job":
+                    cancelled = jobs().cancel(
+                        payload.get("job_id"), client_id=client_id
+                    )
+                    if not cancelled:
+                        message = "That job can no longer be cancelled."
+                        connection.send({"type": "error", "data": {"message": message}})
 
                 elif action == "unload_model":
-                    result = await asyncio.to_thread(core.unload_model)
-                    await websocket.send_json(
-                        {"type": "model_unloaded", "data": result}
+
+                    async def on_model_unloaded(result):
+                        await send_json_safe({"type": "model_unloaded", "data": result})
+
+                    submit_job(
+                        "unload_model",
+                        core.unload_model,
+                        {},
+                        on_result=on_model_unloaded,
                     )
 
                 elif action == "delete_image":
                     filename = payload.get("filename")
                     result = await asyncio.to_thread(core.delete_image, filename)
-                    await websocket.send_json({"type": "image_deleted", "data": result})
-                    await manager.broadcast(
-                        {
-                            "type": "gallery_updated",
-                            "data": {"images": core.get_output_images()},
-                        }
-                    )
+                    connection.send({"type": "image_deleted", "data": result})
+                    if result.get("status") == "success":
+                        await manager.broadcast_gallery_event(
+                            "gallery_item_removed",
+                            {"filename": os.path.basename(filename)},
+                        )
 
                 elif action == "get_settings_data":
-                    data = {
-                        "models": await asyncio.to_thread(core.get_model_files),
-                        "loras": await asyncio.to_thread(core.get_lora_files),
-                    }
-                    await websocket.send_json({"type": "settings_data", "data": data})
+                    data = await asyncio.to_thread(core.get_settings_data, refresh=True)
+                    connection.send({"type": "settings_data", "data": data})
 
                 elif action == "delete_model_file":
                     filename = payload.get("filename")
                     result = await asyncio.to_thread(core.delete_model_file, filename)
-                    await websocket.send_json(
-                        {"type": "model_file_deleted", "data": result}
-                    )
-                    if result.get("status") == "success":
-                        updated_data = {
-                            "models": await asyncio.to_thread(core.get_model_files),
-                            "loras": await asyncio.to_thread(core.get_lora_files),
-                        }
-                        await manager.broadcast(
-                            {"type": "settings_data_updated", "data": updated_data}
+                    connection.send({"type": "model_file_deleted", "data": result})
+                    if worker_router and result.get("status") == "success":
+                        submit_job(
+                            "invalidate_file",
+                            core.invalidate_file,
+                            {"folder": "models", "filename": filename},
                         )
 
                 elif action == "delete_lora_file":
                     filename = payload.get("filename")
                     result = await asyncio.to_thread(core.delete_lora_file, filename)
-                    await websocket.send_json(
-                        {"type": "lora_file_deleted", "data": result}
-                    )
-                    if result.get("status") == "success":
-                        updated_data = {
-                            "models": await asyncio.to_thread(core.get_model_files),
-                            "loras": await asyncio.to_thread(core.get_lora_files),
-                        }
-                        await manager.broadcast(
-                            {"type": "settings_data_updated", "data": updated_data}
+                    connection.send({"type": "lora_file_deleted", "data": result})
+                    if worker_router and result.get("status") == "success":
+                        submit_job(
+                            "invalidate_file",
+                            core.invalidate_file,
+                            {"folder": "loras", "filename": filename},
                         )
 
                 elif action == "restart_backend":
-                    await websocket.send_json(
-                        {"type": "backend_restarting", "data": {}}
-                    )
+                    connection.send({"type": "backend_restarting", "data": {}})
                     await asyncio.sleep(0.5)
                     core.restart_backend()
                     break
 
                 elif action == "clear_cache":
-                    result = await asyncio.to_thread(core.clear_cache)
-                    await websocket.send_json({"type": "cache_cleared", "data": result})
+
+                    async def on_cache_cleared(result):
+                        await send_json_safe({"type": "cache_cleared", "data": result})
+
+                    submit_job(
+                        "clear_cache", core.clear_cache, {}, on_result=on_cache_cleared
+                    )
 
                 else:
                     logger.warning(f"Unknown WebSocket action received: {action}")
 
             except Exception as e:
                 logger.error(f"Error processing action '{action}': {e}", exc_info=True)
-                await websocket.send_json(
-                    {"type": "error", "data": {"message": str(e)}}
-                )
+                connection.send({"type": "error", "data": {"message": str(e)}})
 
     except WebSocketDisconnect:
         logger.info("Client disconnected.")
     except Exception as e:
         logger.error(f"An unexpected error occurred in WebSocket: {e}", exc_info=True)
     finally:
-        if websocket in manager.active_connections:
-            manager.disconnect(websocket)
+        jobs().cancel_client_jobs(client_id)
+        manager.disconnect(websocket)
@@ -1,12 +1,25 @@
 document.addEventListener("DOMContentLoaded", () => {
+  const CANCELLABLE_JOB_KINDS = ["generate_image", "generate_batch"];
+
   const state = {
     socket: null,
+    hasConnected: false,
     isModelLoaded: false,
     lastGeneratedImage: null,
+    activeJobs: new Map(),
     maxVramRes: null,
     galleryImages: [],
+    gallery: {
+      nextCursor: null,
+      total: 0,
+      seq: 0,
+      loading: false,
+      sort: "mtime",
+      order: "desc",
+      prompt: "",
+    },
     prompts: [],
-    settings: { models: [], loras: [] },
+    settings: { models: [], loras: [], fileInfo: {} },
     notifications: {},
     currentLightboxIndex: -1,
     zoomLevel: 1,
@@ -38,6 +51,7 @@ document.addEventListener("DOMContentLoaded", () => {
       height: 512,
       vae_tiling: true,
       cpu_offload: false,
+      live_preview: true,
       init_image: null,
       strength: 0.75,
     },
@@ -59,6 +73,10 @@ document.addEventListener("DOMContentLoaded", () => {
       grid: document.getElementById("gallery-grid"),
       placeholder: document.getElementById("gallery-placeholder"),
       refreshBtn: document.getElementById("refresh-gallery-btn"),
+      searchInput: document.getElementById("gallery-search"),
+      sortSelect: document.getElementById("gallery-sort"),
+      sentinel: null,
+      observer: null,
     },
     promptBook: {
       grid: document.getElementById("prompt-book-grid"),
@@ -110,6 +128,7 @@ document.addEventListener("DOMContentLoaded", () => {
       dockButtons: document.querySelectorAll("#node-dock .node-dock-button"),
       loadModelBtn: document.getElementById("dock-load-model-btn"),
       generateBtn: document.getElementById("dock-generate-btn"),
+      cancelBtn: document.getElementById("dock-cancel-btn"),
     },
     restartBtn: document.getElementById("restart-backend-btn"),
     clearCacheBtn: document.getElementById("clear-cache-btn"),
@@ -138,6 +157,9 @@ document.addEventListener("DOMContentLoaded", () => {
     state.socket = new WebSocket(url);
     state.socket.onopen = () => {
       updateConnectionStatus("Connected", "connected");
+      // Gallery events sent while we were disconnected are lost; resync.
+      if (state.hasConnected) loadGalleryPage(true);
+      state.hasConnected = true;
       fetch("/api/status")
         .then((r) => r.json())
         .then((status) => {
@@ -153,6 +175,9 @@ document.addEventListener("DOMContentLoaded", () => {
     };
     state.socket.onclose = () => {
       updateConnectionStatus("Reconnecting...", "connecting");
+      // The server cancels a client's jobs when its socket goes away.
+      state.activeJobs.clear();
+      updateCancelButton();
       setTimeout(connectWebSocket, 3000);
     };
     state.socket.onerror = (error) => {
@@ -202,10 +227,62 @@ document.addEventListener("DOMContentLoaded", () => {
         showNotification("Image generated!", "success", 3000);
         clearNotification(progressId);
       },
+      batch_item_complete: (data) => {
+        if (data.error) {
+          showNotification(data.error, "error", 5000);
+          return;
+        }
+        state.lastGeneratedImage = data.image_filename;
+        updateNodeUI("image_preview", {
+          image: data.image_filename,
+          info: data.info,
+        });
+      },
+      batch_complete: (data) => {
+        if (data.grid) {
+          state.lastGeneratedImage = data.grid;
+          updateNodeUI("image_preview", { image: data.grid, info: data.info });
+        }
+        showNotification(
+          `Batch of ${data.images.length} images complete!`,
+          "success",
+          3000
+        );
+        clearNotification(progressId);
+      },
       generation_failed: (data) => {
         showNotification(data.message, "error", 5000);
         clearNotification(progressId);
       },
+      job_update: (data) => {
+        const isFinished = ["done", "failed", "cancelled"].includes(
+          data.status
+        );
+        if (isFinished) {
+          state.activeJobs.delete(data.job_id);
+        } else {
+          state.activeJobs.set(data.job_id, data.kind);
+        }
+        updateCancelButton();
+        if (data.status === "cancelled") {
+          clearNotification(progressId);
+          showNotification("Job cancelled", "info", 2000);
+        } else if (data.status === "queued" && data.position > 0) {
+          showNotification(
+            `Queued: ${data.position} job(s) ahead of yours`,
+            "progress",
+            null,
+            progressId,
+            0
+          );
+        }
+      },
+      preview_update: (data) => {
+        const isGenerating = [...state.activeJobs.values()].includes(
+          "generate_image"
+        );
+        if (isGenerating) updateNodeUI("image_preview", { preview: data.image });
+      },
       progress_update: (data) => {
         showNotification(
           data.description,
@@ -226,7 +303,10 @@ document.addEventListener("DOMContentLoaded", () => {
         });
         updateNodeUI("parameters", { max_res: null });
       },
-      gallery_updated: (data) => populateGallery(data.images),
+      gallery_item_added: (data) =>
+        applyGalleryEvent(data.seq, () => prependGalleryImage(data.image)),
+      gallery_item_removed: (data) =>
+        applyGalleryEvent(data.seq, () => removeGalleryImage(data.filename)),
       image_deleted: (data) => {
         if (data.status === "success") {
           closeLightbox();
@@ -242,6 +322,7 @@ document.addEventListener("DOMContentLoaded", () => {
       settings_data: (data) => {
         state.settings.models = data.models;
         state.settings.loras = data.loras;
+        state.settings.fileInfo = data.file_info || {};
         populateSettingsLists();
         updateNodeUI("model_sampler", {
           models: state.settings.models,
@@ -253,6 +334,7 @@ document.addEventListener("DOMContentLoaded", () => {
       settings_data_updated: (data) => {
         state.settings.models = data.models;
         state.settings.loras = data.loras;
+        state.settings.fileInfo = data.file_info || {};
         populateSettingsLists();
         updateNodeUI("model_sampler", {
           models: state.settings.models,
@@ -357,6 +439,13 @@ document.addEventListener("DOMContentLoaded", () => {
     }
   }
 
+  function updateCancelButton() {
+    const hasGenerationJobs = [...state.activeJobs.values()].some((kind) =>
+      CANCELLABLE_JOB_KINDS.includes(kind)
+    );
+    ui.node.cancelBtn.classList.toggle("hidden", !hasGenerationJobs);
+  }
+
   function showDialog(title, message, buttons) {
     ui.dialog.title.textContent = title;
     ui.dialog.message.innerHTML = message;
@@ -374,23 +463,142 @@ document.addEventListener("DOMContentLoaded", () => {
     ui.dialog.overlay.classList.remove("hidden");
   }
 
-  function populateGallery(images) {
-    state.galleryImages = images || [];
+  function populateGallery(images, nextCursor = null, total = null, seq = null) {
+    state.galleryImages = [];
+    state.gallery.nextCursor = nextCursor;
+    if (total !== null) state.gallery.total = total;
+    if (seq !== null) state.gallery.seq = seq;
     ui.gallery.grid.innerHTML = "";
+    appendGalleryImages(images || []);
+  }
+
+  function createGalleryItem(imageInfo) {
+    const item = document.createElement("div");
+    item.className = "gallery-item";
+    item.dataset.filename = imageInfo.filename;
+    const imageUrl = `/outputs/${imageInfo.filename}`;
+    item.innerHTML = `<img src="${imageUrl}" alt="${imageInfo.filename}" class="gallery-item-image" loading="lazy"><div class="image-actions-overlay"><a href="${imageUrl}" target="_blank" class="image-action-btn" title="Open in New Tab"><span class="material-symbols-outlined">open_in_new</span></a></div>`;
+    item
+      .querySelector(".image-actions-overlay")
+      .addEventListener("click", (e) => e.stopPropagation());
+    item.addEventListener("click", () =>
+      openLightbox(
+        state.galleryImages.findIndex(
+          (img) => img.filename === imageInfo.filename
+        )
+      )
+    );
+    return item;
+  }
+
+  function appendGalleryImages(images) {
+    const known = new Set(state.galleryImages.map((img) => img.filename));
+    const fragment = document.createDocumentFragment();
+    images.forEach((imageInfo) => {
+      if (known.has(imageInfo.filename)) return;
+      state.galleryImages.push(imageInfo);
+      fragment.appendChild(createGalleryItem(imageInfo));
+    });
+    ui.gallery.grid.appendChild(fragment);
+    updateGalleryPlaceholder();
+    updateGallerySentinel();
+  }
+
+  function prependGalleryImage(imageInfo) {
+    state.gallery.total += 1;
+    const isDefaultView =
+      state.gallery.sort === "mtime" &&
+      state.gallery.order === "desc" &&
+      !state.gallery.prompt;
+    if (!isDefaultView) return;
+    if (state.galleryImages.some((img) => img.filename === imageInfo.filename))
+      return;
+    state.galleryImages.unshift(imageInfo);
+    ui.gallery.grid.prepend(createGalleryItem(imageInfo));
+    if (state.currentLightboxIndex >= 0) state.currentLightboxIndex += 1;
+    updateGalleryPlaceholder();
+  }
+
+  function removeGalleryImage(filename) {
+    const index = state.galleryImages.findIndex(
+      (img) => img.filename === filename
+    );
+    state.gallery.total = Math.max(0, state.gallery.total - 1);
+    if (index === -1) return;
+    state.galleryImages.splice(index, 1);
+    ui.gallery.grid
+      .querySelector(`.gallery-item[data-filename="${CSS.escape(filename)}"]`)
+      ?.remove();
+    if (state.currentLightboxIndex > index) state.currentLightboxIndex -= 1;
+    updateGalleryPlaceholder();
+  }
+
+  function applyGalleryEvent(seq, apply) {
+    if (seq <= state.gallery.seq) return;
+    if (seq !== state.gallery.seq + 1) {
+      // A gap means we missed events (e.g. while reconnecting); resync.
+      loadGalleryPage(true);
+      return;
+    }
+    state.gallery.seq = seq;
+    apply();
+  }
+
+  function updateGalleryPlaceholder() {
     const hasImages = state.galleryImages.length > 0;
-    ui.gallery.placeholder.classList.toggle("hidden", !hasImages);
-    if (hasImages) {
-      state.galleryImages.forEach((imageInfo, index) => {
-        const item = document.createElement("div");
-        item.className = "gallery-item";
-        const imageUrl = `/outputs/${imageInfo.filename}`;
-        item.innerHTML = `<img src="${imageUrl}" alt="${imageInfo.filename}" class="gallery-item-image" loading="lazy"><div class="image-actions-overlay"><a href="${imageUrl}" target="_blank" class="image-action-btn" title="Open in New Tab"><span class="material-symbols-outlined">open_in_new</span></a></div>`;
-        item
-          .querySelector(".image-actions-overlay")
-          .addEventListener("click", (e) => e.stopPropagation());
-        item.addEventListener("click", () => openLightbox(index));
-        ui.gallery.grid.appendChild(item);
-      });
+    ui.gallery.placeholder.classList.toggle("hidden", hasImages);
+  }
+
+  function updateGallerySentinel() {
+    if (!ui.gallery.sentinel) {
+      ui.gallery.sentinel = document.createElement("div");
+      ui.gallery.sentinel.className = "gallery-sentinel";
+      ui.gallery.observer = new IntersectionObserver(
+        (entries) => {
+          if (entries.some((entry) => entry.isIntersecting)) {
+            loadGalleryPage(false);
+          }
+        },
+        { root: ui.gallery.grid, rootMargin: "400px" }
+      );
+    }
+    ui.gallery.grid.appendChild(ui.gallery.sentinel);
+    ui.gallery.sentinel.classList.toggle("hidden", !state.gallery.nextCursor);
+    // Re-observing fires a fresh intersection check, so short pages keep filling.
+    ui.gallery.observer.unobserve(ui.gallery.sentinel);
+    ui.gallery.observer.observe(ui.gallery.sentinel);
+  }
+
+  function buildGalleryQuery(cursor) {
+    const params = new URLSearchParams({
+      sort: state.gallery.sort,
+      order: state.gallery.order,
+    });
+    if (cursor) params.set("cursor", cursor);
+    if (state.gallery.prompt) params.set("prompt", state.gallery.prompt);
+    return params.toString();
+  }
+
+  async function loadGalleryPage(reset = true) {
+    if (state.gallery.loading) return;
+    if (!reset && !state.gallery.nextCursor) return;
+    state.gallery.loading = true;
+    try {
+      const cursor = reset ? null : state.gallery.nextCursor;
+      const response = await fetch(`/api/gallery?${buildGalleryQuery(cursor)}`);
+      const data = await response.json();
+      if (!response.ok) throw new Error(data.detail || "Gallery request failed");
+      if (reset) {
+        populateGallery(data.images, data.next_cursor, data.total, data.seq);
+      } else {
+        state.gallery.nextCursor = data.next_cursor;
+        state.gallery.total = data.total;
+        appendGalleryImages(data.images);
+      }
+    } catch (e) {
+      showNotification(`Could not load gallery: ${e.message}`, "error", 4000);
+    } finally {
+      state.gallery.loading = false;
     }
   }
 
@@ -443,7 +651,13 @@ document.addEventListener("DOMContentLoaded", () => {
   function populateSettingsLists() {
     const createFileItem = (filename, type) => {
       const item = ui.settings.fileItemTemplate.content.cloneNode(true);
-      item.querySelector(".file-name").textContent = filename;
+      const info = state.settings.fileInfo[filename];
+      const details = info
+        ? [info.architecture, `${info.size_gb} GB`].filter(Boolean).join(", ")
+        : "";
+      item.querySelector(".file-name").textContent = details
+        ? `${filename} (${details})`
+        : filename;
       const deleteBtn = item.querySelector(".file-delete-btn");
       deleteBtn.addEventListener("click", () => {
         const action =
@@ -821,6 +1035,11 @@ document.addEventListener("DOMContentLoaded", () => {
         img.classList.remove("hidden");
         placeholder.classList.add("hidden");
         node.querySelector("#view-image-btn").disabled = false;
+      } else if (key === "preview") {
+        const img = node.querySelector(".preview-img");
+        img.src = value;
+        img.classList.remove("hidden");
+        node.querySelector(".placeholder").classList.add("hidden");
       } else if (key === "info") {
         node.querySelector("#image-info-text").textContent = value;
       } else if (key === "models" || key === "schedulers" || key === "loras") {
@@ -896,7 +1115,7 @@ document.addEventListener("DOMContentLoaded", () => {
   function initDock() {
     ui.node.dockButtons.forEach((button) => {
       const type = button.dataset.nodeType;
-      if (["vae_tiling", "cpu_offload"].includes(type)) {
+      if (["vae_tiling", "cpu_offload", "live_preview"].includes(type)) {
         button.addEventListener("click", () => {
           button.classList.toggle("active");
           state.generationState[type] = button.classList.contains("active");
@@ -947,13 +1166,24 @@ document.addEventListener("DOMContentLoaded", () => {
         showNotification("No model is loaded.", "error", 3000);
         return;
       }
-      const payload = { ...state.generationState };
+      const payload = {
+        ...state.generationState,
+        scheduler: state.generationState.scheduler_name,
+      };
       if (payload.seed === -1) {
         payload.seed = Math.floor(Math.random() * 2 ** 32);
         updateNodeUI("parameters", { seed: payload.seed });
       }
       sendMessage("generate_image", payload);
     });
+
+    ui.node.cancelBtn.addEventListener("click", () => {
+      state.activeJobs.forEach((kind, jobId) => {
+        if (CANCELLABLE_JOB_KINDS.includes(kind)) {
+          sendMessage("cancel_job", { job_id: jobId });
+        }
+      });
+    });
   }
 
   async function loadPrompts() {
@@ -1137,10 +1367,20 @@ document.addEventListener("DOMContentLoaded", () => {
       });
     });
 
-    ui.gallery.refreshBtn.addEventListener("click", () => {
-      fetch("/api/gallery")
-        .then((res) => res.json())
-        .then((data) => populateGallery(data.images));
+    ui.gallery.refreshBtn.addEventListener("click", () => loadGalleryPage(true));
+    ui.gallery.sortSelect.addEventListener("change", () => {
+      const [sort, order] = ui.gallery.sortSelect.value.split(":");
+      state.gallery.sort = sort;
+      state.gallery.order = order;
+      loadGalleryPage(true);
+    });
+    let gallerySearchTimeout = null;
+    ui.gallery.searchInput.addEventListener("input", () => {
+      clearTimeout(gallerySearchTimeout);
+      gallerySearchTimeout = setTimeout(() => {
+        state.gallery.prompt = ui.gallery.searchInput.value.trim();
+        loadGalleryPage(true);
+      }, 300);
     });
 
     ui.promptBook.refreshBtn.addEventListener("click", loadPrompts);
@@ -1228,7 +1468,12 @@ document.addEventListener("DOMContentLoaded", () => {
       const config = await response.json();
       state.settings.models = config.models;
       state.settings.loras = config.loras;
-      populateGallery(config.gallery_images);
+      populateGallery(
+        config.gallery_images,
+        config.gallery_next_cursor,
+        config.gallery_total,
+        config.gallery_seq
+      );
       state.prompts = config.prompts;
       populatePromptBook(config.prompts);
 